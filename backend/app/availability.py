@@ -0,0 +1,78 @@
+import datetime as dt
+import os
+from typing import List, Optional
+
+from sqlalchemy import select
+
+from app import holds, models
+from app.pagination import SLOT_ORDER, after_key
+from app.serialization import SLOT_LIST_COLUMNS
+
+# Result and scan limits for GET /availability/search
+DEFAULT_SEARCH_LIMIT = 10
+MAX_SEARCH_LIMIT = 100
+# Rows fetched per step of the index-ordered scan when slots must also be
+# filtered by length, and the most rows one search may look at
+SCAN_CHUNK = 500
+MAX_SCAN_ROWS = int(os.getenv("AVAILABILITY_MAX_SCAN", "50000"))
+
+
+def slot_minutes(start_time: dt.time, end_time: dt.time) -> int:
+    return (end_time.hour * 60 + end_time.minute) - (start_time.hour * 60 + start_time.minute)
+
+
+async def search_free_slots(
+    db,
+    date_from: dt.date,
+    date_to: Optional[dt.date] = None,
+    time_from: Optional[dt.time] = None,
+    time_to: Optional[dt.time] = None,
+    duration_minutes: Optional[int] = None,
+    user_ids: Optional[List[int]] = None,
+    limit: int = DEFAULT_SEARCH_LIMIT,
+    now: Optional[dt.datetime] = None,
+):
+    """
+    Return the earliest `limit` slots that are free (not booked, not held)
+    and fall inside the date and time-of-day window.
+
+    Walks ix_slots_free_date_start_time_id in (date, start_time, id)
+    order and stops as soon as enough slots are found, so the cost depends
+    on how far the first matches are, not on the size of the table. Slot
+    length is not indexable portably, so when duration_minutes is given
+    the scan proceeds in SCAN_CHUNK steps and filters each step in Python,
+    giving up after MAX_SCAN_ROWS rows.
+    """
+    stmt = select(*SLOT_LIST_COLUMNS).where(
+        models.Slot.is_booked == False,  # noqa: E712 (= rather than IS, so Postgres can use the index)
+        models.Slot.date >= date_from,
+        holds.hold_is_free(now or holds.utcnow()),
+    )
+    if date_to:
+        stmt = stmt.where(models.Slot.date <= date_to)
+    if time_from:
+        stmt = stmt.where(models.Slot.start_time >= time_from)
+    if time_to:
+        stmt = stmt.where(models.Slot.end_time <= time_to)
+    if user_ids:
+        stmt = stmt.where(models.Slot.user_id.in_(user_ids))
+    stmt = stmt.order_by(*SLOT_ORDER)
+
+    if not duration_minutes:
+        return (await db.execute(stmt.limit(limit))).all()
+
+    found, scanned, key = [], 0, None
+    while scanned < MAX_SCAN_ROWS:
+        step = stmt.where(after_key(*key)) if key else stmt
+        rows = (await db.execute(step.limit(SCAN_CHUNK))).all()
+        for row in rows:
+            if slot_minutes(row.start_time, row.end_time) >= duration_minutes:
+                found.append(row)
+                if len(found) == limit:
+                    return found
+        if len(rows) < SCAN_CHUNK:
+            break
+        scanned += len(rows)
+        last = rows[-1]
+        key = (last.date, last.start_time, last.id)
+    return found
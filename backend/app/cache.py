@@ -0,0 +1,252 @@
+import asyncio
+import itertools
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlencode
+
+from app import metrics
+
+# ===== BACKENDS =====
+# Every backend stores opaque bytes under string keys, plus "scope
+# versions": tokens that are replaced whenever data in that scope
+# changes. Cache keys embed the versions of the scopes they depend on, so
+# replacing a version makes every dependent entry unreachable at once and
+# the stale entries simply age out. A version that goes missing (e.g.
+# evicted by Redis) is replaced by a fresh token, never reset to an old one.
+
+
+class NullCache:
+    """Backend that never stores anything"""
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return None
+
+    async def set(self, key: str, value: bytes, ttl: int):
+        pass
+
+    async def get_versions(self, scopes: List[str]) -> List[str]:
+        return []
+
+    async def bump(self, scopes: Iterable[str]):
+        pass
+
+
+class MemoryCache:
+    """
+    In-process TTL + LRU cache.
+
+    Only coherent within a single process: with several gunicorn workers a
+    write invalidates the cache of the worker that handled it only, so use
+    the Redis backend there.
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._versions: Dict[str, str] = {}
+        self._counter = itertools.count()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: int):
+        self._entries[key] = (value, time.monotonic() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_versions(self, scopes: List[str]) -> List[str]:
+        return [self._versions.setdefault(scope, "0") for scope in scopes]
+
+    async def bump(self, scopes: Iterable[str]):
+        for scope in scopes:
+            self._versions[scope] = str(next(self._counter) + 1)
+
+
+class RedisCache:
+    """
+    Cache shared by all workers through any Redis-protocol server.
+
+    Pass an existing client (e.g. a fakeredis.aioredis.FakeRedis in tests)
+    or a URL.
+    """
+
+    def __init__(self, client=None, url: Optional[str] = None, prefix: str = "schedulink:cache:"):
+        if client is None:
+            import redis.asyncio as redis
+            client = redis.Redis.from_url(url or "redis://localhost:6379/0")
+        self.client = client
+        self.prefix = prefix
+
+    def _version_key(self, scope: str) -> str:
+        return f"{self.prefix}version:{scope}"
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(self.prefix + key)
+
+    async def set(self, key: str, value: bytes, ttl: int):
+        await self.client.set(self.prefix + key, value, ex=ttl)
+
+    async def get_versions(self, scopes: List[str]) -> List[str]:
+        keys = [self._version_key(scope) for scope in scopes]
+        versions = await self.client.mget(keys)
+        missing = [key for key, version in zip(keys, versions) if version is None]
+        if missing:
+            async with self.client.pipeline(transaction=False) as pipe:
+                for key in missing:
+                    pipe.set(key, uuid.uuid4().hex, nx=True)
+                await pipe.execute()
+            versions = await self.client.mget(keys)
+        return [v.decode() if isinstance(v, bytes) else v for v in versions]
+
+    async def bump(self, scopes: Iterable[str]):
+        async with self.client.pipeline(transaction=False) as pipe:
+            for scope in scopes:
+                pipe.set(self._version_key(scope), uuid.uuid4().hex)
+            await pipe.execute()
+
+
+# ===== SLOT CACHE =====
+
+# Scope bumped by every slot write; queries that cannot be narrowed to one
+# date or one user (date ranges, unfiltered lists) depend on it
+ALL_SLOTS = "slots"
+# Cancelling does not report who had booked the slot, so booking lists
+# also depend on this scope, which only cancellations bump
+CANCELLATIONS = "cancellations"
+
+
+def slot_scopes(slot, cancelled: bool = False) -> set:
+    """Scopes whose cached reads may include the given slot row"""
+    get = slot.get if isinstance(slot, dict) else lambda name: getattr(slot, name)
+    scopes = {ALL_SLOTS, f"date:{get('date')}"}
+    if get("user_id") is not None:
+        scopes.add(f"user:{get('user_id')}")
+    if get("booked_by_user_id") is not None:
+        scopes.add(f"booker:{get('booked_by_user_id')}")
+    if cancelled:
+        scopes.add(CANCELLATIONS)
+    return scopes
+
+
+def list_scopes(date=None, user_id=None) -> List[str]:
+    """Scopes a GET /slots query depends on, as narrow as its filters allow"""
+    if date is not None:
+        return [f"date:{date}"]
+    if user_id is not None:
+        return [f"user:{user_id}"]
+    return [ALL_SLOTS]
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical loads within one process: the first
+    caller for a key runs the load, callers arriving while it runs await
+    the same result (or exception) instead of starting their own.
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, asyncio.Task] = {}
+
+    async def do(self, key: str, load: Callable[[], Awaitable]):
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = asyncio.ensure_future(load())
+            self._flights[key] = flight
+            flight.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            metrics.CACHE_COALESCED.inc()
+        # A cancelled caller must not cancel the load the others wait for
+        return await asyncio.shield(flight)
+
+    def _forget(self, key: str, flight: asyncio.Task):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def forget_all(self):
+        """Make later callers start new loads; loads in flight still finish for their callers"""
+        self._flights.clear()
+
+
+class ResponseCache:
+    """Read-through cache of serialized response bodies"""
+
+    def __init__(self, backend, ttl: int = 30):
+        self.backend = backend
+        self.ttl = ttl
+        self.flights = SingleFlight()
+
+    async def key(self, endpoint: str, filters: Dict, scopes: List[str]) -> str:
+        """Build a key from the normalized filters and current scope versions"""
+        params = urlencode(sorted((k, str(v)) for k, v in filters.items() if v is not None))
+        versions = await self.backend.get_versions(scopes)
+        return f"{endpoint}?{params}|" + ",".join(f"{s}={v}" for s, v in zip(scopes, versions))
+
+    async def get(self, key: str) -> Optional[Tuple[bytes, Dict[str, str]]]:
+        """Return the cached (body, headers) for a key, if any"""
+        value = await self.backend.get(key)
+        if value is None:
+            return None
+        headers, body = value.split(b"\n", 1)
+        return body, json.loads(headers)
+
+    async def set(self, key: str, body: bytes, headers: Optional[Dict[str, str]] = None):
+        await self.backend.set(key, json.dumps(headers or {}).encode() + b"\n" + body, self.ttl)
+
+    async def get_or_load(self, key: str, load: Callable[[], Awaitable[Tuple[bytes, Dict[str, str]]]], fresh: bool = False):
+        """
+        Return the cached (body, headers) for a key, or run load and cache
+        what it returns. Concurrent misses on the same key share one load,
+        so a burst of identical requests costs one query and one
+        serialization, with or without a caching backend. fresh skips the
+        cached entry, which may have been loaded from a lagging replica.
+        """
+        cached = None if fresh else await self.get(key)
+        if cached is not None:
+            return cached
+
+        async def load_and_store():
+            body, headers = await load()
+            await self.set(key, body, headers)
+            return body, headers
+
+        # A fresh load never joins one that may be reading from a replica
+        return await self.flights.do("fresh:" + key if fresh else key, load_and_store)
+
+    async def invalidate(self, scopes: Iterable[str]):
+        await self.backend.bump(sorted(set(scopes)))
+        # Requests after this write must not join a load that started before it
+        self.flights.forget_all()
+
+
+def build_cache() -> ResponseCache:
+    """
+    Create the response cache from the environment.
+
+    CACHE_BACKEND is "memory", "redis" or "none". It defaults to "memory"
+    for a single worker and "none" when WEB_CONCURRENCY runs several,
+    where only the shared Redis backend stays coherent.
+    """
+    workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+    backend_name = os.getenv("CACHE_BACKEND", "memory" if workers <= 1 else "none")
+    ttl = int(os.getenv("CACHE_TTL", "30"))
+
+    if backend_name == "redis":
+        backend = RedisCache(url=os.getenv("REDIS_URL"))
+    elif backend_name == "memory":
+        backend = MemoryCache(max_entries=int(os.getenv("CACHE_MAX_ENTRIES", "10000")))
+    else:
+        backend = NullCache()
+    return ResponseCache(backend, ttl=ttl)
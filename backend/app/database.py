@@ -1,25 +1,344 @@
+import contextvars
+import itertools
+import logging
 import os
-from sqlalchemy import create_engine
+import time
+from collections import OrderedDict
+from typing import List, Optional
+from uuid import uuid4
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from dotenv import load_dotenv
+from app import metrics
+from app.instrumentation import instrument_queries
 
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Get database URL from environment or default to SQLite
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./app.db")
+# Hosting platforms hand out postgres:// URLs, which SQLAlchemy does not
+# accept; treat them as postgresql:// everywhere
+if DATABASE_URL.startswith("postgres://"):
+    DATABASE_URL = "postgresql://" + DATABASE_URL[len("postgres://"):]
+
+
+def to_async_url(url: str) -> str:
+    """Map a sync DATABASE_URL onto the matching async driver"""
+    if url.startswith("sqlite:"):
+        return "sqlite+aiosqlite:" + url[len("sqlite:"):]
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    return url
+
+
+def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    # SQLite leaves foreign keys unenforced unless asked per connection
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    return os.getenv(name, str(default)).lower() in ("1", "true", "yes")
+
+
+# Connection pool settings (PostgreSQL). Every gunicorn worker owns its
+# own pool, so a container holds up to
+# workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) connections. Set
+# DB_CONNECTION_BUDGET to the connections this container may use and the
+# pool size is derived per worker from WEB_CONCURRENCY instead.
+DB_CONNECTION_BUDGET = os.getenv("DB_CONNECTION_BUDGET")
+WORKERS = int(os.getenv("WEB_CONCURRENCY", "1"))
+if DB_CONNECTION_BUDGET:
+    DB_POOL_SIZE = max(1, int(DB_CONNECTION_BUDGET) // WORKERS)
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "0"))
+else:
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Seconds after which a connection is replaced; -1 keeps connections forever
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+# Pre-ping costs a round trip per checkout; with DB_POOL_RECYCLE below the
+# server/load balancer idle timeout it can usually be turned off
+DB_POOL_PRE_PING = _env_bool("DB_POOL_PRE_PING", True)
+# PgBouncer in transaction pooling mode cannot hold prepared statements
+DB_PGBOUNCER = _env_bool("DB_PGBOUNCER", False)
+
+
+class _TimedCheckoutMixin:
+    """Record how long callers wait to get a connection from the pool"""
+
+    metrics_label = "default"
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            metrics.POOL_CHECKOUT_SECONDS.labels(self.metrics_label).observe(time.perf_counter() - start)
+
+
+class TimedQueuePool(_TimedCheckoutMixin, QueuePool):
+    metrics_label = "sync"
+
+
+class TimedAsyncAdaptedQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    metrics_label = "async"
+
 
-# Create engine with appropriate configuration
+class TimedReplicaPool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    metrics_label = "replica"
+
+
+def _record_pool_size(engine):
+    metrics.POOL_SIZE.labels(engine.pool.metrics_label).set(engine.pool.size())
+
+
+def _instrument_pool(engine):
+    """Export checked-out and overflow counts whenever they change"""
+    label = engine.pool.metrics_label
+    _record_pool_size(engine)
+
+    def _record(*args):
+        metrics.POOL_CHECKED_OUT.labels(label).set(engine.pool.checkedout())
+        metrics.POOL_OVERFLOW.labels(label).set(engine.pool.overflow())
+
+    event.listen(engine, "checkout", _record)
+    event.listen(engine, "checkin", _record)
+
+
+def _pool_options(poolclass):
+    return {
+        "poolclass": poolclass,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+def _asyncpg_connect_args():
+    if not DB_PGBOUNCER:
+        return {}
+    # Disable asyncpg's statement caches and give each prepared statement
+    # a unique name so transaction-pooled server connections never clash
+    return {
+        "statement_cache_size": 0,
+        "prepared_statement_cache_size": 0,
+        "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+    }
+
+
+ASYNC_DATABASE_URL = to_async_url(DATABASE_URL)
+
+# Create engines with appropriate configuration. The sync engine serves
+# scripts such as init_db.py; request handlers use the async engine.
 if DATABASE_URL.startswith("sqlite"):
     engine = create_engine(
         DATABASE_URL, connect_args={"check_same_thread": False}
     )
+    async_engine = create_async_engine(ASYNC_DATABASE_URL)
+    event.listen(engine, "connect", _enable_sqlite_foreign_keys)
+    event.listen(async_engine.sync_engine, "connect", _enable_sqlite_foreign_keys)
 else:
     # PostgreSQL configuration
-    engine = create_engine(DATABASE_URL, pool_pre_ping=True)
+    engine = create_engine(DATABASE_URL, **_pool_options(TimedQueuePool))
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        connect_args=_asyncpg_connect_args(),
+        **_pool_options(TimedAsyncAdaptedQueuePool),
+    )
+    _instrument_pool(engine)
+    _instrument_pool(async_engine.sync_engine)
+
+instrument_queries(engine, "sync")
+instrument_queries(async_engine.sync_engine, "async")
+
+
+# ===== READ REPLICAS =====
+# DATABASE_READ_URLS lists read replicas of DATABASE_URL, comma separated.
+# GET endpoints take their session from get_read_db, which spreads them
+# round robin over the replicas; everything else, and every read of a
+# client that has just written, stays on the primary.
+
+DATABASE_READ_URLS = [url.strip() for url in os.getenv("DATABASE_READ_URLS", "").split(",") if url.strip()]
+# A replica that fails to connect is skipped for this long, then tried again
+DB_REPLICA_RETRY_SECONDS = float(os.getenv("DB_REPLICA_RETRY_SECONDS", "30"))
+# Give up connecting to a replica after this long and read from the next one
+DB_REPLICA_CONNECT_TIMEOUT = float(os.getenv("DB_REPLICA_CONNECT_TIMEOUT", "2"))
+# After a successful write a client reads from the primary for this long,
+# so it sees its own booking even while the replicas lag behind
+DB_READ_PIN_SECONDS = float(os.getenv("DB_READ_PIN_SECONDS", "5"))
+
+
+def _create_replica_engine(url: str):
+    if url.startswith("sqlite"):
+        replica = create_async_engine(to_async_url(url))
+        event.listen(replica.sync_engine, "connect", _enable_sqlite_foreign_keys)
+    else:
+        replica = create_async_engine(
+            to_async_url(url),
+            connect_args={**_asyncpg_connect_args(), "timeout": DB_REPLICA_CONNECT_TIMEOUT},
+            **_pool_options(TimedReplicaPool),
+        )
+    instrument_queries(replica.sync_engine, "replica")
+    return replica
+
+
+class ReadRouter:
+    """
+    Hands out connections for reads: from the replicas in turn, skipping
+    any that failed to connect within the last retry_after seconds, and
+    from the primary when no replica is configured or none answers.
+    """
+
+    def __init__(self, primary, replicas: List, retry_after: float = DB_REPLICA_RETRY_SECONDS):
+        self.primary = primary
+        self.replicas = replicas
+        self.retry_after = retry_after
+        self._down_until = [float("-inf")] * len(replicas)
+        self._turn = itertools.count()
+
+    async def connect(self):
+        if self.replicas:
+            start = next(self._turn)
+            for offset in range(len(self.replicas)):
+                index = (start + offset) % len(self.replicas)
+                if self._down_until[index] > time.monotonic():
+                    continue
+                try:
+                    return await self.replicas[index].connect()
+                except Exception as e:
+                    self._down_until[index] = time.monotonic() + self.retry_after
+                    logger.warning(f"Read replica {index} unavailable for {self.retry_after:g}s, reading elsewhere: {type(e).__name__}: {str(e)}")
+        return await self.primary.connect()
+
+    async def dispose(self):
+        for replica in self.replicas:
+            await replica.dispose()
+
+
+read_router = ReadRouter(async_engine, [_create_replica_engine(url) for url in DATABASE_READ_URLS])
+
+# Set for the requests of a client pinned to the primary (see ReadYourWritesMiddleware)
+_read_from_primary: contextvars.ContextVar[bool] = contextvars.ContextVar("read_from_primary", default=False)
+
+
+def pinned_to_primary() -> bool:
+    """Whether the current request comes from a client that has just written"""
+    return _read_from_primary.get()
+
+
+def _reads_from_primary() -> bool:
+    return not read_router.replicas or _read_from_primary.get()
+
+
+async def read_connection():
+    """A started AsyncConnection for reads: the primary when pinned, otherwise a replica"""
+    if _reads_from_primary():
+        return await async_engine.connect()
+    return await read_router.connect()
+
+
+class ReadYourWritesMiddleware:
+    """
+    Pins a client to the primary for pin_seconds after each successful
+    write (a POST, PUT, PATCH or DELETE answered below 400).
+
+    The pin travels in a cookie, so it holds whichever worker or container
+    serves the client's next request. With key_header set, clients that
+    drop cookies are also remembered per worker by that header's value;
+    never by IP address, which behind the proxy is shared by everyone.
+    Does nothing without replicas.
+    """
+
+    COOKIE = b"read_primary"
+
+    def __init__(self, app, pin_seconds: float = DB_READ_PIN_SECONDS, key_header: Optional[str] = None,
+                 max_clients: int = 100000):
+        self.app = app
+        self.pin_seconds = pin_seconds
+        self.key_header = key_header.lower().encode() if key_header else None
+        self.max_clients = max_clients
+        self._pinned: "OrderedDict[str, float]" = OrderedDict()
+
+    def client_key(self, scope) -> Optional[str]:
+        if self.key_header:
+            for name, value in scope["headers"]:
+                if name == self.key_header and value:
+                    return value.decode("latin-1")
+        return None
+
+    def _is_pinned(self, scope, key: Optional[str]) -> bool:
+        for name, value in scope["headers"]:
+            if name == b"cookie" and any(part.strip().startswith(self.COOKIE + b"=") for part in value.split(b";")):
+                return True
+        pinned_until = self._pinned.get(key) if key is not None else None
+        if pinned_until is None:
+            return False
+        if pinned_until > time.monotonic():
+            return True
+        del self._pinned[key]
+        return False
+
+    def _pin(self, key: Optional[str]):
+        if key is None:
+            return
+        self._pinned[key] = time.monotonic() + self.pin_seconds
+        self._pinned.move_to_end(key)
+        while len(self._pinned) > self.max_clients:
+            self._pinned.popitem(last=False)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not read_router.replicas:
+            await self.app(scope, receive, send)
+            return
+
+        key = self.client_key(scope)
+        token = _read_from_primary.set(self._is_pinned(scope, key))
+        is_write = scope["method"] not in ("GET", "HEAD", "OPTIONS")
+
+        async def send_with_pin(message):
+            if is_write and message["type"] == "http.response.start" and message["status"] < 400:
+                self._pin(key)
+                cookie = self.COOKIE + f"=1; Max-Age={max(1, round(self.pin_seconds))}; Path=/; HttpOnly; SameSite=Lax".encode()
+                message = {**message, "headers": [*message.get("headers", []), (b"set-cookie", cookie)]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_pin)
+        finally:
+            _read_from_primary.reset(token)
+
+
+def reset_after_fork():
+    """
+    Give a freshly forked worker its own connection pools.
+
+    With gunicorn --preload the engines are created once in the master;
+    a worker must never reuse connections the master (or a sibling)
+    opened, and its pool gauges start from scratch in the new process.
+    """
+    for replica in read_router.replicas:
+        replica.sync_engine.dispose(close=False)
+    for sync_engine in (engine, async_engine.sync_engine):
+        sync_engine.dispose(close=False)
+        if hasattr(sync_engine.pool, "metrics_label"):
+            _record_pool_size(sync_engine)
+
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
 
 Base = declarative_base()
 
@@ -32,3 +351,23 @@ def get_db():
     finally:
         db.close()
 
+
+# Async dependency
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# Async dependency for GET endpoints: a session on a read replica (see
+# ReadRouter), or on the primary for a client that has just written
+async def get_read_db():
+    if _reads_from_primary():
+        async with AsyncSessionLocal() as db:
+            yield db
+        return
+    conn = await read_router.connect()
+    try:
+        async with AsyncSessionLocal(bind=conn) as db:
+            yield db
+    finally:
+        await conn.close()
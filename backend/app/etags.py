@@ -0,0 +1,40 @@
+import hashlib
+from typing import Iterable, Optional
+
+from fastapi import Response
+
+
+def slot_etag(slot) -> str:
+    """Weak ETag of a single slot, from its row version"""
+    get = slot.get if isinstance(slot, dict) else lambda name: getattr(slot, name)
+    return f'W/"slot-{get("id")}-{get("version")}"'
+
+
+def rows_etag(slots: Iterable, extra: str = "") -> str:
+    """
+    Weak ETag of a list of slots, fingerprinted from the (id, version)
+    pairs of its rows, so it can be computed without serializing them.
+    """
+    digest = hashlib.blake2b(extra.encode(), digest_size=12)
+    for slot in slots:
+        digest.update(f"{slot.id}:{slot.version};".encode())
+    return f'W/"{digest.hexdigest()}"'
+
+
+def body_etag(body: bytes) -> str:
+    """Weak ETag of an already serialized body"""
+    return f'W/"{hashlib.blake2b(body, digest_size=12).hexdigest()}"'
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match / If-Match header against an ETag"""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    bare = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == bare for candidate in header.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
@@ -0,0 +1,219 @@
+import asyncio
+import json
+import logging
+import os
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import event as sa_event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+
+from app import schemas
+
+logger = logging.getLogger(__name__)
+
+# Event types pushed to /slots/stream subscribers
+CREATED = "created"
+UPDATED = "updated"
+BOOKED = "booked"
+CANCELLED = "cancelled"
+DELETED = "deleted"
+HELD = "held"
+RELEASED = "released"
+
+# Postgres NOTIFY channel shared by all workers
+CHANNEL = "slot_events"
+# NOTIFY payloads must stay under 8000 bytes; batches are split to fit
+MAX_PAYLOAD_BYTES = 7500
+# Session.info key of the events waiting for their transaction to commit
+PENDING_EVENTS = "slot_events"
+# Events a subscriber may fall behind by before it is told to resync
+SUBSCRIBER_QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", "1000"))
+
+
+def slot_event(event_type: str, slot) -> Dict:
+    """Build an event from a Slot (or a dict of its columns)"""
+    return {"type": event_type, "slot": schemas.SlotOut.model_validate(slot).model_dump(mode="json")}
+
+
+def resync_event(event: Dict) -> Dict:
+    """
+    Stand-in for an event too large to send: just enough of the slot to
+    tell which subscribers it concerns, who then refetch GET /slots
+    """
+    slot = event["slot"]
+    return {"type": event["type"], "slot": {key: slot[key] for key in ("id", "date", "user_id")}, "resync": True}
+
+
+class Subscription:
+    """
+    One stream client's view of the broker.
+
+    Events matching the date / provider filters are queued until the
+    client reads them. A client that falls SUBSCRIBER_QUEUE_SIZE events
+    behind is marked overflowed and should refetch GET /slots.
+    """
+
+    def __init__(self, date: Optional[str] = None, user_id: Optional[int] = None):
+        self.date = date
+        self.user_id = user_id
+        self.queue: "asyncio.Queue[Dict]" = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.overflowed = False
+
+    def matches(self, event: Dict) -> bool:
+        slot = event["slot"]
+        if self.date is not None and slot["date"] != self.date:
+            return False
+        if self.user_id is not None and slot["user_id"] != self.user_id:
+            return False
+        return True
+
+    def offer(self, event: Dict):
+        if self.overflowed or not self.matches(event):
+            return
+        if event.get("resync"):
+            self.overflowed = True
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class InProcessBroker:
+    """
+    Fans events out to the subscribers of this process only.
+
+    Enough for SQLite and single-worker development; with several
+    gunicorn workers use PostgresBroker so every worker sees every write.
+    """
+
+    def __init__(self):
+        self.subscriptions: Set[Subscription] = set()
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    def subscribe(self, date: Optional[str] = None, user_id: Optional[int] = None) -> Subscription:
+        subscription = Subscription(date, user_id)
+        self.subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self.subscriptions.discard(subscription)
+
+    def dispatch(self, events: Iterable[Dict]):
+        for event in events:
+            for subscription in list(self.subscriptions):
+                subscription.offer(event)
+
+    async def publish(self, db, events: List[Dict]):
+        """
+        Publish events as part of db's current transaction: subscribers get
+        them once it commits, and never if it rolls back
+        """
+        db.sync_session.info.setdefault(PENDING_EVENTS, []).append((self, events))
+
+
+@sa_event.listens_for(Session, "after_commit")
+def _dispatch_committed(session):
+    for broker, events in session.info.pop(PENDING_EVENTS, []):
+        broker.dispatch(events)
+
+
+@sa_event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session):
+    session.info.pop(PENDING_EVENTS, None)
+
+
+def _chunk_payloads(events: List[Dict]) -> List[str]:
+    """
+    Pack events into as few JSON-list payloads as fit under
+    MAX_PAYLOAD_BYTES; an event that cannot fit on its own (a very long
+    description) is sent as its resync_event
+    """
+    payloads, batch, size = [], [], 2
+    for event in events:
+        encoded = json.dumps(event, separators=(",", ":"))
+        if len(encoded) + 2 > MAX_PAYLOAD_BYTES:
+            encoded = json.dumps(resync_event(event), separators=(",", ":"))
+        if batch and size + len(encoded) + 1 > MAX_PAYLOAD_BYTES:
+            payloads.append("[" + ",".join(batch) + "]")
+            batch, size = [], 2
+        batch.append(encoded)
+        size += len(encoded) + 1
+    if batch:
+        payloads.append("[" + ",".join(batch) + "]")
+    return payloads
+
+
+class PostgresBroker(InProcessBroker):
+    """
+    Fans events out across workers with Postgres LISTEN/NOTIFY.
+
+    Publishing issues one NOTIFY per batch of events inside the write's
+    own transaction, so Postgres delivers them only when it commits and
+    in commit order; each worker holds a single LISTEN connection and hands
+    what it receives to its local subscribers, so one write reaches every
+    stream client without any per-client queries. LISTEN needs a
+    session-level connection: point EVENTS_DATABASE_URL straight at
+    Postgres when DATABASE_URL goes through a transaction-mode PgBouncer.
+    """
+
+    def __init__(self, listen_url: str):
+        super().__init__()
+        self.listen_dsn = make_url(listen_url).set(drivername="postgresql").render_as_string(hide_password=False)
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self._task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def publish(self, db, events: List[Dict]):
+        for payload in _chunk_payloads(events):
+            await db.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": CHANNEL, "payload": payload})
+
+    def _on_notify(self, connection, pid, channel, payload):
+        self.dispatch(json.loads(payload))
+
+    async def _listen(self):
+        import asyncpg
+
+        delay = 1
+        while True:
+            try:
+                conn = await asyncpg.connect(self.listen_dsn)
+                try:
+                    closed = asyncio.Event()
+                    conn.add_termination_listener(lambda c: closed.set())
+                    await conn.add_listener(CHANNEL, self._on_notify)
+                    delay = 1
+                    await closed.wait()
+                finally:
+                    await conn.close()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Slot event listener disconnected: {e}")
+            # Subscribers may have missed events while we were away
+            for subscription in list(self.subscriptions):
+                subscription.overflowed = True
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30)
+
+
+def build_broker(database_url: str):
+    """Pick the broker for the configured database"""
+    if make_url(database_url).get_backend_name() in ("postgresql", "postgres"):
+        return PostgresBroker(os.getenv("EVENTS_DATABASE_URL", database_url))
+    return InProcessBroker()
@@ -0,0 +1,105 @@
+import csv
+import io
+import os
+import zlib
+from typing import AsyncIterator, Iterable, Sequence
+
+import orjson
+
+from app.database import read_connection
+from app.serialization import SLOT_OUT_FIELDS, slot_rows
+
+# Rows fetched per round trip of the server-side cursor; each batch is
+# encoded and sent as one chunk, so memory stays flat however many rows
+# an export holds
+EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", "1000"))
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """Whether an Accept-Encoding header allows a gzip response body"""
+    for coding in (accept_encoding or "").lower().split(","):
+        name, _, params = coding.partition(";")
+        if name.strip() in ("gzip", "*"):
+            params = params.strip()
+            quality = params[2:] if params.startswith("q=") else "1"
+            try:
+                return float(quality) > 0
+            except ValueError:
+                return False
+    return False
+
+
+# ===== ENCODING =====
+# Both formats carry the fields GET /slots returns, encoded the same way
+# (slot_rows): dates and times as ISO strings, hold_expires_at in UTC.
+
+
+def ndjson_chunk(rows: Sequence) -> bytes:
+    """Slot rows (from select(*SLOT_LIST_COLUMNS)) as one JSON object per line"""
+    return b"".join(orjson.dumps(row, option=orjson.OPT_APPEND_NEWLINE) for row in slot_rows(rows))
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return value
+
+
+def csv_header() -> bytes:
+    return (",".join(SLOT_OUT_FIELDS) + "\r\n").encode()
+
+
+def csv_chunk(rows: Iterable) -> bytes:
+    """Slot rows as CSV lines, in csv_header() column order"""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([_csv_value(value) for value in row.values()] for row in slot_rows(rows))
+    return buffer.getvalue().encode()
+
+
+# ===== STREAMING =====
+
+
+async def stream_rows(stmt, batch_rows: int = EXPORT_BATCH_ROWS) -> AsyncIterator[Sequence]:
+    """
+    Run a select through a server-side cursor and yield its rows
+    batch_rows at a time, on a connection of its own held until the last
+    batch (a StreamingResponse body outlives the request's session), from
+    a read replica when there is one. On PostgreSQL the whole export
+    reads one snapshot.
+    """
+    conn = await read_connection()
+    try:
+        result = await conn.stream(stmt.execution_options(yield_per=batch_rows))
+        async for rows in result.partitions():
+            yield rows
+    finally:
+        await conn.close()
+
+
+async def export_slots(stmt, format: str, gzip: bool = False, batch_rows: int = EXPORT_BATCH_ROWS) -> AsyncIterator[bytes]:
+    """
+    Encode the rows of a select of slot columns as NDJSON or CSV (header
+    line first), a batch per chunk, gzip-compressed on the fly when asked.
+    """
+    encode = csv_chunk if format == "csv" else ndjson_chunk
+    compressor = zlib.compressobj(wbits=31) if gzip else None
+
+    def output(chunk: bytes) -> bytes:
+        return compressor.compress(chunk) if compressor else chunk
+
+    if format == "csv":
+        yield output(csv_header())
+    async for rows in stream_rows(stmt, batch_rows):
+        chunk = output(encode(rows))
+        # The compressor holds small chunks back until it has enough
+        if chunk:
+            yield chunk
+    if compressor:
+        yield compressor.flush()
@@ -0,0 +1,56 @@
+import asyncio
+import os
+import time
+from typing import Optional
+
+from sqlalchemy import text
+
+# /health/ready pings the database at most once per READY_CACHE_SECONDS
+# per worker, however often it is probed, and gives up on a ping after
+# READY_TIMEOUT_SECONDS
+READY_CACHE_SECONDS = float(os.getenv("READY_CACHE_SECONDS", "5"))
+READY_TIMEOUT_SECONDS = float(os.getenv("READY_TIMEOUT_SECONDS", "2"))
+
+
+class ReadinessCheck:
+    """
+    Cached database ping for readiness probes.
+
+    Probes arriving while a ping is in flight wait for that ping instead
+    of starting their own, and its result is reused until it is
+    READY_CACHE_SECONDS old, so load balancers and orchestrators polling
+    every worker cannot turn health checks into database load.
+    """
+
+    def __init__(self, engine, ttl: float = READY_CACHE_SECONDS, timeout: float = READY_TIMEOUT_SECONDS):
+        self.engine = engine
+        self.ttl = ttl
+        self.timeout = timeout
+        self.started = False
+        self._checked_at = float("-inf")
+        self._error: Optional[str] = "not checked yet"
+        self._lock = asyncio.Lock()
+
+    async def _ping(self):
+        async with self.engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    async def check(self) -> Optional[str]:
+        """Return None when ready, otherwise the reason the worker is not"""
+        if not self.started:
+            return "starting"
+        if time.monotonic() - self._checked_at < self.ttl:
+            return self._error
+        async with self._lock:
+            # Another probe may have refreshed the result while we waited
+            if time.monotonic() - self._checked_at < self.ttl:
+                return self._error
+            try:
+                await asyncio.wait_for(self._ping(), self.timeout)
+                self._error = None
+            except asyncio.TimeoutError:
+                self._error = f"database ping timed out after {self.timeout:g}s"
+            except Exception as e:
+                self._error = f"database unavailable: {type(e).__name__}"
+            self._checked_at = time.monotonic()
+            return self._error
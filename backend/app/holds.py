@@ -0,0 +1,92 @@
+import asyncio
+import datetime as dt
+import logging
+import os
+from typing import Awaitable, Callable, List, Optional
+
+from sqlalchemy import or_, select, update
+
+from app import models
+
+logger = logging.getLogger(__name__)
+
+# How long a hold keeps a slot reserved before it can be confirmed
+HOLD_TTL_SECONDS = int(os.getenv("HOLD_TTL_SECONDS", "600"))
+# How often the reaper looks for expired holds, and how many it releases
+# per UPDATE
+HOLD_REAP_INTERVAL = float(os.getenv("HOLD_REAP_INTERVAL", "5"))
+HOLD_REAP_BATCH = int(os.getenv("HOLD_REAP_BATCH", "500"))
+
+
+def utcnow() -> dt.datetime:
+    """Current time as the naive UTC datetime stored in hold_expires_at"""
+    return dt.datetime.now(dt.timezone.utc).replace(tzinfo=None)
+
+
+def hold_is_free(now: dt.datetime, user_id: Optional[int] = None):
+    """
+    Condition for a slot no one else is holding: no hold, a lapsed hold
+    the reaper has not released yet, or (given user_id) that user's own.
+    """
+    conditions = [models.Slot.held_by_user_id.is_(None), models.Slot.hold_expires_at <= now]
+    if user_id is not None:
+        conditions.append(models.Slot.held_by_user_id == user_id)
+    return or_(*conditions)
+
+
+async def release_expired_holds(
+    db,
+    now: Optional[dt.datetime] = None,
+    batch_size: int = HOLD_REAP_BATCH,
+    before_commit: Optional[Callable[[object, List[dict]], Awaitable]] = None,
+) -> List[dict]:
+    """
+    Clear every hold that expired before now, batch_size rows per UPDATE.
+
+    Each batch is picked through ix_slots_hold_expires_at and committed on
+    its own, so a sweep costs one statement per batch however many slots
+    the table holds, and never keeps many rows locked at once. Workers
+    reaping concurrently skip each other's rows on PostgreSQL.
+    before_commit(db, batch) runs inside each batch's transaction.
+    Returns the released slots.
+    """
+    now = now or utcnow()
+    released = []
+    while True:
+        # Picked once in a CTE: as an IN subquery PostgreSQL may run the
+        # LIMIT again for every row it checks, releasing far more than
+        # batch_size in one UPDATE
+        expired = (
+            select(models.Slot.id)
+            .where(models.Slot.hold_expires_at <= now)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+            .cte("expired")
+            .prefix_with("MATERIALIZED", dialect="postgresql")
+        )
+        stmt = (
+            update(models.Slot)
+            .where(models.Slot.id.in_(select(expired.c.id)), models.Slot.hold_expires_at <= now)
+            .values(held_by_user_id=None, hold_expires_at=None, version=models.Slot.version + 1)
+            .returning(*models.Slot.__table__.columns)
+            .execution_options(synchronize_session=False)
+        )
+        batch = [dict(row) for row in (await db.execute(stmt)).mappings()]
+        if batch and before_commit is not None:
+            await before_commit(db, batch)
+        await db.commit()
+        released.extend(batch)
+        if len(batch) < batch_size:
+            return released
+
+
+async def run_reaper(reap: Callable[[], Awaitable], interval: float = HOLD_REAP_INTERVAL):
+    """Call reap every interval seconds until cancelled, logging failures"""
+    while True:
+        try:
+            await reap()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error releasing expired holds: {str(e)}")
+        await asyncio.sleep(interval)
@@ -0,0 +1,370 @@
+import asyncio
+import datetime as dt
+import hashlib
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import List, NamedTuple, Optional, Tuple
+
+import orjson
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app import metrics, models
+from app.database import AsyncSessionLocal
+from app.holds import utcnow
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+# How long a completed response is replayed for
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+# How long a key stays reserved by a request that never completes (a
+# crashed worker); keep it above the gunicorn worker timeout
+IDEMPOTENCY_LOCK_SECONDS = int(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "60"))
+# How often expired keys are deleted, and how many per DELETE
+IDEMPOTENCY_PURGE_INTERVAL = float(os.getenv("IDEMPOTENCY_PURGE_INTERVAL", "300"))
+IDEMPOTENCY_PURGE_BATCH = int(os.getenv("IDEMPOTENCY_PURGE_BATCH", "1000"))
+MAX_KEY_LENGTH = 255
+
+# Only writes are deduplicated; GET and HEAD are safe to repeat anyway
+METHODS = ("POST", "PUT", "PATCH", "DELETE")
+
+
+class Record(NamedTuple):
+    """A key taken by an earlier request; status_code is None while it runs"""
+    fingerprint: str
+    status_code: Optional[int]
+    headers: List[Tuple[str, str]]
+    body: bytes
+
+
+# ===== BACKENDS =====
+# reserve() claims a key for a request with the given fingerprint and
+# returns None, or returns the Record of the request that already holds
+# it. The holder then calls complete() with its response, or release()
+# when it failed and a retry should run again. Keys expire: a reservation
+# after IDEMPOTENCY_LOCK_SECONDS, a completed response after
+# IDEMPOTENCY_TTL_SECONDS; an expired key can be reserved again.
+
+
+class MemoryIdempotencyStore:
+    """
+    Keys kept in this process, least recently used evicted first.
+
+    Only for a single worker: a retry handled by another worker or
+    container would not see the key, so use the database backend there.
+    """
+
+    def __init__(self, ttl: int = IDEMPOTENCY_TTL_SECONDS, lock_ttl: int = IDEMPOTENCY_LOCK_SECONDS,
+                 max_keys: int = 100000):
+        self.ttl = ttl
+        self.lock_ttl = lock_ttl
+        self.max_keys = max_keys
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    async def reserve(self, key: str, fingerprint: str) -> Optional[Record]:
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] > time.monotonic():
+            self._entries.move_to_end(key)
+            return entry[0]
+        self._entries[key] = (Record(fingerprint, None, [], b""), time.monotonic() + self.lock_ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_keys:
+            self._entries.popitem(last=False)
+        return None
+
+    async def complete(self, key: str, fingerprint: str, status_code: int, headers, body: bytes):
+        entry = self._entries.get(key)
+        if entry is not None and entry[0].fingerprint == fingerprint and entry[0].status_code is None:
+            self._entries[key] = (Record(fingerprint, status_code, headers, body), time.monotonic() + self.ttl)
+
+    async def release(self, key: str, fingerprint: str):
+        entry = self._entries.get(key)
+        if entry is not None and entry[0].fingerprint == fingerprint and entry[0].status_code is None:
+            del self._entries[key]
+
+    async def purge(self) -> int:
+        now = time.monotonic()
+        expired = [key for key, (_, expires_at) in self._entries.items() if expires_at <= now]
+        for key in expired:
+            del self._entries[key]
+        return len(expired)
+
+
+class DatabaseIdempotencyStore:
+    """
+    Keys in the idempotency_keys table, shared by every worker and
+    container. A replay is one primary key lookup; a new key costs an
+    INSERT before the request and an UPDATE after it.
+    """
+
+    def __init__(self, sessionmaker=AsyncSessionLocal, ttl: int = IDEMPOTENCY_TTL_SECONDS,
+                 lock_ttl: int = IDEMPOTENCY_LOCK_SECONDS, batch_size: int = IDEMPOTENCY_PURGE_BATCH):
+        self.sessionmaker = sessionmaker
+        self.ttl = ttl
+        self.lock_ttl = lock_ttl
+        self.batch_size = batch_size
+
+    async def reserve(self, key: str, fingerprint: str) -> Optional[Record]:
+        table = models.IdempotencyKey
+        async with self.sessionmaker() as db:
+            while True:
+                now = utcnow()
+                reservation = {
+                    "fingerprint": fingerprint, "status_code": None, "headers": None, "body": None,
+                    "expires_at": now + dt.timedelta(seconds=self.lock_ttl),
+                }
+                row = (await db.execute(
+                    select(table.fingerprint, table.status_code, table.headers, table.body, table.expires_at)
+                    .where(table.key == key)
+                )).first()
+                if row is None:
+                    try:
+                        await db.execute(insert(table).values(key=key, **reservation))
+                        await db.commit()
+                        return None
+                    except IntegrityError:
+                        # Another request inserted it first; look again
+                        await db.rollback()
+                        continue
+                if row.expires_at <= now:
+                    # Lapsed but not purged yet: take it over unless someone else just did
+                    taken = (await db.execute(
+                        update(table)
+                        .where(table.key == key, table.expires_at <= now)
+                        .values(**reservation)
+                        .returning(table.key)
+                    )).first()
+                    await db.commit()
+                    if taken is not None:
+                        return None
+                    continue
+                await db.rollback()
+                headers = [tuple(header) for header in orjson.loads(row.headers)] if row.headers else []
+                return Record(row.fingerprint, row.status_code, headers, row.body or b"")
+
+    async def complete(self, key: str, fingerprint: str, status_code: int, headers, body: bytes):
+        table = models.IdempotencyKey
+        async with self.sessionmaker() as db:
+            await db.execute(
+                update(table)
+                .where(table.key == key, table.fingerprint == fingerprint, table.status_code.is_(None))
+                .values(
+                    status_code=status_code, headers=orjson.dumps(headers), body=body,
+                    expires_at=utcnow() + dt.timedelta(seconds=self.ttl),
+                )
+            )
+            await db.commit()
+
+    async def release(self, key: str, fingerprint: str):
+        table = models.IdempotencyKey
+        async with self.sessionmaker() as db:
+            await db.execute(
+                delete(table)
+                .where(table.key == key, table.fingerprint == fingerprint, table.status_code.is_(None))
+            )
+            await db.commit()
+
+    async def purge(self) -> int:
+        """
+        Delete expired keys batch_size rows per committed DELETE, found
+        through ix_idempotency_keys_expires_at; workers purging at the same
+        time skip each other's rows on PostgreSQL.
+        """
+        table = models.IdempotencyKey
+        now = utcnow()
+        total = 0
+        async with self.sessionmaker() as db:
+            while True:
+                # Picked once in a CTE, as in holds.release_expired_holds:
+                # as an IN subquery PostgreSQL may run the LIMIT again
+                expired = (
+                    select(table.key)
+                    .where(table.expires_at <= now)
+                    .limit(self.batch_size)
+                    .with_for_update(skip_locked=True)
+                    .cte("expired")
+                    .prefix_with("MATERIALIZED", dialect="postgresql")
+                )
+                deleted = (await db.execute(
+                    delete(table).where(table.key.in_(select(expired.c.key)), table.expires_at <= now)
+                )).rowcount
+                await db.commit()
+                total += deleted
+                if deleted < self.batch_size:
+                    return total
+
+
+async def run_purger(store, interval: float = IDEMPOTENCY_PURGE_INTERVAL):
+    """Delete expired keys every interval seconds until cancelled, logging failures"""
+    while True:
+        try:
+            purged = await store.purge()
+            if purged:
+                logger.info(f"Purged {purged} expired idempotency keys")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error purging idempotency keys: {str(e)}")
+        await asyncio.sleep(interval)
+
+
+# ===== ASGI MIDDLEWARE =====
+
+
+def request_fingerprint(scope, body: bytes) -> str:
+    """Hash of what makes a request the same request: method, path, query and body"""
+    digest = hashlib.sha256()
+    for part in (scope["method"].encode(), scope["path"].encode(), scope.get("query_string", b""), body):
+        digest.update(len(part).to_bytes(8, "big"))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+async def send_json(send, status: int, detail: str, headers: Optional[list] = None):
+    body = orjson.dumps({"detail": detail})
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            *(headers or []),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class IdempotencyMiddleware:
+    """
+    Runs a write carrying an Idempotency-Key header at most once per key.
+
+    A retry with the same key and the same request gets the stored
+    response back (with Idempotent-Replayed: true) without reaching the
+    endpoint; a retry while the first request is still running gets 409
+    with Retry-After; reusing a key for a different request gets 422.
+    Responses with a 5xx status are not stored, so those can be retried.
+    """
+
+    def __init__(self, app, store):
+        self.app = app
+        self.store = store
+        self.header = IDEMPOTENCY_HEADER.lower().encode()
+
+    def idempotency_key(self, scope) -> Optional[str]:
+        for name, value in scope["headers"]:
+            if name == self.header and value:
+                return value.decode("latin-1")
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.store is None or scope["method"] not in METHODS:
+            await self.app(scope, receive, send)
+            return
+        key = self.idempotency_key(scope)
+        if key is None:
+            await self.app(scope, receive, send)
+            return
+        if len(key) > MAX_KEY_LENGTH:
+            await send_json(send, 400, f"{IDEMPOTENCY_HEADER} is longer than {MAX_KEY_LENGTH} characters")
+            return
+
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                return
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                break
+        body = b"".join(chunks)
+        fingerprint = request_fingerprint(scope, body)
+
+        body_sent = False
+
+        async def receive_body():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        try:
+            record = await self.store.reserve(key, fingerprint)
+        except Exception as e:
+            # Never turn an idempotency store outage into an API outage
+            logger.warning(f"Idempotency store unavailable, running request: {str(e)}")
+            await self.app(scope, receive_body, send)
+            return
+
+        if record is not None:
+            if record.fingerprint != fingerprint:
+                metrics.IDEMPOTENT_REQUESTS.labels("mismatch").inc()
+                await send_json(send, 422, f"{IDEMPOTENCY_HEADER} was already used for a different request")
+            elif record.status_code is None:
+                metrics.IDEMPOTENT_REQUESTS.labels("in_progress").inc()
+                await send_json(
+                    send, 409, f"A request with this {IDEMPOTENCY_HEADER} is still in progress",
+                    [(b"retry-after", b"1")],
+                )
+            else:
+                metrics.IDEMPOTENT_REQUESTS.labels("replayed").inc()
+                await send({
+                    "type": "http.response.start",
+                    "status": record.status_code,
+                    "headers": [
+                        *((name.encode("latin-1"), value.encode("latin-1")) for name, value in record.headers),
+                        (b"content-length", str(len(record.body)).encode()),
+                        (REPLAYED_HEADER.lower().encode(), b"true"),
+                    ],
+                })
+                await send({"type": "http.response.body", "body": record.body})
+            return
+
+        metrics.IDEMPOTENT_REQUESTS.labels("new").inc()
+        status_code = None
+        headers = []
+        response_chunks = []
+
+        async def capture(message):
+            nonlocal status_code, headers
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = [
+                    (name.decode("latin-1"), value.decode("latin-1"))
+                    for name, value in message.get("headers", [])
+                    if name.lower() != b"content-length"
+                ]
+            elif message["type"] == "http.response.body":
+                response_chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive_body, capture)
+        finally:
+            try:
+                if status_code is not None and status_code < 500:
+                    await self.store.complete(key, fingerprint, status_code, headers, b"".join(response_chunks))
+                else:
+                    await self.store.release(key, fingerprint)
+            except Exception as e:
+                logger.warning(f"Error storing idempotent response for key {key}: {str(e)}")
+
+
+def build_idempotency_store():
+    """
+    Create the idempotency store from the environment, or None when disabled.
+
+    IDEMPOTENCY_BACKEND is "database" (the default; the idempotency_keys
+    table), "memory" (a single worker only) or "none".
+    """
+    backend_name = os.getenv("IDEMPOTENCY_BACKEND", "database")
+
+    if backend_name == "database":
+        return DatabaseIdempotencyStore()
+    if backend_name == "memory":
+        return MemoryIdempotencyStore()
+    return None
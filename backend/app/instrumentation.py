@@ -0,0 +1,144 @@
+import contextvars
+import hashlib
+import logging
+import os
+import re
+import time
+from typing import Optional
+
+from sqlalchemy import event
+
+from app import metrics
+
+logger = logging.getLogger(__name__)
+
+# Queries slower than this are logged with their fingerprint
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+
+
+class RequestStats:
+    """Database work done on behalf of the current request"""
+
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+# Set by RequestMetricsMiddleware; SQLAlchemy runs engine events in the
+# context of the task (or threadpool call) that issued the query
+_request_stats: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar("request_stats", default=None)
+
+
+# ===== QUERY FINGERPRINTS =====
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LISTS = re.compile(r"\((?:\s*(?:\?|%\(\w+\)s|\$\d+|:\w+|__\[POSTCOMPILE_\w+\])\s*,?)+\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def fingerprint(statement: str) -> str:
+    """
+    Normalize a statement so all executions of the same query share a
+    fingerprint: literals become ?, IN/VALUES lists collapse, whitespace
+    is squeezed. Returns a short hash of the normalized text.
+    """
+    normalized = _LITERALS.sub("?", statement)
+    normalized = _PLACEHOLDER_LISTS.sub("(...)", normalized)
+    normalized = _WHITESPACE.sub(" ", normalized).strip()
+    return hashlib.blake2b(normalized.encode(), digest_size=6).hexdigest()
+
+
+# ===== ENGINE HOOKS =====
+
+
+def instrument_queries(engine, label: str):
+    """Time every statement the engine runs and attribute it to the current request"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _finish(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        metrics.DB_QUERY_SECONDS.labels(label).observe(elapsed)
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_seconds += elapsed
+        if elapsed * 1000 >= SLOW_QUERY_MS:
+            logger.warning(
+                f"Slow query {elapsed * 1000:.1f}ms [{fingerprint(statement)}] on {label}: "
+                f"{_WHITESPACE.sub(' ', statement)[:500]}"
+            )
+
+    @event.listens_for(engine, "handle_error")
+    def _failed(exception_context):
+        # after_cursor_execute does not run for failed statements
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_start"):
+            conn.info["query_start"].pop()
+
+
+# ===== ASGI MIDDLEWARE =====
+
+
+class RequestMetricsMiddleware:
+    """
+    Records latency per route template, requests in flight, and database
+    queries and time per request, and reports the request's own timings
+    to the client in a Server-Timing header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._route_paths = None
+
+    def route_path(self, scope) -> str:
+        # The router leaves the matched endpoint in the scope; label by
+        # the route template so ids in paths do not explode cardinality
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        if self._route_paths is None:
+            self._route_paths = {
+                route.endpoint: route.path for route in scope["app"].routes if hasattr(route, "endpoint")
+            }
+        return self._route_paths.get(endpoint, "unmatched")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        start = time.perf_counter()
+        status = 500
+        metrics.HTTP_IN_FLIGHT.labels(method).inc()
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                total_ms = (time.perf_counter() - start) * 1000
+                timing = (
+                    f'app;dur={total_ms:.1f}, '
+                    f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.queries} queries"'
+                )
+                message["headers"] = [*message.get("headers", []), (b"server-timing", timing.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            elapsed = time.perf_counter() - start
+            route = self.route_path(scope)
+            metrics.HTTP_IN_FLIGHT.labels(method).dec()
+            metrics.HTTP_REQUEST_SECONDS.labels(method, route, str(status)).observe(elapsed)
+            metrics.HTTP_REQUEST_QUERIES.labels(method, route).observe(stats.queries)
+            metrics.HTTP_REQUEST_DB_SECONDS.labels(method, route).observe(stats.db_seconds)
+            _request_stats.reset(token)
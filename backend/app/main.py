@@ -1,10 +1,33 @@
+import asyncio
+import datetime as dt
+import json
 import os
-from fastapi import FastAPI, Depends, HTTPException, Body, Path, Query
+from contextlib import asynccontextmanager
+from itertools import islice
+from fastapi import FastAPI, Depends, HTTPException, Body, Header, Path, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from app import models, schemas
-from app.database import engine, get_db
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.exc import StaleDataError
+from app import availability, events, export, health, holds, migrate, models, overview, schemas, search
+from app.cache import CANCELLATIONS, build_cache, list_scopes, slot_scopes
+from app.database import (
+    DATABASE_URL, AsyncSessionLocal, ReadYourWritesMiddleware, async_engine, get_async_db, get_read_db,
+    pinned_to_primary, read_router,
+)
+from app.etags import body_etag, etag_matches, not_modified, rows_etag, slot_etag
+from app.idempotency import REPLAYED_HEADER, IdempotencyMiddleware, build_idempotency_store, run_purger
+from app.instrumentation import RequestMetricsMiddleware
+from app.metrics import render_metrics
+from app.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, SLOT_ORDER, InvalidCursor, paginate_slots
+from app.ratelimit import RateLimitMiddleware, build_rate_limiter
+from app.recurrence import expand_recurrence
+from app.routers import place as place_router
+from app.serialization import SLOT_LIST_COLUMNS, slot_rows_body
 from typing import List, Optional
+import orjson
 import logging
 from dotenv import load_dotenv
 
@@ -15,14 +38,49 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Create database tables
-models.Base.metadata.create_all(bind=engine)
-
 # Get environment configuration
 ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
 DEBUG = os.getenv("DEBUG", "true").lower() == "true"
+MAX_BULK_SLOTS = int(os.getenv("MAX_BULK_SLOTS", "5000"))
+STREAM_HEARTBEAT_SECONDS = float(os.getenv("STREAM_HEARTBEAT_SECONDS", "15"))
+# Migrations run once per deploy (python init_db.py); workers only check
+# that the database is at the latest revision and refuse to start if not.
+# For local SQLite development they run the migrations themselves unless
+# AUTO_MIGRATE=false
+AUTO_MIGRATE = os.getenv("AUTO_MIGRATE", str(DATABASE_URL.startswith("sqlite"))).lower() in ("1", "true", "yes")
 ALLOWED_ORIGINS = os.getenv("ALLOWED_ORIGINS", "http://localhost:3000,http://manikandan.info,https://manikandan.info,http://appointment-booking-platform-1644783152.ap-south-1.elb.amazonaws.com").split(",")
 
+# Read-through cache for slot listings (see app/cache.py)
+slot_cache = build_cache()
+# Pushes slot changes to /slots/stream clients (see app/events.py)
+slot_events = events.build_broker(DATABASE_URL)
+# Cached database ping behind /health/ready (see app/health.py)
+readiness = health.ReadinessCheck(async_engine)
+# Responses replayed to retried writes (see app/idempotency.py)
+idempotency_store = build_idempotency_store()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if AUTO_MIGRATE:
+        await asyncio.to_thread(migrate.upgrade_database)
+    else:
+        await asyncio.to_thread(migrate.check_schema_current)
+    await slot_events.start()
+    background = [asyncio.create_task(holds.run_reaper(reap_expired_holds))]
+    if idempotency_store is not None:
+        background.append(asyncio.create_task(run_purger(idempotency_store)))
+    readiness.started = True
+    yield
+    readiness.started = False
+    for task in background:
+        task.cancel()
+    # Let an in-flight sweep unwind before its connection is disposed
+    await asyncio.gather(*background, return_exceptions=True)
+    await slot_events.stop()
+    # Close pooled async connections so workers shut down cleanly
+    await async_engine.dispose()
+    await read_router.dispose()
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Schedulink API",
@@ -30,7 +88,26 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs" if DEBUG else None,  # Disable docs in production
     redoc_url="/redoc" if DEBUG else None,
-    openapi_url="/openapi.json" if DEBUG else None
+    openapi_url="/openapi.json" if DEBUG else None,
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
+)
+
+# Idempotency-Key handling for writes; innermost, so rate-limited retries
+# never reach the store
+app.add_middleware(IdempotencyMiddleware, store=idempotency_store)
+
+# Sends a client's reads to the primary for a while after it writes, when
+# GETs are spread over read replicas (see app/database.py); outside
+# idempotency, so a replayed write pins the client too
+app.add_middleware(ReadYourWritesMiddleware, key_header=os.getenv("RATE_LIMIT_KEY_HEADER"))
+
+# Per-client token buckets (see app/ratelimit.py); inside CORS so 429s
+# still carry the CORS headers browsers need to read them
+app.add_middleware(
+    RateLimitMiddleware,
+    limiter=build_rate_limiter(),
+    key_header=os.getenv("RATE_LIMIT_KEY_HEADER"),
 )
 
 # Enable CORS with environment-specific origins
@@ -40,8 +117,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag", "Server-Timing", "Retry-After", REPLAYED_HEADER],
 )
 
+# Outermost, so its timings cover everything else (see app/instrumentation.py)
+app.add_middleware(RequestMetricsMiddleware)
+
 # Root endpoint
 @app.get("/")
 def read_root():
@@ -57,20 +138,20 @@ def test_endpoint():
 # ===== USER ENDPOINTS =====
 
 @app.post("/users", response_model=schemas.UserOut)
-def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
+async def create_user(user: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
     """Create a new user"""
     logger.info(f"Attempting to create user with email: {user.email}")
     try:
         # Check if email already exists
-        db_user = db.query(models.User).filter(models.User.email == user.email).first()
+        db_user = await db.scalar(select(models.User).where(models.User.email == user.email))
         if db_user:
             raise HTTPException(status_code=400, detail="Email already registered")
         
         # Create new user
-        new_user = models.User(**user.dict())
+        new_user = models.User(**user.model_dump())
         db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
+        await db.commit()
+        await db.refresh(new_user)
         logger.info(f"Created user: {new_user.email}")
         return new_user
     except HTTPException:
@@ -80,11 +161,11 @@ def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @app.get("/users", response_model=List[schemas.UserOut])
-def list_users(db: Session = Depends(get_db)):
+async def list_users(db: AsyncSession = Depends(get_read_db)):
     """Get all users"""
     logger.info("Fetching all users")
     try:
-        users = db.query(models.User).all()
+        users = (await db.scalars(select(models.User))).all()
         logger.info(f"Found {len(users)} users")
         return users
     except Exception as e:
@@ -92,13 +173,22 @@ def list_users(db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @app.get("/users/{user_id}", response_model=schemas.UserOut)
-def get_user(user_id: int, db: Session = Depends(get_db)):
+async def get_user(
+    user_id: int,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_db)
+):
     """Get a specific user by ID"""
     try:
-        user = db.query(models.User).filter(models.User.id == user_id).first()
+        user = await db.get(models.User, user_id)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
-        return user
+        
+        body = schemas.UserOut.model_validate(user).model_dump_json().encode()
+        etag = body_etag(body)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        return Response(content=body, media_type="application/json", headers={"ETag": etag})
     except HTTPException:
         raise
     except Exception as e:
@@ -107,21 +197,65 @@ def get_user(user_id: int, db: Session = Depends(get_db)):
 
 # ===== SLOT ENDPOINTS =====
 
+def raise_for_slot_integrity_error(error: IntegrityError):
+    """Translate a constraint violation on slot writes into an HTTP error"""
+    if models.is_overlap_error(error):
+        raise HTTPException(status_code=409, detail="Slot overlaps an existing slot for this user")
+    # Every foreign key on slots references users
+    if models.is_foreign_key_error(error):
+        raise HTTPException(status_code=404, detail="User not found")
+    column = models.not_null_column(error)
+    if column:
+        raise HTTPException(status_code=422, detail=f"{column} must not be null")
+    raise HTTPException(status_code=422, detail="Slot violates a database constraint")
+
+async def publish_slot_events(db: AsyncSession, *changes: dict):
+    """
+    Push slot events to stream clients as part of db's transaction: call
+    before committing the write; clients see them only once it commits
+    """
+    await slot_events.publish(db, list(changes))
+
+async def cached_slot_list(cache_key: str, load, if_none_match: Optional[str] = None):
+    """
+    Serve a slot list from the cache, or load, serialize and cache it;
+    concurrent identical misses share one load (see ResponseCache).
+    load returns rows selected with SLOT_LIST_COLUMNS, which are encoded
+    directly rather than validated through SlotOut one by one.
+    Answers 304 when If-None-Match still matches.
+    """
+    async def load_body():
+        slots, headers = await load()
+        headers["ETag"] = rows_etag(slots, extra=headers.get(NEXT_CURSOR_HEADER, ""))
+        return slot_rows_body(slots), headers
+
+    body, headers = await slot_cache.get_or_load(cache_key, load_body, fresh=pinned_to_primary())
+    if etag_matches(if_none_match, headers["ETag"]):
+        return not_modified(headers["ETag"])
+    return Response(content=body, media_type="application/json", headers=headers)
+
 @app.post("/slots", response_model=schemas.SlotOut)
-def create_slot(slot: schemas.SlotCreate, db: Session = Depends(get_db)):
+async def create_slot(slot: schemas.SlotCreate, db: AsyncSession = Depends(get_async_db)):
     """Create a new appointment slot"""
     try:
         # Validate user exists if user_id is provided
         if slot.user_id:
-            user = db.query(models.User).filter(models.User.id == slot.user_id).first()
+            user = await db.get(models.User, slot.user_id)
             if not user:
                 raise HTTPException(status_code=404, detail="User not found")
         
         # Create new slot
-        new_slot = models.Slot(**slot.dict())
+        new_slot = models.Slot(**slot.model_dump())
         db.add(new_slot)
-        db.commit()
-        db.refresh(new_slot)
+        try:
+            await db.flush()
+            await db.refresh(new_slot)
+            await publish_slot_events(db, events.slot_event(events.CREATED, new_slot))
+            await db.commit()
+        except IntegrityError as e:
+            await db.rollback()
+            raise_for_slot_integrity_error(e)
+        await slot_cache.invalidate(slot_scopes(new_slot))
         logger.info(f"Created slot: {new_slot.title} on {new_slot.date}")
         return new_slot
     except HTTPException:
@@ -130,62 +264,369 @@ def create_slot(slot: schemas.SlotCreate, db: Session = Depends(get_db)):
         logger.error(f"Error creating slot: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+async def insert_slots(db: AsyncSession, rows: List[dict]) -> List[dict]:
+    """Insert many slots in one transaction using batched multi-row INSERTs"""
+    if not rows:
+        return []
+    stmt = insert(models.Slot).returning(*models.Slot.__table__.columns)
+    try:
+        result = await db.execute(stmt, rows)
+        created = [dict(row) for row in result.mappings()]
+        await publish_slot_events(db, *(events.slot_event(events.CREATED, slot) for slot in created))
+        await db.commit()
+    except IntegrityError as e:
+        await db.rollback()
+        raise_for_slot_integrity_error(e)
+    await slot_cache.invalidate(set().union(*(slot_scopes(slot) for slot in created)))
+    return created
+
+@app.post("/slots/bulk", response_model=List[schemas.SlotOut])
+async def create_slots_bulk(
+    slots: List[schemas.SlotCreate] = Body(..., max_length=MAX_BULK_SLOTS),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Create many appointment slots in a single transaction"""
+    try:
+        created = await insert_slots(db, [slot.model_dump() for slot in slots])
+        logger.info(f"Bulk created {len(created)} slots")
+        return created
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error bulk creating slots: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@app.post("/slots/recurring", response_model=List[schemas.SlotOut])
+async def create_recurring_slots(rule: schemas.SlotRecurrence, db: AsyncSession = Depends(get_async_db)):
+    """Generate slots from a recurring availability rule and create them in one transaction"""
+    try:
+        rows = list(islice(expand_recurrence(rule), MAX_BULK_SLOTS + 1))
+        if len(rows) > MAX_BULK_SLOTS:
+            raise HTTPException(status_code=400, detail=f"Rule generates more than {MAX_BULK_SLOTS} slots")
+        
+        created = await insert_slots(db, rows)
+        logger.info(f"Created {len(created)} recurring slots from {rule.start_date} to {rule.end_date}")
+        return created
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error creating recurring slots: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+def filter_slots(stmt, date=None, date_from=None, date_to=None, is_booked=None, user_id=None):
+    """Apply the GET /slots filters to a select of slot columns"""
+    if date:
+        stmt = stmt.where(models.Slot.date == date)
+    if date_from:
+        stmt = stmt.where(models.Slot.date >= date_from)
+    if date_to:
+        stmt = stmt.where(models.Slot.date <= date_to)
+    if is_booked is not None:
+        stmt = stmt.where(models.Slot.is_booked == is_booked)
+    if user_id:
+        stmt = stmt.where(models.Slot.user_id == user_id)
+    return stmt
+
 @app.get("/slots", response_model=List[schemas.SlotOut])
-def list_slots(
-    date: Optional[str] = Query(None, description="Filter by date (YYYY-MM-DD)"),
+async def list_slots(
+    response: Response,
+    date: Optional[dt.date] = Query(None, description="Filter by date (YYYY-MM-DD)"),
+    date_from: Optional[dt.date] = Query(None, description="Only slots on or after this date (YYYY-MM-DD)"),
+    date_to: Optional[dt.date] = Query(None, description="Only slots on or before this date (YYYY-MM-DD)"),
     is_booked: Optional[bool] = Query(None, description="Filter by booking status"),
     user_id: Optional[int] = Query(None, description="Filter by user ID"),
-    db: Session = Depends(get_db)
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Maximum number of slots to return"),
+    cursor: Optional[str] = Query(None, description=f"Cursor from the {NEXT_CURSOR_HEADER} header of the previous page"),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """Get all slots with optional filters"""
+    """Get slots ordered by date and start time, one page at a time"""
     try:
-        query = db.query(models.Slot)
+        stmt = filter_slots(select(*SLOT_LIST_COLUMNS), date, date_from, date_to, is_booked, user_id)
         
-        # Apply filters
-        if date:
-            query = query.filter(models.Slot.date == date)
-        if is_booked is not None:
-            query = query.filter(models.Slot.is_booked == is_booked)
-        if user_id:
-            query = query.filter(models.Slot.user_id == user_id)
+        async def load():
+            slots, next_cursor = await paginate_slots(db, stmt, limit, cursor)
+            return slots, {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
         
-        slots = query.all()
-        return slots
+        filters = {
+            "date": date, "date_from": date_from, "date_to": date_to, "is_booked": is_booked,
+            "user_id": user_id, "limit": limit, "cursor": cursor,
+        }
+        cache_key = await slot_cache.key("slots", filters, list_scopes(date, user_id))
+        return await cached_slot_list(cache_key, load, if_none_match)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching slots: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@app.get("/slots/stream")
+async def stream_slots(
+    request: Request,
+    date: Optional[dt.date] = Query(None, description="Only push changes to slots on this date (YYYY-MM-DD)"),
+    user_id: Optional[int] = Query(None, description="Only push changes to this provider's slots"),
+):
+    """
+    Server-Sent Events stream of slot changes (created, updated, booked,
+    cancelled, deleted), so clients need not poll GET /slots.
+
+    Each event's data is the slot as GET /slots returns it. A "resync"
+    event means changes were missed: refetch GET /slots and reconnect.
+    """
+    subscription = slot_events.subscribe(date.isoformat() if date else None, user_id)
+
+    async def event_stream():
+        try:
+            yield ": connected\n\n"
+            while not await request.is_disconnected():
+                if subscription.overflowed:
+                    yield "event: resync\ndata: {}\n\n"
+                    return
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    # Keep proxies from closing an idle connection
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event['slot'], separators=(',', ':'))}\n\n"
+        finally:
+            slot_events.unsubscribe(subscription)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/slots/search", response_model=List[schemas.SlotOut])
+async def search_slots(
+    q: str = Query(..., min_length=1, max_length=200, description="Words to find in slot titles and descriptions"),
+    date: Optional[dt.date] = Query(None, description="Filter by date (YYYY-MM-DD)"),
+    date_from: Optional[dt.date] = Query(None, description="Only slots on or after this date (YYYY-MM-DD)"),
+    date_to: Optional[dt.date] = Query(None, description="Only slots on or before this date (YYYY-MM-DD)"),
+    is_booked: Optional[bool] = Query(None, description="Filter by booking status"),
+    user_id: Optional[int] = Query(None, description="Filter by user ID"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Maximum number of slots to return"),
+    cursor: Optional[str] = Query(None, description=f"Cursor from the {NEXT_CURSOR_HEADER} header of the previous page"),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Full-text search over slot titles and descriptions: slots containing
+    every word of q (in any form, e.g. "cleaning" finds "clean"), best
+    matches first, one page at a time. Takes the GET /slots filters. When
+    more than SEARCH_MAX_RANKED slots match, only the most recently
+    created that many are ranked and returned.
+    """
+    try:
+        terms = search.search_terms(q)
+        if not terms:
+            raise HTTPException(status_code=400, detail="q must contain at least one word")
+        stmt = filter_slots(select(*SLOT_LIST_COLUMNS), date, date_from, date_to, is_booked, user_id)
+        
+        async def load():
+            slots, next_cursor = await search.search_slots(db, stmt, terms, limit, cursor)
+            return slots, {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
+        
+        filters = {
+            "q": " ".join(terms), "date": date, "date_from": date_from, "date_to": date_to,
+            "is_booked": is_booked, "user_id": user_id, "limit": limit, "cursor": cursor,
+        }
+        cache_key = await slot_cache.key("search", filters, list_scopes(date, user_id))
+        return await cached_slot_list(cache_key, load, if_none_match)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error searching slots: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+def export_response(stmt, format: str, filename: str, accept_encoding: Optional[str]):
+    """Stream a select of slot columns as an NDJSON or CSV download"""
+    gzip = export.accepts_gzip(accept_encoding)
+    headers = {"Content-Disposition": f'attachment; filename="{filename}.{format}"', "Vary": "Accept-Encoding"}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        export.export_slots(stmt.order_by(*SLOT_ORDER), format, gzip),
+        media_type=export.EXPORT_MEDIA_TYPES[format],
+        headers=headers,
+    )
+
+@app.get("/slots/export")
+async def export_slots(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="ndjson (one JSON slot per line) or csv"),
+    date: Optional[dt.date] = Query(None, description="Filter by date (YYYY-MM-DD)"),
+    date_from: Optional[dt.date] = Query(None, description="Only slots on or after this date (YYYY-MM-DD)"),
+    date_to: Optional[dt.date] = Query(None, description="Only slots on or before this date (YYYY-MM-DD)"),
+    is_booked: Optional[bool] = Query(None, description="Filter by booking status"),
+    user_id: Optional[int] = Query(None, description="Filter by user ID"),
+    accept_encoding: Optional[str] = Header(None),
+):
+    """
+    Every slot matching the GET /slots filters, ordered by date and start
+    time, streamed as NDJSON or CSV rather than built in memory; gzipped
+    when the client accepts it.
+    """
+    stmt = filter_slots(select(*SLOT_LIST_COLUMNS), date, date_from, date_to, is_booked, user_id)
+    return export_response(stmt, format, "slots", accept_encoding)
+
+async def raise_slot_unavailable(db: AsyncSession, slot_id: int):
+    """Explain why a conditional slot UPDATE matched nothing"""
+    is_booked = await db.scalar(select(models.Slot.is_booked).where(models.Slot.id == slot_id))
+    if is_booked is None:
+        raise HTTPException(status_code=404, detail="Slot not found")
+    if is_booked:
+        raise HTTPException(status_code=400, detail="Slot is already booked")
+    raise HTTPException(status_code=400, detail="Slot is held by another user")
+
+async def reap_expired_holds():
+    """Release lapsed holds; run in the background by the lifespan"""
+    async def publish_released(db, batch):
+        await publish_slot_events(db, *(events.slot_event(events.RELEASED, slot) for slot in batch))
+
+    async with AsyncSessionLocal() as db:
+        released = await holds.release_expired_holds(db, before_commit=publish_released)
+    if released:
+        await slot_cache.invalidate(set().union(*(slot_scopes(slot) for slot in released)))
+        logger.info(f"Released {len(released)} expired holds")
+
+@app.post("/slots/{slot_id}/hold", response_model=schemas.SlotOut)
+async def hold_slot(
+    slot_id: int = Path(..., description="ID of the slot to hold"),
+    booking: schemas.SlotBooking = Body(...),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Reserve a slot for HOLD_TTL_SECONDS while the user checks out.
+    Holding again before it lapses extends the hold.
+    """
+    try:
+        now = holds.utcnow()
+        stmt = (
+            update(models.Slot)
+            .where(
+                models.Slot.id == slot_id,
+                models.Slot.is_booked.is_(False),
+                holds.hold_is_free(now, booking.user_id),
+            )
+            .values(
+                held_by_user_id=booking.user_id,
+                hold_expires_at=now + dt.timedelta(seconds=holds.HOLD_TTL_SECONDS),
+                version=models.Slot.version + 1,
+            )
+            .returning(*models.Slot.__table__.columns)
+            .execution_options(synchronize_session=False)
+        )
+        try:
+            slot = (await db.execute(stmt)).mappings().first()
+            if slot is not None:
+                await publish_slot_events(db, events.slot_event(events.HELD, slot))
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            raise HTTPException(status_code=404, detail="User not found")
+        
+        if slot is None:
+            await raise_slot_unavailable(db, slot_id)
+        
+        await slot_cache.invalidate(slot_scopes(slot))
+        logger.info(f"Slot {slot_id} held by user {booking.user_id}")
+        return dict(slot)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error holding slot {slot_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@app.post("/slots/{slot_id}/confirm", response_model=schemas.SlotOut)
+async def confirm_slot(
+    slot_id: int = Path(..., description="ID of the held slot to book"),
+    booking: schemas.SlotBooking = Body(...),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Book a slot the user holds, provided the hold has not lapsed"""
+    try:
+        stmt = (
+            update(models.Slot)
+            .where(
+                models.Slot.id == slot_id,
+                models.Slot.is_booked.is_(False),
+                models.Slot.held_by_user_id == booking.user_id,
+                models.Slot.hold_expires_at > holds.utcnow(),
+            )
+            .values(
+                is_booked=True, booked_by_user_id=booking.user_id,
+                held_by_user_id=None, hold_expires_at=None, version=models.Slot.version + 1,
+            )
+            .returning(*models.Slot.__table__.columns)
+            .execution_options(synchronize_session=False)
+        )
+        slot = (await db.execute(stmt)).mappings().first()
+        if slot is not None:
+            await publish_slot_events(db, events.slot_event(events.BOOKED, slot))
+        await db.commit()
+        
+        if slot is None:
+            is_booked = await db.scalar(select(models.Slot.is_booked).where(models.Slot.id == slot_id))
+            if is_booked is None:
+                raise HTTPException(status_code=404, detail="Slot not found")
+            if is_booked:
+                raise HTTPException(status_code=400, detail="Slot is already booked")
+            raise HTTPException(status_code=400, detail="No active hold on this slot for this user")
+        
+        await slot_cache.invalidate(slot_scopes(slot))
+        logger.info(f"Slot {slot_id} confirmed by user {booking.user_id}")
+        return dict(slot)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error confirming slot {slot_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
 # ✅ Book a slot
 @app.patch("/slots/{slot_id}/book", response_model=schemas.SlotOut)
-def book_slot(
+async def book_slot(
     slot_id: int = Path(..., description="ID of the slot to book"),
     booking: schemas.SlotBooking = Body(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Book an available slot"""
     try:
-        # Find the slot
-        slot = db.query(models.Slot).filter(models.Slot.id == slot_id).first()
-        if not slot:
-            raise HTTPException(status_code=404, detail="Slot not found")
-        
-        # Check if slot is already booked
-        if slot.is_booked:
-            raise HTTPException(status_code=400, detail="Slot is already booked")
-        
-        # Verify the user exists
-        user = db.query(models.User).filter(models.User.id == booking.user_id).first()
-        if not user:
+        # Claim the slot in a single conditional UPDATE so concurrent
+        # requests cannot both see it as free; the database enforces
+        # that the booking user exists through the foreign key.
+        stmt = (
+            update(models.Slot)
+            .where(
+                models.Slot.id == slot_id,
+                models.Slot.is_booked.is_(False),
+                holds.hold_is_free(holds.utcnow(), booking.user_id),
+            )
+            .values(
+                is_booked=True, booked_by_user_id=booking.user_id,
+                held_by_user_id=None, hold_expires_at=None, version=models.Slot.version + 1,
+            )
+            .returning(*models.Slot.__table__.columns)
+            .execution_options(synchronize_session=False)
+        )
+        try:
+            slot = (await db.execute(stmt)).mappings().first()
+            if slot is not None:
+                await publish_slot_events(db, events.slot_event(events.BOOKED, slot))
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
             raise HTTPException(status_code=404, detail="User not found")
         
-        # Book the slot
-        slot.is_booked = True
-        slot.booked_by_user_id = booking.user_id
-        db.commit()
-        db.refresh(slot)
+        if slot is None:
+            # Nothing matched: only now find out why
+            await raise_slot_unavailable(db, slot_id)
         
+        await slot_cache.invalidate(slot_scopes(slot))
         logger.info(f"Slot {slot_id} booked by user {booking.user_id}")
-        return slot
+        return dict(slot)
     except HTTPException:
         raise
     except Exception as e:
@@ -193,27 +634,33 @@ def book_slot(
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @app.patch("/slots/{slot_id}/cancel", response_model=schemas.SlotOut)
-def cancel_booking(
+async def cancel_booking(
     slot_id: int = Path(..., description="ID of the slot to cancel"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Cancel a booking for a slot"""
     try:
-        slot = db.query(models.Slot).filter(models.Slot.id == slot_id).first()
-        if not slot:
-            raise HTTPException(status_code=404, detail="Slot not found")
+        stmt = (
+            update(models.Slot)
+            .where(models.Slot.id == slot_id, models.Slot.is_booked.is_(True))
+            .values(is_booked=False, booked_by_user_id=None, version=models.Slot.version + 1)
+            .returning(*models.Slot.__table__.columns)
+            .execution_options(synchronize_session=False)
+        )
+        slot = (await db.execute(stmt)).mappings().first()
+        if slot is not None:
+            await publish_slot_events(db, events.slot_event(events.CANCELLED, slot))
+        await db.commit()
         
-        if not slot.is_booked:
+        if slot is None:
+            exists = await db.scalar(select(models.Slot.id).where(models.Slot.id == slot_id))
+            if not exists:
+                raise HTTPException(status_code=404, detail="Slot not found")
             raise HTTPException(status_code=400, detail="Slot is not booked")
         
-        # Cancel the booking
-        slot.is_booked = False
-        slot.booked_by_user_id = None
-        db.commit()
-        db.refresh(slot)
-        
+        await slot_cache.invalidate(slot_scopes(slot, cancelled=True))
         logger.info(f"Booking cancelled for slot {slot_id}")
-        return slot
+        return dict(slot)
     except HTTPException:
         raise
     except Exception as e:
@@ -221,12 +668,22 @@ def cancel_booking(
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @app.get("/slots/{slot_id}", response_model=schemas.SlotOut)
-def get_slot(slot_id: int, db: Session = Depends(get_db)):
+async def get_slot(
+    slot_id: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_db)
+):
     """Get a specific slot by ID"""
     try:
-        slot = db.query(models.Slot).filter(models.Slot.id == slot_id).first()
+        slot = await db.get(models.Slot, slot_id)
         if not slot:
             raise HTTPException(status_code=404, detail="Slot not found")
+        
+        etag = slot_etag(slot)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        response.headers["ETag"] = etag
         return slot
     except HTTPException:
         raise
@@ -235,26 +692,45 @@ def get_slot(slot_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @app.put("/slots/{slot_id}", response_model=schemas.SlotOut)
-def update_slot(
+async def update_slot(
     slot_id: int,
     slot_update: schemas.SlotUpdate,
-    db: Session = Depends(get_db)
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Update a slot"""
+    """Update a slot; send If-Match with the slot's ETag to avoid lost updates"""
     try:
-        slot = db.query(models.Slot).filter(models.Slot.id == slot_id).first()
+        slot = await db.get(models.Slot, slot_id)
         if not slot:
             raise HTTPException(status_code=404, detail="Slot not found")
+        if if_match and not etag_matches(if_match, slot_etag(slot)):
+            raise HTTPException(status_code=412, detail="Slot has been modified")
         
         # Update only provided fields
-        update_data = slot_update.dict(exclude_unset=True)
+        old_scopes = slot_scopes(slot)
+        update_data = slot_update.model_dump(exclude_unset=True)
         for field, value in update_data.items():
             setattr(slot, field, value)
+        if slot.end_time <= slot.start_time:
+            raise HTTPException(status_code=400, detail="end_time must be after start_time")
         
-        db.commit()
-        db.refresh(slot)
+        try:
+            await db.flush()
+            await db.refresh(slot)
+            await publish_slot_events(db, events.slot_event(events.UPDATED, slot))
+            await db.commit()
+        except IntegrityError as e:
+            await db.rollback()
+            raise_for_slot_integrity_error(e)
+        except StaleDataError:
+            # Changed by another request between our read and write
+            await db.rollback()
+            raise HTTPException(status_code=412, detail="Slot has been modified")
+        await slot_cache.invalidate(old_scopes | slot_scopes(slot))
         
         logger.info(f"Updated slot {slot_id}")
+        response.headers["ETag"] = slot_etag(slot)
         return slot
     except HTTPException:
         raise
@@ -263,15 +739,19 @@ def update_slot(
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @app.delete("/slots/{slot_id}")
-def delete_slot(slot_id: int, db: Session = Depends(get_db)):
+async def delete_slot(slot_id: int, db: AsyncSession = Depends(get_async_db)):
     """Delete a slot"""
     try:
-        slot = db.query(models.Slot).filter(models.Slot.id == slot_id).first()
+        slot = await db.get(models.Slot, slot_id)
         if not slot:
             raise HTTPException(status_code=404, detail="Slot not found")
         
-        db.delete(slot)
-        db.commit()
+        scopes = slot_scopes(slot)
+        deleted = events.slot_event(events.DELETED, slot)
+        await db.delete(slot)
+        await publish_slot_events(db, deleted)
+        await db.commit()
+        await slot_cache.invalidate(scopes)
         
         logger.info(f"Deleted slot {slot_id}")
         return {"message": "Slot deleted successfully"}
@@ -284,15 +764,21 @@ def delete_slot(slot_id: int, db: Session = Depends(get_db)):
 # ===== USER SLOT ENDPOINTS =====
 
 @app.get("/users/{user_id}/slots", response_model=List[schemas.SlotOut])
-def get_user_slots(user_id: int, db: Session = Depends(get_db)):
+async def get_user_slots(
+    user_id: int,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_db)
+):
     """Get all slots created by a specific user"""
     try:
-        user = db.query(models.User).filter(models.User.id == user_id).first()
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
+        async def load():
+            user = await db.get(models.User, user_id)
+            if not user:
+                raise HTTPException(status_code=404, detail="User not found")
+            return (await db.execute(select(*SLOT_LIST_COLUMNS).where(models.Slot.user_id == user_id))).all(), {}
         
-        slots = db.query(models.Slot).filter(models.Slot.user_id == user_id).all()
-        return slots
+        cache_key = await slot_cache.key(f"users/{user_id}/slots", {}, [f"user:{user_id}"])
+        return await cached_slot_list(cache_key, load, if_none_match)
     except HTTPException:
         raise
     except Exception as e:
@@ -300,21 +786,124 @@ def get_user_slots(user_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @app.get("/users/{user_id}/bookings", response_model=List[schemas.SlotOut])
-def get_user_bookings(user_id: int, db: Session = Depends(get_db)):
+async def get_user_bookings(
+    user_id: int,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_db)
+):
     """Get all slots booked by a specific user"""
     try:
-        user = db.query(models.User).filter(models.User.id == user_id).first()
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
+        async def load():
+            user = await db.get(models.User, user_id)
+            if not user:
+                raise HTTPException(status_code=404, detail="User not found")
+            return (await db.execute(select(*SLOT_LIST_COLUMNS).where(models.Slot.booked_by_user_id == user_id))).all(), {}
         
-        bookings = db.query(models.Slot).filter(models.Slot.booked_by_user_id == user_id).all()
-        return bookings
+        cache_key = await slot_cache.key(f"users/{user_id}/bookings", {}, [f"booker:{user_id}", CANCELLATIONS])
+        return await cached_slot_list(cache_key, load, if_none_match)
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error fetching bookings for user {user_id}: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@app.get("/users/{user_id}/bookings/export")
+async def export_user_bookings(
+    user_id: int,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="ndjson (one JSON slot per line) or csv"),
+    date_from: Optional[dt.date] = Query(None, description="Only bookings on or after this date (YYYY-MM-DD)"),
+    date_to: Optional[dt.date] = Query(None, description="Only bookings on or before this date (YYYY-MM-DD)"),
+    accept_encoding: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Booking history of a user, streamed like GET /slots/export"""
+    try:
+        user = await db.get(models.User, user_id)
+    except Exception as e:
+        logger.error(f"Error exporting bookings for user {user_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    stmt = filter_slots(select(*SLOT_LIST_COLUMNS), date_from=date_from, date_to=date_to)
+    return export_response(stmt.where(models.Slot.booked_by_user_id == user_id), format, f"bookings-{user_id}", accept_encoding)
+
+@app.get("/users/{user_id}/overview", response_model=schemas.UserOverview)
+async def get_user_overview(
+    user_id: int,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Maximum slots per list"),
+    slots_cursor: Optional[str] = Query(None, description="slots_next_cursor from the previous page"),
+    bookings_cursor: Optional[str] = Query(None, description="bookings_next_cursor from the previous page"),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """User dashboard in one request: the user, counts, created and booked slots, and what is next"""
+    try:
+        filters = {"limit": limit, "slots_cursor": slots_cursor, "bookings_cursor": bookings_cursor}
+        cache_key = await slot_cache.key(
+            f"users/{user_id}/overview", filters, [f"user:{user_id}", f"booker:{user_id}", CANCELLATIONS]
+        )
+        
+        async def load_body():
+            result = await overview.load_overview(db, user_id, limit, slots_cursor, bookings_cursor)
+            if result is None:
+                raise HTTPException(status_code=404, detail="User not found")
+            body = orjson.dumps(result)
+            return body, {"ETag": body_etag(body)}
+        
+        body, headers = await slot_cache.get_or_load(cache_key, load_body, fresh=pinned_to_primary())
+        
+        if etag_matches(if_none_match, headers["ETag"]):
+            return not_modified(headers["ETag"])
+        return Response(content=body, media_type="application/json", headers=headers)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching overview for user {user_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+# ===== AVAILABILITY =====
+
+@app.get("/availability/search", response_model=List[schemas.SlotOut])
+async def search_availability(
+    date_from: Optional[dt.date] = Query(None, description="First date to search (YYYY-MM-DD, default today)"),
+    date_to: Optional[dt.date] = Query(None, description="Last date to search, inclusive (YYYY-MM-DD)"),
+    time_from: Optional[dt.time] = Query(None, description="Earliest start time of day (HH:MM)"),
+    time_to: Optional[dt.time] = Query(None, description="Latest end time of day (HH:MM)"),
+    duration: Optional[int] = Query(None, gt=0, le=24 * 60, description="Minimum slot length in minutes"),
+    user_id: Optional[List[int]] = Query(None, description="Only these providers (repeat for several)"),
+    limit: int = Query(availability.DEFAULT_SEARCH_LIMIT, ge=1, le=availability.MAX_SEARCH_LIMIT, description="Number of slots to return"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Find the earliest free slots matching a date / time window, length and providers"""
+    try:
+        if date_to and date_from and date_to < date_from:
+            raise HTTPException(status_code=400, detail="date_to must not be before date_from")
+        if time_from and time_to and time_to <= time_from:
+            raise HTTPException(status_code=400, detail="time_to must be after time_from")
+        
+        rows = await availability.search_free_slots(
+            db,
+            date_from=date_from or dt.date.today(),
+            date_to=date_to,
+            time_from=time_from,
+            time_to=time_to,
+            duration_minutes=duration,
+            user_ids=user_id,
+            limit=limit,
+        )
+        return Response(content=slot_rows_body(rows), media_type="application/json")
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error searching availability: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+# ===== PLACES =====
+
+app.include_router(place_router.router, prefix="/places", tags=["places"])
+
 # ===== HEALTH CHECK =====
 
 @app.get("/health")
@@ -322,4 +911,28 @@ def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "service": "schedulink-api"}
 
+@app.get("/health/live")
+def liveness_check():
+    """Liveness probe: the worker is running and answering requests; never touches the database"""
+    return {"status": "alive", "service": "schedulink-api"}
+
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness probe: startup has finished and the database answers (cached ping, see app/health.py)"""
+    error = await readiness.check()
+    if error:
+        return ORJSONResponse(
+            status_code=503,
+            content={"status": "unavailable", "service": "schedulink-api", "reason": error},
+        )
+    return {"status": "ready", "service": "schedulink-api"}
+
+# ===== METRICS =====
+
+@app.get("/metrics", include_in_schema=False)
+def metrics_endpoint():
+    """Prometheus metrics, aggregated across workers in multiprocess mode"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
 
@@ -0,0 +1,236 @@
+"""
+In-memory storage engine behind simple_main.py
+
+Users and slots live in dicts keyed by id, with a hash index on email and
+secondary indexes of slots by date and by provider (user_id), so every
+lookup the API makes is O(1) and listing a day or a provider's slots
+reads only those slots. Records are compact __slots__ objects.
+
+Writes take one lock: FastAPI runs the simple app's sync endpoints in a
+thread pool, and a booking's "is it free?" check and its update must not
+interleave with another booking of the same slot. Reads of a single
+record need no lock.
+
+The store can be snapshotted to a JSON file and loaded back, so a dev or
+edge instance keeps its data across restarts.
+"""
+
+import os
+import tempfile
+import threading
+from typing import Dict, Iterable, List, Optional
+
+import orjson
+
+
+class NotFound(LookupError):
+    """Raised when a user or slot does not exist"""
+
+
+class Conflict(ValueError):
+    """Raised when a write contradicts the current state (duplicate email, booked slot)"""
+
+
+# ===== RECORDS =====
+
+
+class User:
+    __slots__ = ("id", "name", "email", "phone")
+
+    def __init__(self, id: int, name: str, email: str, phone: Optional[str] = None):
+        self.id = id
+        self.name = name
+        self.email = email
+        self.phone = phone
+
+
+class Slot:
+    __slots__ = (
+        "id", "title", "description", "date", "start_time", "end_time",
+        "is_booked", "user_id", "booked_by_user_id",
+    )
+
+    def __init__(
+        self,
+        id: int,
+        title: str,
+        description: Optional[str],
+        date: str,
+        start_time: str,
+        end_time: str,
+        is_booked: bool = False,
+        user_id: Optional[int] = None,
+        booked_by_user_id: Optional[int] = None,
+    ):
+        self.id = id
+        self.title = title
+        self.description = description
+        self.date = date
+        self.start_time = start_time
+        self.end_time = end_time
+        self.is_booked = is_booked
+        self.user_id = user_id
+        self.booked_by_user_id = booked_by_user_id
+
+
+def _fields(record) -> dict:
+    return {name: getattr(record, name) for name in record.__slots__}
+
+
+# ===== REPOSITORY =====
+
+
+class MemoryRepository:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clear()
+
+    def _clear(self):
+        self._users: Dict[int, User] = {}
+        self._user_ids_by_email: Dict[str, int] = {}
+        self._slots: Dict[int, Slot] = {}
+        # Secondary indexes; the inner dicts keep creation order and drop
+        # a slot in O(1)
+        self._slots_by_date: Dict[str, Dict[int, Slot]] = {}
+        self._slots_by_user: Dict[int, Dict[int, Slot]] = {}
+        self._next_user_id = 1
+        self._next_slot_id = 1
+
+    # Users
+
+    def create_user(self, name: str, email: str, phone: Optional[str] = None) -> User:
+        with self._lock:
+            if email in self._user_ids_by_email:
+                raise Conflict("Email already registered")
+            user = User(self._next_user_id, name, email, phone)
+            self._next_user_id += 1
+            self._add_user(user)
+            return user
+
+    def get_user(self, user_id: int) -> User:
+        user = self._users.get(user_id)
+        if user is None:
+            raise NotFound("User not found")
+        return user
+
+    def list_users(self) -> List[User]:
+        return list(self._users.values())
+
+    def _add_user(self, user: User):
+        self._users[user.id] = user
+        self._user_ids_by_email[user.email] = user.id
+
+    # Slots
+
+    def create_slot(
+        self,
+        title: str,
+        date: str,
+        start_time: str,
+        end_time: str,
+        description: Optional[str] = None,
+        user_id: Optional[int] = None,
+    ) -> Slot:
+        with self._lock:
+            if user_id and user_id not in self._users:
+                raise NotFound("User not found")
+            slot = Slot(self._next_slot_id, title, description, date, start_time, end_time, user_id=user_id)
+            self._next_slot_id += 1
+            self._add_slot(slot)
+            return slot
+
+    def get_slot(self, slot_id: int) -> Slot:
+        slot = self._slots.get(slot_id)
+        if slot is None:
+            raise NotFound("Slot not found")
+        return slot
+
+    def list_slots(self, date: Optional[str] = None, user_id: Optional[int] = None) -> List[Slot]:
+        """Slots in creation order, only those on a date and/or of a provider if given"""
+        if date is not None and user_id is not None:
+            # Walk the smaller index and filter by the other
+            by_date = self._slots_by_date.get(date, {})
+            by_user = self._slots_by_user.get(user_id, {})
+            smaller, key, value = (by_date, "user_id", user_id) if len(by_date) <= len(by_user) else (by_user, "date", date)
+            return [slot for slot in list(smaller.values()) if getattr(slot, key) == value]
+        if date is not None:
+            return list(self._slots_by_date.get(date, {}).values())
+        if user_id is not None:
+            return list(self._slots_by_user.get(user_id, {}).values())
+        return list(self._slots.values())
+
+    def book_slot(self, slot_id: int, user_id: int) -> Slot:
+        with self._lock:
+            slot = self.get_slot(slot_id)
+            if slot.is_booked:
+                raise Conflict("Slot already booked")
+            self.get_user(user_id)
+            slot.is_booked = True
+            slot.booked_by_user_id = user_id
+            return slot
+
+    def cancel_booking(self, slot_id: int) -> Slot:
+        with self._lock:
+            slot = self.get_slot(slot_id)
+            if not slot.is_booked:
+                raise Conflict("Slot is not booked")
+            slot.is_booked = False
+            slot.booked_by_user_id = None
+            return slot
+
+    def _add_slot(self, slot: Slot):
+        self._slots[slot.id] = slot
+        self._slots_by_date.setdefault(slot.date, {})[slot.id] = slot
+        if slot.user_id is not None:
+            self._slots_by_user.setdefault(slot.user_id, {})[slot.id] = slot
+
+    # Snapshots
+
+    def snapshot(self) -> bytes:
+        """The whole store as JSON; taken under the lock, so it is consistent"""
+        with self._lock:
+            state = {
+                "next_user_id": self._next_user_id,
+                "next_slot_id": self._next_slot_id,
+                "users": [_fields(user) for user in self._users.values()],
+                "slots": [_fields(slot) for slot in self._slots.values()],
+            }
+        return orjson.dumps(state)
+
+    def save(self, path: str):
+        """Write a snapshot to path atomically: readers see the old file or the new one"""
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".snapshot-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(self.snapshot())
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def restore(self, data: bytes):
+        """Replace the contents of the store with a snapshot"""
+        state = orjson.loads(data)
+        with self._lock:
+            self._clear()
+            self._load_records(User, state["users"], self._add_user)
+            self._load_records(Slot, state["slots"], self._add_slot)
+            self._next_user_id = state["next_user_id"]
+            self._next_slot_id = state["next_slot_id"]
+
+    @staticmethod
+    def _load_records(record_type, rows: Iterable[dict], add):
+        for row in rows:
+            add(record_type(**row))
+
+    @classmethod
+    def load(cls, path: str) -> "MemoryRepository":
+        """A store holding the snapshot at path, or an empty one if there is none"""
+        store = cls()
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                store.restore(f.read())
+        return store
@@ -0,0 +1,109 @@
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+
+# When PROMETHEUS_MULTIPROC_DIR is set (one directory shared by all
+# gunicorn workers), every worker writes its samples there and /metrics
+# aggregates them, so a scrape sees the whole container, not one worker.
+MULTIPROCESS = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+# ===== CONNECTION POOL =====
+
+POOL_CHECKOUT_SECONDS = Histogram(
+    "db_pool_checkout_seconds",
+    "Time spent waiting to check a connection out of the pool",
+    ["engine"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out",
+    "Connections currently checked out of the pool",
+    ["engine"],
+    multiprocess_mode="livesum",
+)
+POOL_OVERFLOW = Gauge(
+    "db_pool_overflow",
+    "Connections open beyond pool_size (negative while the pool is still filling)",
+    ["engine"],
+    multiprocess_mode="livesum",
+)
+POOL_SIZE = Gauge(
+    "db_pool_size",
+    "Configured pool_size",
+    ["engine"],
+    multiprocess_mode="livesum",
+)
+
+DB_QUERY_SECONDS = Histogram(
+    "db_query_seconds",
+    "Time spent executing each SQL statement",
+    ["engine"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+
+# ===== HTTP REQUESTS =====
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_seconds",
+    "Request latency by route template",
+    ["method", "route", "status"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+HTTP_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "Requests currently being handled",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+HTTP_REQUEST_QUERIES = Histogram(
+    "http_request_db_queries",
+    "SQL statements executed per request",
+    ["method", "route"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+HTTP_REQUEST_DB_SECONDS = Histogram(
+    "http_request_db_seconds",
+    "Total time spent in SQL statements per request",
+    ["method", "route"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+
+# ===== READ PATH =====
+
+CACHE_COALESCED = Counter(
+    "cache_coalesced_requests",
+    "Cache misses served by joining an identical load already in flight",
+)
+
+# ===== RATE LIMITING =====
+
+RATE_LIMITED = Counter(
+    "rate_limited_requests",
+    "Requests rejected with 429 by the rate limiter",
+    ["method"],
+)
+
+# ===== IDEMPOTENCY =====
+
+IDEMPOTENT_REQUESTS = Counter(
+    "idempotent_requests",
+    "Writes carrying an Idempotency-Key, by outcome (new, replayed, in_progress, mismatch)",
+    ["outcome"],
+)
+
+
+def render_metrics():
+    """Return the Prometheus exposition body and its content type"""
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
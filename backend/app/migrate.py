@@ -0,0 +1,59 @@
+"""
+Schema migrations from Python
+
+The schema is owned by the Alembic migrations in migrations/.
+upgrade_database() brings the database to the latest revision; a
+database whose tables were created before migrations existed is first
+stamped at the baseline revision, the schema those tables started from,
+and upgraded from there (each later migration skips what such a
+database already has). check_schema_current() lets app workers refuse
+to start against a database that has not been migrated.
+"""
+
+import os
+from typing import Optional
+
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import inspect
+
+from app.database import engine
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Users and slots as create_all made them before migrations existed
+BASELINE_REVISION = "0001"
+
+
+def alembic_config() -> Config:
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.attributes["configure_logger"] = False
+    return config
+
+
+def current_revision() -> Optional[str]:
+    with engine.connect() as conn:
+        return MigrationContext.configure(conn).get_current_revision()
+
+
+def head_revision() -> str:
+    return ScriptDirectory.from_config(alembic_config()).get_current_head()
+
+
+def check_schema_current():
+    """Raise RuntimeError unless the database is at the latest revision"""
+    current, head = current_revision(), head_revision()
+    if current != head:
+        raise RuntimeError(
+            f"Database schema is at revision {current or 'none'} but this code needs {head}; "
+            "run `python init_db.py` before starting the app"
+        )
+
+
+def upgrade_database():
+    """Migrate the database to the latest revision, adopting pre-migration tables"""
+    config = alembic_config()
+    if current_revision() is None and inspect(engine).has_table("slots"):
+        command.stamp(config, BASELINE_REVISION)
+    command.upgrade(config, "head")
@@ -1,11 +1,19 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Text
+import re
+from typing import Optional
+
+from sqlalchemy import Column, Integer, Float, String, Date, DateTime, Time, ForeignKey, Boolean, Text, LargeBinary, Index, DDL, event, func, text
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.orm import relationship
 from app.database import Base
 
+# SQLite has no native TIME; store "HH:MM:SS" text so values compare
+# correctly as strings in indexes and the overlap triggers
+SlotTime = Time().with_variant(sqlite.TIME(truncate_microseconds=True), "sqlite")
+
 class User(Base):
     __tablename__ = "users"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     email = Column(String, unique=True, index=True, nullable=False)
     name = Column(String, nullable=False)
     phone = Column(String, nullable=True)
@@ -17,18 +25,241 @@ class User(Base):
 
 class Slot(Base):
     __tablename__ = "slots"
+    __table_args__ = (
+        # Keyset pagination order for GET /slots
+        Index("ix_slots_date_start_time_id", "date", "start_time", "id"),
+        # Availability search and "free slots on a day": only slots that
+        # are not booked, in (date, start_time, id) order. Queries must
+        # compare is_booked with an inline literal (is_booked == False)
+        # for the planner to match the index predicate.
+        Index(
+            "ix_slots_free_date_start_time_id", "date", "start_time", "id",
+            postgresql_where=text("is_booked = false"), sqlite_where=text("is_booked = 0"),
+        ),
+        # Provider views ("my slots in a date range") and the per-day
+        # overlap probe run by the SQLite overlap triggers
+        Index("ix_slots_user_id_date_start_time_end_time", "user_id", "date", "start_time", "end_time"),
+        # Booking lists in (date, start_time, id) order
+        Index("ix_slots_booked_by_user_id_date_start_time_id", "booked_by_user_id", "date", "start_time", "id"),
+        # Lets the hold reaper find expired holds without a table scan
+        Index("ix_slots_hold_expires_at", "hold_expires_at"),
+        # Never reuse the id of a deleted slot, so (id, version) ETags stay unique
+        {"sqlite_autoincrement": True},
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     title = Column(String, nullable=False)
     description = Column(Text, nullable=True)
-    date = Column(String, nullable=False)  # Store as string YYYY-MM-DD
-    start_time = Column(String, nullable=False)  # Store as time string (HH:MM)
-    end_time = Column(String, nullable=False)    # Store as time string (HH:MM)
+    date = Column(Date, nullable=False)
+    start_time = Column(SlotTime, nullable=False)
+    end_time = Column(SlotTime, nullable=False)
     is_booked = Column(Boolean, default=False, nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True)  # Creator of the slot
     booked_by_user_id = Column(Integer, ForeignKey("users.id"), nullable=True)  # Who booked the slot
+    held_by_user_id = Column(Integer, ForeignKey("users.id"), nullable=True)  # Who is holding the slot during checkout
+    hold_expires_at = Column(DateTime, nullable=True)  # When the hold lapses (naive UTC)
+    version = Column(Integer, nullable=False, default=1, server_default="1")  # Bumped on every change; backs ETags
+
+    # ORM updates check and bump the version (optimistic concurrency);
+    # bulk UPDATE statements must bump it themselves
+    __mapper_args__ = {"version_id_col": version}
 
     # Relationships
     user = relationship("User", foreign_keys=[user_id], back_populates="slots")
     booked_by = relationship("User", foreign_keys=[booked_by_user_id], back_populates="booked_slots")
 
+
+class Place(Base):
+    __tablename__ = "places"
+    __table_args__ = (
+        # "Places near me": each geohash prefix is one range of this index
+        # (see app/places.py)
+        Index("ix_places_geohash", "geohash"),
+        # On PostgreSQL nearby searches probe this GiST index instead
+        Index(
+            "ix_places_location", func.point(text("longitude"), text("latitude")), postgresql_using="gist",
+        ).ddl_if(dialect="postgresql"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False)
+    address = Column(String, nullable=True)
+    city = Column(String, nullable=True)
+    state = Column(String, nullable=True)
+    zip_code = Column(String, nullable=True)
+    latitude = Column(Float, nullable=False)
+    longitude = Column(Float, nullable=False)
+    # Kept in step with latitude/longitude by every write; byte-wise
+    # collation on PostgreSQL so prefix ranges follow the base 32 order
+    geohash = Column(String(12).with_variant(String(12, collation="C"), "postgresql"), nullable=False)
+
+
+# Idempotency-Key of a write request and the response replayed to its
+# retries (see app/idempotency.py)
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        # Lets the purge find expired keys without a table scan
+        Index("ix_idempotency_keys_expires_at", "expires_at"),
+    )
+
+    key = Column(String(255), primary_key=True)
+    fingerprint = Column(String(64), nullable=False)  # SHA-256 of method, path, query and body
+    status_code = Column(Integer, nullable=True)  # None while the first request is running
+    headers = Column(LargeBinary, nullable=True)  # JSON list of [name, value] pairs
+    body = Column(LargeBinary, nullable=True)
+    expires_at = Column(DateTime, nullable=False)  # Naive UTC; the key may be reused after this
+
+
+# ===== OVERLAP GUARDS =====
+# A user's slots may not overlap in time. The database enforces this so
+# concurrent writers cannot race past an application-level check:
+# PostgreSQL through a GiST exclusion constraint, SQLite through triggers
+# that probe the (user_id, date, start_time, end_time) index. Violations
+# surface as IntegrityError mentioning SLOT_OVERLAP_CONSTRAINT.
+
+SLOT_OVERLAP_CONSTRAINT = "slots_no_overlap"
+
+_SQLITE_OVERLAP_PROBE = """
+    NEW.user_id IS NOT NULL AND EXISTS (
+        SELECT 1 FROM slots
+        WHERE user_id = NEW.user_id
+          AND date = NEW.date
+          AND start_time < NEW.end_time
+          AND end_time > NEW.start_time
+          {extra}
+    )
+"""
+
+SLOT_OVERLAP_DDL = [
+    DDL(f"""
+        CREATE TRIGGER IF NOT EXISTS {SLOT_OVERLAP_CONSTRAINT}_insert
+        BEFORE INSERT ON slots
+        WHEN {_SQLITE_OVERLAP_PROBE.format(extra="")}
+        BEGIN
+            SELECT RAISE(ABORT, '{SLOT_OVERLAP_CONSTRAINT}');
+        END
+    """).execute_if(dialect="sqlite"),
+    DDL(f"""
+        CREATE TRIGGER IF NOT EXISTS {SLOT_OVERLAP_CONSTRAINT}_update
+        BEFORE UPDATE OF user_id, date, start_time, end_time ON slots
+        WHEN {_SQLITE_OVERLAP_PROBE.format(extra="AND id != NEW.id")}
+        BEGIN
+            SELECT RAISE(ABORT, '{SLOT_OVERLAP_CONSTRAINT}');
+        END
+    """).execute_if(dialect="sqlite"),
+    DDL("CREATE EXTENSION IF NOT EXISTS btree_gist").execute_if(dialect="postgresql"),
+    DDL(f"""
+        DO $$ BEGIN
+            ALTER TABLE slots ADD CONSTRAINT {SLOT_OVERLAP_CONSTRAINT}
+                EXCLUDE USING gist (user_id WITH =, tsrange(date + start_time, date + end_time) WITH &&)
+                WHERE (user_id IS NOT NULL);
+        EXCEPTION WHEN duplicate_table OR duplicate_object THEN NULL;
+        END $$
+    """).execute_if(dialect="postgresql"),
+]
+
+for _ddl in SLOT_OVERLAP_DDL:
+    event.listen(Slot.__table__, "after_create", _ddl)
+
+
+def is_overlap_error(error) -> bool:
+    """Whether an IntegrityError was raised by the slot overlap guard"""
+    return SLOT_OVERLAP_CONSTRAINT in str(getattr(error, "orig", error))
+
+
+# Other constraint violations, told apart by SQLSTATE on PostgreSQL (both
+# drivers expose it) and by message on SQLite, which has no codes
+_NOT_NULL_COLUMN = re.compile(r'NOT NULL constraint failed: \w+\.(\w+)|null value in column "(\w+)"')
+
+
+def is_foreign_key_error(error) -> bool:
+    """Whether an IntegrityError was raised by a foreign key: the referenced row does not exist"""
+    orig = getattr(error, "orig", error)
+    return getattr(orig, "sqlstate", None) == "23503" or "FOREIGN KEY constraint failed" in str(orig)
+
+
+def not_null_column(error) -> Optional[str]:
+    """The column an IntegrityError from a NOT NULL constraint names, if it is one"""
+    match = _NOT_NULL_COLUMN.search(str(getattr(error, "orig", error)))
+    return match and (match.group(1) or match.group(2))
+
+
+# ===== FULL-TEXT SEARCH =====
+# Slot titles and descriptions are searchable (see app/search.py).
+# PostgreSQL: a trigger keeps the tsvector of each slot, titles weighted
+# above descriptions, in slots.search_vector, which a GIN index covers;
+# ranking reads the stored vector instead of parsing the text again.
+# SQLite: the FTS5 table slots_fts, which triggers keep in step with
+# slots. Neither is mapped: the ORM never loads or writes them.
+
+SLOT_SEARCH_COLUMN = "search_vector"
+SLOT_SEARCH_INDEX = "ix_slots_search"
+SLOT_SEARCH_TABLE = "slots_fts"
+SEARCH_CONFIG = "english"
+# The vector of a row; {row} is "NEW." in the trigger
+SLOT_SEARCH_VECTOR = (
+    f"setweight(to_tsvector('{SEARCH_CONFIG}'::regconfig, {{row}}title), 'A') || "
+    f"setweight(to_tsvector('{SEARCH_CONFIG}'::regconfig, coalesce({{row}}description, '')), 'B')"
+)
+
+_FTS_DELETE = f"""
+    INSERT INTO {SLOT_SEARCH_TABLE}({SLOT_SEARCH_TABLE}, rowid, title, description)
+    VALUES ('delete', OLD.id, OLD.title, OLD.description);
+"""
+_FTS_INSERT = f"""
+    INSERT INTO {SLOT_SEARCH_TABLE}(rowid, title, description) VALUES (NEW.id, NEW.title, NEW.description);
+"""
+
+SLOT_SEARCH_DDL = [
+    # Nullable without a default: adding it does not rewrite the table
+    DDL(f"ALTER TABLE slots ADD COLUMN IF NOT EXISTS {SLOT_SEARCH_COLUMN} tsvector").execute_if(dialect="postgresql"),
+    DDL(f"""
+        CREATE OR REPLACE FUNCTION slots_{SLOT_SEARCH_COLUMN}() RETURNS trigger AS $$
+        BEGIN
+            NEW.{SLOT_SEARCH_COLUMN} := {SLOT_SEARCH_VECTOR.format(row="NEW.")};
+            RETURN NEW;
+        END $$ LANGUAGE plpgsql
+    """).execute_if(dialect="postgresql"),
+    # Bookings, holds and cancellations do not recompute the vector
+    DDL(f"""
+        CREATE TRIGGER slots_{SLOT_SEARCH_COLUMN}
+        BEFORE INSERT OR UPDATE OF title, description ON slots
+        FOR EACH ROW EXECUTE FUNCTION slots_{SLOT_SEARCH_COLUMN}()
+    """).execute_if(dialect="postgresql"),
+    DDL(
+        f"CREATE INDEX IF NOT EXISTS {SLOT_SEARCH_INDEX} ON slots USING gin ({SLOT_SEARCH_COLUMN})"
+    ).execute_if(dialect="postgresql"),
+    DDL(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {SLOT_SEARCH_TABLE} USING fts5(
+            title, description, content='slots', content_rowid='id', tokenize='porter unicode61'
+        )
+    """).execute_if(dialect="sqlite"),
+    DDL(f"""
+        CREATE TRIGGER IF NOT EXISTS {SLOT_SEARCH_TABLE}_insert AFTER INSERT ON slots
+        BEGIN {_FTS_INSERT} END
+    """).execute_if(dialect="sqlite"),
+    DDL(f"""
+        CREATE TRIGGER IF NOT EXISTS {SLOT_SEARCH_TABLE}_delete AFTER DELETE ON slots
+        BEGIN {_FTS_DELETE} END
+    """).execute_if(dialect="sqlite"),
+    # Likewise only title and description changes reach slots_fts
+    DDL(f"""
+        CREATE TRIGGER IF NOT EXISTS {SLOT_SEARCH_TABLE}_update AFTER UPDATE OF title, description ON slots
+        BEGIN {_FTS_DELETE} {_FTS_INSERT} END
+    """).execute_if(dialect="sqlite"),
+]
+
+for _ddl in SLOT_SEARCH_DDL:
+    event.listen(Slot.__table__, "after_create", _ddl)
+
+
+def is_search_schema(name, type_, parent_names) -> bool:
+    """
+    Whether a reflected table, column or index is one of the search
+    structures above; they are not in the metadata, so schema comparisons
+    (Alembic's include_name hook) skip them.
+    """
+    if type_ == "table":
+        return name.startswith(SLOT_SEARCH_TABLE)
+    return name in (SLOT_SEARCH_COLUMN, SLOT_SEARCH_INDEX) and parent_names.get("table_name") == "slots"
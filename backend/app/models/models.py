@@ -1,30 +0,0 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, UniqueConstraint
-from sqlalchemy.orm import relationship
-from sqlalchemy.ext.declarative import declarative_base
-from datetime import datetime
-
-Base = declarative_base()
-
-# 1. User Model
-class User(Base):
-    ...
-
-# 2. Availability Slot Model
-class AvailabilitySlot(Base):
-    ...
-
-# 3. Appointment Model
-class Appointment(Base):
-    ...
-
-# 4. Place Model
-class Place(Base):
-    __tablename__ = "places"
-
-    id = Column(Integer, primary_key=True, index=True)
-    name = Column(String, index=True)
-    address = Column(String)
-    city = Column(String)
-    state = Column(String)
-    zip_code = Column(String)
-
@@ -0,0 +1,95 @@
+import datetime as dt
+from typing import Dict, Optional
+
+from sqlalchemy import and_, func, literal, or_, select, union_all
+
+from app import models, schemas
+from app.pagination import SLOT_ORDER, after_key, decode_cursor, encode_cursor
+from app.serialization import SLOT_LIST_COLUMNS, slot_rows
+
+SLOTS = "slots"
+BOOKINGS = "bookings"
+NEXT_SLOT = "next_slot"
+NEXT_BOOKING = "next_booking"
+
+
+def _branch(kind: str, condition, limit: int):
+    """One ordered, limited slot query of the overview UNION, tagged with its kind"""
+    return select(
+        select(*SLOT_LIST_COLUMNS, literal(kind).label("kind"))
+        .where(condition)
+        .order_by(*SLOT_ORDER)
+        .limit(limit)
+        .subquery()
+    )
+
+
+def _upcoming(now: dt.datetime):
+    return or_(
+        models.Slot.date > now.date(),
+        and_(models.Slot.date == now.date(), models.Slot.start_time >= now.time()),
+    )
+
+
+async def load_overview(
+    db,
+    user_id: int,
+    limit: int,
+    slots_cursor: Optional[str] = None,
+    bookings_cursor: Optional[str] = None,
+    now: Optional[dt.datetime] = None,
+) -> Optional[Dict]:
+    """
+    Everything a user dashboard shows, in two queries: the user with
+    both counts, then one UNION ALL of the two slot pages (keyset
+    paginated like GET /slots, one extra row each to detect more) and the
+    next upcoming created and booked slot. Returns None for an unknown user.
+    """
+    count_slots = select(func.count()).where(models.Slot.user_id == user_id).scalar_subquery()
+    count_bookings = select(func.count()).where(models.Slot.booked_by_user_id == user_id).scalar_subquery()
+    found = (await db.execute(
+        select(models.User, count_slots, count_bookings).where(models.User.id == user_id)
+    )).first()
+    if found is None:
+        return None
+    user, slot_count, booking_count = found
+
+    created = models.Slot.user_id == user_id
+    booked = models.Slot.booked_by_user_id == user_id
+    upcoming = _upcoming(now or dt.datetime.now())
+    if slots_cursor:
+        created_page = and_(created, after_key(*decode_cursor(slots_cursor)))
+    else:
+        created_page = created
+    if bookings_cursor:
+        booked_page = and_(booked, after_key(*decode_cursor(bookings_cursor)))
+    else:
+        booked_page = booked
+    stmt = union_all(
+        _branch(SLOTS, created_page, limit + 1),
+        _branch(BOOKINGS, booked_page, limit + 1),
+        _branch(NEXT_SLOT, and_(created, upcoming), 1),
+        _branch(NEXT_BOOKING, and_(booked, upcoming), 1),
+    )
+
+    by_kind = {SLOTS: [], BOOKINGS: [], NEXT_SLOT: [], NEXT_BOOKING: []}
+    for row in (await db.execute(stmt)).all():
+        by_kind[row.kind].append(row)
+    for rows in by_kind.values():
+        # UNION ALL does not promise to keep each branch's order
+        rows.sort(key=lambda row: (row.date, row.start_time, row.id))
+
+    overview = {
+        "user": schemas.UserOut.model_validate(user).model_dump(mode="json"),
+        "slot_count": slot_count,
+        "booking_count": booking_count,
+    }
+    for kind in (SLOTS, BOOKINGS):
+        rows = by_kind[kind]
+        next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+        overview[kind] = slot_rows(row[:-1] for row in rows[:limit])
+        overview[f"{kind}_next_cursor"] = next_cursor
+    for kind in (NEXT_SLOT, NEXT_BOOKING):
+        rows = slot_rows(row[:-1] for row in by_kind[kind])
+        overview[kind] = rows[0] if rows else None
+    return overview
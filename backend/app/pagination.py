@@ -0,0 +1,75 @@
+import base64
+import datetime as dt
+import json
+from typing import Optional, Tuple
+
+from sqlalchemy import and_, or_
+
+from app import models
+
+# Page size limits for list endpoints
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Response header carrying the cursor for the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class InvalidCursor(ValueError):
+    """Raised when a client sends a cursor we did not issue"""
+
+
+# Sort key shared by every keyset scan over slots
+SLOT_ORDER = (models.Slot.date, models.Slot.start_time, models.Slot.id)
+
+
+def after_key(date: dt.date, start_time: dt.time, slot_id: int):
+    """Condition for slots sorting strictly after the given (date, start_time, id)"""
+    return or_(
+        models.Slot.date > date,
+        and_(models.Slot.date == date, models.Slot.start_time > start_time),
+        and_(
+            models.Slot.date == date,
+            models.Slot.start_time == start_time,
+            models.Slot.id > slot_id,
+        ),
+    )
+
+
+def encode_cursor(slot) -> str:
+    """Encode the (date, start_time, id) sort key of a slot as an opaque cursor"""
+    key = [slot.date.isoformat(), slot.start_time.isoformat(), slot.id]
+    raw = json.dumps(key, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[dt.date, dt.time, int]:
+    """Decode a cursor produced by encode_cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        date, start_time, slot_id = json.loads(base64.urlsafe_b64decode(padded))
+        if not isinstance(slot_id, int):
+            raise TypeError("slot id must be an integer")
+        return dt.date.fromisoformat(date), dt.time.fromisoformat(start_time), slot_id
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from e
+
+
+async def paginate_slots(db, stmt, limit: int, cursor: Optional[str] = None):
+    """
+    Apply keyset pagination on (date, start_time, id) to a select of Slot
+    columns (e.g. select(*SLOT_LIST_COLUMNS)).
+
+    Returns the page of slots and the cursor for the next page (None on
+    the last page). One extra row is fetched to detect whether more rows
+    follow, so no COUNT query is needed.
+    """
+    if cursor:
+        stmt = stmt.where(after_key(*decode_cursor(cursor)))
+
+    stmt = stmt.order_by(*SLOT_ORDER).limit(limit + 1)
+    rows = (await db.execute(stmt)).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1])
+    return rows, None
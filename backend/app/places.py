@@ -0,0 +1,197 @@
+import math
+import os
+from typing import List, Optional, Tuple
+
+from sqlalchemy import and_, func, or_, select
+
+from app import models
+
+# Result and radius limits for GET /places/nearby
+DEFAULT_NEARBY_LIMIT = 10
+MAX_NEARBY_LIMIT = 100
+DEFAULT_NEARBY_RADIUS_M = 5000
+MAX_NEARBY_RADIUS_M = float(os.getenv("PLACES_MAX_RADIUS_M", "100000"))
+# Most geohash cells (index ranges) one probe may cover; fewer, larger
+# cells are used when the search area needs more
+MAX_PROBE_CELLS = 16
+# First probe radius as a fraction of the requested radius; each probe
+# that finds too few places searches a RING_GROWTH times larger circle
+FIRST_RING_FRACTION = 1 / 16
+RING_GROWTH = 4
+
+EARTH_RADIUS_M = 6371008.8
+
+# ===== GEOHASH =====
+# A geohash interleaves longitude and latitude bits and spells them in
+# base 32, so every prefix names a cell and the places in a cell are one
+# contiguous range of the ix_places_geohash index.
+
+GEOHASH_PRECISION = 12
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def geohash(latitude: float, longitude: float, precision: int = GEOHASH_PRECISION) -> str:
+    """Geohash of a point, precision characters long (12 is a few centimetres)"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        interval, coordinate = (lon_range, longitude) if even else (lat_range, latitude)
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits = 0
+            value = 0
+    return "".join(chars)
+
+
+def cell_size(precision: int) -> Tuple[float, float]:
+    """Height and width in degrees of the cells of a geohash precision"""
+    lon_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def covering_cells(lat_lo: float, lat_hi: float, lon_lo: float, lon_hi: float) -> List[str]:
+    """
+    Geohash prefixes of the cells that cover a latitude/longitude box, at
+    the finest precision that needs at most MAX_PROBE_CELLS of them.
+    lon_lo/lon_hi may run past +-180 when the box crosses the antimeridian.
+    """
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = cell_size(precision)
+        columns = round(360.0 / width)
+        rows = range(int((lat_lo + 90) // height), min(int((lat_hi + 90) // height), round(180.0 / height) - 1) + 1)
+        first, last = int((lon_lo + 180) // width), int((lon_hi + 180) // width)
+        cols = range(columns) if last - first + 1 >= columns else range(first, last + 1)
+        if len(rows) * len(cols) <= MAX_PROBE_CELLS or precision == 1:
+            return sorted({
+                geohash(-90 + (row + 0.5) * height, -180 + (col % columns + 0.5) * width, precision)
+                for row in rows for col in cols
+            })
+
+
+def prefix_ranges(prefixes: List[str]) -> List[Tuple[str, Optional[str]]]:
+    """
+    [low, high) geohash ranges holding the given sorted prefixes, merging
+    neighbours that are adjacent in the index; high None means unbounded.
+    """
+    ranges = []
+    for prefix in prefixes:
+        high = prefix.rstrip(_BASE32[-1])
+        high = high[:-1] + _BASE32[_BASE32.index(high[-1]) + 1] if high else None
+        if ranges and ranges[-1][1] == prefix.rstrip(_BASE32[0]):
+            ranges[-1] = (ranges[-1][0], high)
+        else:
+            ranges.append((prefix, high))
+    return ranges
+
+
+# ===== NEARBY SEARCH =====
+
+
+def distance_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle (haversine) distance in metres"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (
+        math.sin((phi2 - phi1) / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(latitude: float, longitude: float, radius_m: float) -> Tuple[float, float, float, float]:
+    """
+    (lat_lo, lat_hi, lon_lo, lon_hi) enclosing a circle; the longitudes
+    span -180..180 when the circle reaches a pole or is wider than every
+    parallel it crosses, and may run past +-180 when it crosses the
+    antimeridian.
+    """
+    dlat = math.degrees(radius_m / EARTH_RADIUS_M)
+    lat_lo, lat_hi = latitude - dlat, latitude + dlat
+    if lat_lo <= -90 or lat_hi >= 90:
+        return max(lat_lo, -90.0), min(lat_hi, 90.0), -180.0, 180.0
+    ratio = math.sin(radius_m / EARTH_RADIUS_M) / math.cos(math.radians(latitude))
+    if ratio >= 1:
+        return lat_lo, lat_hi, -180.0, 180.0
+    dlon = math.degrees(math.asin(ratio))
+    return lat_lo, lat_hi, longitude - dlon, longitude + dlon
+
+
+def _longitude_spans(lon_lo: float, lon_hi: float) -> List[Tuple[float, float]]:
+    if lon_lo < -180:
+        return [(lon_lo + 360, 180.0), (-180.0, lon_hi)]
+    if lon_hi > 180:
+        return [(lon_lo, 180.0), (-180.0, lon_hi - 360)]
+    return [(lon_lo, lon_hi)]
+
+
+def _geohash_probe(lat_lo, lat_hi, lon_lo, lon_hi):
+    """Condition selecting the places in a box through ix_places_geohash"""
+    geohash_ranges = [
+        and_(models.Place.geohash >= low, models.Place.geohash < high) if high else models.Place.geohash >= low
+        for low, high in prefix_ranges(covering_cells(lat_lo, lat_hi, lon_lo, lon_hi))
+    ]
+    return and_(
+        or_(*geohash_ranges),
+        models.Place.latitude.between(lat_lo, lat_hi),
+        or_(*(models.Place.longitude.between(low, high) for low, high in _longitude_spans(lon_lo, lon_hi))),
+    )
+
+
+def _gist_probe(lat_lo, lat_hi, lon_lo, lon_hi):
+    """Condition selecting the places in a box through the PostgreSQL GiST index ix_places_location"""
+    location = func.point(models.Place.longitude, models.Place.latitude)
+    return or_(*(
+        location.op("<@")(func.box(func.point(low, lat_lo), func.point(high, lat_hi)))
+        for low, high in _longitude_spans(lon_lo, lon_hi)
+    ))
+
+
+async def find_nearby_places(
+    db,
+    latitude: float,
+    longitude: float,
+    radius_m: float = DEFAULT_NEARBY_RADIUS_M,
+    limit: int = DEFAULT_NEARBY_LIMIT,
+) -> List[Tuple[models.Place, float]]:
+    """
+    Return the `limit` places nearest to a point within radius_m metres,
+    nearest first, as (place, distance in metres) pairs.
+
+    Each probe reads only the places inside the bounding box of a circle
+    around the point, through ix_places_geohash (or the GiST index on
+    PostgreSQL). It starts with a small circle and grows it until the
+    circle holds `limit` places or reaches radius_m: once it holds that
+    many, no place outside it can be nearer. Dense areas thus cost one
+    small probe however many places the table holds.
+    """
+    probe = _gist_probe if db.bind.dialect.name == "postgresql" else _geohash_probe
+    ring = max(radius_m * FIRST_RING_FRACTION, 1.0)
+    while True:
+        ring = min(ring, radius_m)
+        places = (await db.scalars(
+            select(models.Place).where(probe(*bounding_box(latitude, longitude, ring)))
+        )).all()
+        found = sorted(
+            (
+                (place, distance)
+                for place in places
+                if (distance := distance_m(latitude, longitude, place.latitude, place.longitude)) <= ring
+            ),
+            key=lambda found_place: (found_place[1], found_place[0].id),
+        )
+        if len(found) >= limit or ring >= radius_m:
+            return found[:limit]
+        ring *= RING_GROWTH
@@ -0,0 +1,177 @@
+import logging
+import math
+import os
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import orjson
+
+from app import metrics
+
+logger = logging.getLogger(__name__)
+
+# ===== BACKENDS =====
+# Token buckets: each client may burst up to `burst` requests, refilled at
+# `rate` tokens per second. take() spends one token from the client's
+# bucket and returns 0 when it had one, otherwise the seconds until it will.
+
+
+class MemoryRateLimiter:
+    """
+    Buckets kept in this process, least recently used evicted first.
+
+    Every gunicorn worker counts on its own, so a client may get up to
+    workers * rate; use the Redis backend for one limit per container.
+    """
+
+    def __init__(self, rate: float, burst: int, max_clients: int = 100000):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+
+    async def take(self, key: str) -> float:
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [float(self.burst), now]
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0.0
+        return (1 - bucket[0]) / self.rate
+
+
+# Refill and take atomically on the server; buckets of idle clients expire
+_TAKE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(bucket[1]) or burst
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return tostring(wait)
+"""
+
+
+class RedisRateLimiter:
+    """
+    Buckets shared by all workers through any Redis-protocol server.
+
+    Pass an existing client (e.g. a fakeredis.aioredis.FakeRedis in tests)
+    or a URL.
+    """
+
+    def __init__(self, rate: float, burst: int, client=None, url: Optional[str] = None,
+                 prefix: str = "schedulink:ratelimit:"):
+        if client is None:
+            import redis.asyncio as redis
+            client = redis.Redis.from_url(url or "redis://localhost:6379/0")
+        self.rate = rate
+        self.burst = burst
+        self.client = client
+        self.prefix = prefix
+        self._take = client.register_script(_TAKE_SCRIPT)
+
+    async def take(self, key: str) -> float:
+        wait = await self._take(keys=[self.prefix + key], args=[self.rate, self.burst, time.time()])
+        return float(wait)
+
+
+# ===== ASGI MIDDLEWARE =====
+
+# Probes, scrapes and the long-lived event stream are never limited
+EXEMPT_PATHS = ("/health", "/metrics", "/slots/stream")
+
+
+class RateLimitMiddleware:
+    """
+    Answers 429 with Retry-After once a client has spent its bucket.
+
+    Clients are told apart by IP address (behind a proxy, configure
+    gunicorn/uvicorn forwarded_allow_ips so the client address is the
+    real one), or by the value of key_header when the request has one,
+    e.g. a user id set by an authenticating proxy.
+    """
+
+    def __init__(self, app, limiter, key_header: Optional[str] = None):
+        self.app = app
+        self.limiter = limiter
+        self.key_header = key_header.lower().encode() if key_header else None
+
+    def client_key(self, scope) -> str:
+        if self.key_header:
+            for name, value in scope["headers"]:
+                if name == self.key_header and value:
+                    return "user:" + value.decode("latin-1")
+        client = scope.get("client")
+        return "ip:" + (client[0] if client else "unknown")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.limiter is None or scope["path"].startswith(EXEMPT_PATHS):
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            wait = await self.limiter.take(self.client_key(scope))
+        except Exception as e:
+            # Never turn a limiter outage into an API outage
+            logger.warning(f"Rate limiter unavailable, allowing request: {str(e)}")
+            wait = 0.0
+        if not wait:
+            await self.app(scope, receive, send)
+            return
+
+        metrics.RATE_LIMITED.labels(scope["method"]).inc()
+        body = orjson.dumps({"detail": "Too many requests"})
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(math.ceil(wait)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+def build_rate_limiter():
+    """
+    Create the rate limiter from the environment, or None when disabled.
+
+    RATE_LIMIT_BACKEND is "memory", "redis" or "none" (the default).
+    Each client gets RATE_LIMIT_PER_SECOND requests per second on
+    average, in bursts of up to RATE_LIMIT_BURST.
+    """
+    backend_name = os.getenv("RATE_LIMIT_BACKEND", "none")
+    rate = float(os.getenv("RATE_LIMIT_PER_SECOND", "20"))
+    burst = int(os.getenv("RATE_LIMIT_BURST", "40"))
+
+    if backend_name in ("redis", "memory") and not (os.getenv("FORWARDED_ALLOW_IPS") or os.getenv("RATE_LIMIT_KEY_HEADER")):
+        # Behind a proxy every request would then share the proxy's bucket
+        logger.warning(
+            "Rate limiting keys clients by peer address; behind a proxy set FORWARDED_ALLOW_IPS "
+            "to its address or RATE_LIMIT_KEY_HEADER, or all clients share one bucket"
+        )
+
+    if backend_name == "redis":
+        return RedisRateLimiter(rate, burst, url=os.getenv("REDIS_URL"))
+    if backend_name == "memory":
+        return MemoryRateLimiter(rate, burst)
+    return None
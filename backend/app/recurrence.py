@@ -0,0 +1,34 @@
+from datetime import datetime, timedelta
+from typing import Dict, Iterator
+
+from app import schemas
+
+
+def expand_recurrence(rule: schemas.SlotRecurrence) -> Iterator[Dict]:
+    """
+    Expand a recurring availability rule into slot rows.
+
+    Yields one dict per slot, ready for a bulk insert, in date and start
+    time order. A trailing partial slot that would run past day_end is
+    not generated.
+    """
+    day = rule.start_date
+    step = timedelta(minutes=rule.slot_minutes)
+    weekdays = set(rule.weekdays)
+
+    while day <= rule.end_date:
+        if day.weekday() in weekdays:
+            start = datetime.combine(day, rule.day_start)
+            day_end = datetime.combine(day, rule.day_end)
+            while start + step <= day_end:
+                end = start + step
+                yield {
+                    "title": rule.title,
+                    "description": rule.description,
+                    "date": day,
+                    "start_time": start.time(),
+                    "end_time": end.time(),
+                    "user_id": rule.user_id,
+                }
+                start = end
+        day += timedelta(days=1)
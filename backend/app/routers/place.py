@@ -1,36 +1,58 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.schemas import place as schemas
-from app.models import models
-from app.database.db import get_db
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models, places, schemas
+from app.database import get_async_db, get_read_db
 
 router = APIRouter()
 
-@router.post("/", response_model=schemas.Place)
-def create_place(place: schemas.PlaceCreate, db: Session = Depends(get_db)):
-    db_place = models.Place(**place.dict())
+@router.post("", response_model=schemas.PlaceOut)
+async def create_place(place: schemas.PlaceCreate, db: AsyncSession = Depends(get_async_db)):
+    """Create a place"""
+    db_place = models.Place(**place.model_dump(), geohash=places.geohash(place.latitude, place.longitude))
     db.add(db_place)
-    db.commit()
-    db.refresh(db_place)
+    await db.commit()
+    await db.refresh(db_place)
     return db_place
 
-@router.get("/", response_model=list[schemas.Place])
-def get_places(db: Session = Depends(get_db)):
-    return db.query(models.Place).all()
+@router.get("", response_model=List[schemas.PlaceOut])
+async def get_places(db: AsyncSession = Depends(get_read_db)):
+    """Get all places"""
+    return (await db.scalars(select(models.Place).order_by(models.Place.id))).all()
 
-@router.get("/{place_id}", response_model=schemas.Place)
-def get_place(place_id: int, db: Session = Depends(get_db)):
-    place = db.query(models.Place).filter(models.Place.id == place_id).first()
+# Declared before /{place_id} so "nearby" is not taken for an id
+@router.get("/nearby", response_model=List[schemas.NearbyPlace])
+async def get_nearby_places(
+    lat: float = Query(..., ge=-90, le=90, description="Latitude of the search point"),
+    lon: float = Query(..., ge=-180, le=180, description="Longitude of the search point"),
+    radius: float = Query(places.DEFAULT_NEARBY_RADIUS_M, gt=0, le=places.MAX_NEARBY_RADIUS_M, description="Search radius in metres"),
+    limit: int = Query(places.DEFAULT_NEARBY_LIMIT, ge=1, le=places.MAX_NEARBY_LIMIT, description="Number of places to return"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Get the places nearest to a point within a radius, nearest first"""
+    found = await places.find_nearby_places(db, lat, lon, radius, limit)
+    return [
+        schemas.NearbyPlace(**schemas.PlaceOut.model_validate(place).model_dump(), distance_m=round(distance, 1))
+        for place, distance in found
+    ]
+
+@router.get("/{place_id}", response_model=schemas.PlaceOut)
+async def get_place(place_id: int, db: AsyncSession = Depends(get_read_db)):
+    """Get a specific place by ID"""
+    place = await db.get(models.Place, place_id)
     if not place:
         raise HTTPException(status_code=404, detail="Place not found")
     return place
 
 @router.delete("/{place_id}")
-def delete_place(place_id: int, db: Session = Depends(get_db)):
-    place = db.query(models.Place).filter(models.Place.id == place_id).first()
+async def delete_place(place_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Delete a place"""
+    place = await db.get(models.Place, place_id)
     if not place:
         raise HTTPException(status_code=404, detail="Place not found")
-    db.delete(place)
-    db.commit()
+    await db.delete(place)
+    await db.commit()
     return {"message": "Place deleted"}
-
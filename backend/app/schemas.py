@@ -1,5 +1,6 @@
-from pydantic import BaseModel, Field
-from typing import Optional
+import datetime as dt
+from pydantic import BaseModel, Field, field_serializer, field_validator, model_validator
+from typing import List, Optional
 
 
 class UserCreate(BaseModel):
@@ -18,29 +19,82 @@ class UserOut(BaseModel):
         from_attributes = True
 
 
+def format_utc(value: Optional[dt.datetime]) -> Optional[str]:
+    """Format a naive UTC datetime as ISO 8601 with a Z suffix"""
+    return value.isoformat() + "Z" if value is not None else None
+
+
+def check_local_time(value: Optional[dt.time]) -> Optional[dt.time]:
+    """Slot times are wall-clock times on the slot's date; refuse a UTC offset rather than compare it with stored ones"""
+    if value is not None and value.tzinfo is not None:
+        raise ValueError("time must not have a UTC offset")
+    return value
+
+
+def check_time_order(start_time: Optional[dt.time], end_time: Optional[dt.time]):
+    if start_time is not None and end_time is not None and end_time <= start_time:
+        raise ValueError("end_time must be after start_time")
+
+
 class SlotCreate(BaseModel):
     title: str = Field(..., description="Slot title")
     description: Optional[str] = Field(None, description="Slot description")
-    date: str = Field(..., description="Date of the slot (YYYY-MM-DD)")
-    start_time: str = Field(..., description="Start time (HH:MM format)")
-    end_time: str = Field(..., description="End time (HH:MM format)")
+    date: dt.date = Field(..., description="Date of the slot (YYYY-MM-DD)")
+    start_time: dt.time = Field(..., description="Start time (HH:MM format)")
+    end_time: dt.time = Field(..., description="End time (HH:MM format)")
     user_id: Optional[int] = Field(None, description="ID of the user creating the slot")
 
+    @field_validator("start_time", "end_time")
+    @classmethod
+    def check_local_times(cls, value):
+        return check_local_time(value)
+
+    @model_validator(mode="after")
+    def check_times(self):
+        check_time_order(self.start_time, self.end_time)
+        return self
+
 
 class SlotOut(BaseModel):
     id: int
     title: str
     description: Optional[str] = None
-    date: str
-    start_time: str
-    end_time: str
+    date: dt.date
+    start_time: dt.time
+    end_time: dt.time
     is_booked: bool = False
     user_id: Optional[int] = None
     booked_by_user_id: Optional[int] = None
+    hold_expires_at: Optional[dt.datetime] = None
 
     class Config:
         from_attributes = True
 
+    # Keep the string formats clients have always received
+    @field_serializer("date")
+    def serialize_date(self, value: dt.date) -> str:
+        return value.isoformat()
+
+    @field_serializer("start_time", "end_time")
+    def serialize_time(self, value: dt.time) -> str:
+        return value.strftime("%H:%M")
+
+    @field_serializer("hold_expires_at")
+    def serialize_hold_expires_at(self, value: Optional[dt.datetime]) -> Optional[str]:
+        return format_utc(value)
+
+
+class UserOverview(BaseModel):
+    user: UserOut
+    slot_count: int = Field(..., description="Slots the user created")
+    booking_count: int = Field(..., description="Slots the user booked")
+    slots: List[SlotOut] = Field(..., description="Page of created slots, by date and start time")
+    slots_next_cursor: Optional[str] = Field(None, description="Pass as slots_cursor for the next page")
+    bookings: List[SlotOut] = Field(..., description="Page of booked slots, by date and start time")
+    bookings_next_cursor: Optional[str] = Field(None, description="Pass as bookings_cursor for the next page")
+    next_slot: Optional[SlotOut] = Field(None, description="Next upcoming created slot")
+    next_booking: Optional[SlotOut] = Field(None, description="Next upcoming booked slot")
+
 
 class SlotBooking(BaseModel):
     user_id: int = Field(..., description="ID of the user booking the slot")
@@ -49,7 +103,84 @@ class SlotBooking(BaseModel):
 class SlotUpdate(BaseModel):
     title: Optional[str] = None
     description: Optional[str] = None
-    date: Optional[str] = None
-    start_time: Optional[str] = None
-    end_time: Optional[str] = None
+    date: Optional[dt.date] = None
+    start_time: Optional[dt.time] = None
+    end_time: Optional[dt.time] = None
+
+    # Each field may be left out, but the columns cannot be emptied
+    @field_validator("title", "date", "start_time", "end_time")
+    @classmethod
+    def check_not_null(cls, value):
+        if value is None:
+            raise ValueError("may be omitted but not null")
+        return value
+
+    @field_validator("start_time", "end_time")
+    @classmethod
+    def check_local_times(cls, value):
+        return check_local_time(value)
+
+    @model_validator(mode="after")
+    def check_times(self):
+        check_time_order(self.start_time, self.end_time)
+        return self
+
+
+class SlotRecurrence(BaseModel):
+    title: str = Field(..., description="Title given to every generated slot")
+    description: Optional[str] = Field(None, description="Description given to every generated slot")
+    user_id: Optional[int] = Field(None, description="ID of the user creating the slots")
+    start_date: dt.date = Field(..., description="First date to generate slots on (YYYY-MM-DD)")
+    end_date: dt.date = Field(..., description="Last date to generate slots on, inclusive (YYYY-MM-DD)")
+    weekdays: List[int] = Field([0, 1, 2, 3, 4], description="Days of the week to include (0 = Monday ... 6 = Sunday)")
+    day_start: dt.time = Field(dt.time(9, 0), description="Start of the working day (HH:MM format)")
+    day_end: dt.time = Field(dt.time(17, 0), description="End of the working day (HH:MM format)")
+    slot_minutes: int = Field(30, gt=0, le=24 * 60, description="Length of each slot in minutes")
+
+    @field_validator("weekdays")
+    @classmethod
+    def check_weekdays(cls, value):
+        if any(day < 0 or day > 6 for day in value):
+            raise ValueError("weekdays must be between 0 (Monday) and 6 (Sunday)")
+        return value
+
+    @field_validator("day_start", "day_end")
+    @classmethod
+    def check_local_times(cls, value):
+        return check_local_time(value)
+
+    @model_validator(mode="after")
+    def check_ranges(self):
+        if self.end_date < self.start_date:
+            raise ValueError("end_date must not be before start_date")
+        if self.day_end <= self.day_start:
+            raise ValueError("day_end must be after day_start")
+        return self
+
+
+class PlaceCreate(BaseModel):
+    name: str = Field(..., description="Place name")
+    address: Optional[str] = Field(None, description="Street address")
+    city: Optional[str] = Field(None, description="City")
+    state: Optional[str] = Field(None, description="State")
+    zip_code: Optional[str] = Field(None, description="ZIP code")
+    latitude: float = Field(..., ge=-90, le=90, description="Latitude in degrees (WGS 84)")
+    longitude: float = Field(..., ge=-180, le=180, description="Longitude in degrees (WGS 84)")
+
+
+class PlaceOut(BaseModel):
+    id: int
+    name: str
+    address: Optional[str] = None
+    city: Optional[str] = None
+    state: Optional[str] = None
+    zip_code: Optional[str] = None
+    latitude: float
+    longitude: float
+
+    class Config:
+        from_attributes = True
+
 
+class NearbyPlace(PlaceOut):
+    distance_m: float = Field(..., description="Great-circle distance from the search point in metres")
@@ -0,0 +1,108 @@
+import base64
+import json
+import os
+import re
+from collections import namedtuple
+from typing import List, Optional, Tuple
+
+from sqlalchemy import and_, bindparam, column, func, literal_column, or_, select, table
+from sqlalchemy.dialects.postgresql import TSVECTOR
+
+from app import models
+from app.pagination import InvalidCursor
+from app.serialization import SLOT_OUT_FIELDS
+
+# Most words of a query that are searched for
+MAX_SEARCH_TERMS = 16
+# Most matches one search ranks: ranking reads every candidate, so a
+# search matching more ranks only the most recently created this many
+MAX_RANKED_MATCHES = int(os.getenv("SEARCH_MAX_RANKED", "1000"))
+
+# ===== QUERIES =====
+# PostgreSQL matches through ix_slots_search on slots.search_vector,
+# SQLite through slots_fts (see app/models.py)
+
+slots_fts = table(models.SLOT_SEARCH_TABLE, column("rowid"), column(models.SLOT_SEARCH_TABLE))
+search_vector = literal_column(f"slots.{models.SLOT_SEARCH_COLUMN}", TSVECTOR)
+# bm25 is lower for better matches; titles weigh 10 times descriptions
+_BM25 = literal_column(f"bm25({models.SLOT_SEARCH_TABLE}, 10.0, 1.0)")
+
+
+def search_terms(q: str) -> List[str]:
+    """The words of a search query, lower-cased; punctuation and operators are ignored"""
+    return re.findall(r"\w+", q.lower())[:MAX_SEARCH_TERMS]
+
+
+def search_slots_query(stmt, dialect: str, terms: List[str]):
+    """
+    Restrict a select of slot columns to the slots matching every term
+    and return it with its rank expression (higher ranks better) and the
+    slot id as the index it matched through orders it.
+    """
+    if dialect == "postgresql":
+        # Inline, not a bound parameter: a generic plan of the prepared
+        # statement could not tell common words from rare ones
+        words = bindparam("words", " ".join(terms), literal_execute=True)
+        query = func.plainto_tsquery(literal_column(f"'{models.SEARCH_CONFIG}'::regconfig"), words)
+        return stmt.where(search_vector.op("@@")(query)), func.ts_rank(search_vector, query), models.Slot.id
+    match = " ".join(f'"{term}"' for term in terms)
+    stmt = stmt.join(slots_fts, slots_fts.c.rowid == models.Slot.id).where(
+        slots_fts.c[models.SLOT_SEARCH_TABLE].op("MATCH")(match)
+    )
+    # slots_fts yields its matches in rowid order, newest last
+    return stmt, -_BM25, slots_fts.c.rowid
+
+
+# A result row without its rank, as select(*SLOT_LIST_COLUMNS) returns it
+SlotRow = namedtuple("SlotRow", SLOT_OUT_FIELDS + ("version",))
+
+
+# ===== PAGINATION =====
+# Results are ordered by rank, best first, then id; cursors carry the
+# (rank, id) of the last result of a page.
+
+
+def encode_cursor(rank: float, slot_id: int) -> str:
+    raw = json.dumps([rank, slot_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[float, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        rank, slot_id = json.loads(base64.urlsafe_b64decode(padded))
+        if not isinstance(rank, (int, float)) or not isinstance(slot_id, int):
+            raise TypeError("rank must be a number and slot id an integer")
+        return float(rank), slot_id
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from e
+
+
+async def search_slots(db, stmt, terms: List[str], limit: int, cursor: Optional[str] = None):
+    """
+    Run a full-text search over slot titles and descriptions on a select
+    of slot columns (e.g. select(*SLOT_LIST_COLUMNS) with filters
+    applied), best matches first.
+
+    Matches come from ix_slots_search on PostgreSQL and the slots_fts
+    FTS5 index on SQLite, and only matching rows are filtered. Ranking
+    reads each match, so at most MAX_RANKED_MATCHES are ranked: the most
+    recently created, which keeps very common words as cheap as rare ones
+    and the ranked set the same on every page. Returns the page of slots
+    and the cursor for the next page (None on the last page).
+    """
+    stmt, rank, key = search_slots_query(stmt, db.bind.dialect.name, terms)
+    # Index-ordered, so the scan stops at the newest MAX_RANKED_MATCHES
+    ranked = stmt.add_columns(rank.label("rank")).order_by(key.desc()).limit(MAX_RANKED_MATCHES).subquery()
+    stmt = select(ranked)
+    if cursor:
+        after_rank, after_id = decode_cursor(cursor)
+        stmt = stmt.where(or_(ranked.c.rank < after_rank, and_(ranked.c.rank == after_rank, ranked.c.id > after_id)))
+
+    stmt = stmt.order_by(ranked.c.rank.desc(), ranked.c.id).limit(limit + 1)
+    rows = (await db.execute(stmt)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].rank, rows[-1].id)
+    return [SlotRow._make(row[:-1]) for row in rows], next_cursor
@@ -0,0 +1,42 @@
+from typing import Iterable, List
+
+import orjson
+
+from app import models
+from app.schemas import format_utc
+
+# Columns selected for slot listings, in SlotOut field order. version is
+# only read for ETags and is not part of the response body.
+SLOT_OUT_FIELDS = (
+    "id", "title", "description", "date", "start_time", "end_time",
+    "is_booked", "user_id", "booked_by_user_id", "hold_expires_at",
+)
+SLOT_LIST_COLUMNS = tuple(getattr(models.Slot, name) for name in SLOT_OUT_FIELDS) + (models.Slot.version,)
+
+
+def slot_rows(rows: Iterable) -> List[dict]:
+    """
+    Turn slot rows (from select(*SLOT_LIST_COLUMNS)) into the JSON-ready
+    dicts SlotOut would produce, without building a pydantic model per row.
+    """
+    return [
+        {
+            "id": slot_id,
+            "title": title,
+            "description": description,
+            "date": date,
+            "start_time": start_time.isoformat(timespec="minutes"),
+            "end_time": end_time.isoformat(timespec="minutes"),
+            "is_booked": is_booked,
+            "user_id": user_id,
+            "booked_by_user_id": booked_by_user_id,
+            "hold_expires_at": format_utc(hold_expires_at),
+        }
+        # Positional unpacking is several times faster than Row attribute access
+        for slot_id, title, description, date, start_time, end_time, is_booked, user_id, booked_by_user_id, hold_expires_at, _ in rows
+    ]
+
+
+def slot_rows_body(rows: Iterable) -> bytes:
+    """Encode slot rows as the JSON list SlotOut would produce"""
+    return orjson.dumps(slot_rows(rows))
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Async vs sync endpoint benchmark
+
+Drives the async slot endpoints in app.main and a sync reference copy of
+the same handlers (the pre-async threadpool path using SessionLocal)
+with the same number of concurrent clients, and reports requests/sec
+and latency percentiles for each. Requests that time out, e.g. because
+the threadpool is starved waiting on the connection pool, are counted
+as errors.
+
+Uses a throwaway SQLite database unless DATABASE_URL is set, in which
+case both paths run against that database (e.g. a local Postgres):
+
+    python benchmarks/async_vs_sync.py --clients 500 --requests 5000
+"""
+
+import argparse
+import asyncio
+import datetime as dt
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+import httpx
+from fastapi import Depends, FastAPI, HTTPException
+from sqlalchemy.orm import Session
+
+from app import models, schemas
+from app.database import SessionLocal, async_engine, engine, get_db
+from app.main import app as async_app
+
+
+def build_sync_app():
+    """The slot read endpoints as they were before the async conversion"""
+    sync_app = FastAPI()
+
+    @sync_app.get("/slots/{slot_id}", response_model=schemas.SlotOut)
+    def get_slot(slot_id: int, db: Session = Depends(get_db)):
+        slot = db.query(models.Slot).filter(models.Slot.id == slot_id).first()
+        if not slot:
+            raise HTTPException(status_code=404, detail="Slot not found")
+        return slot
+
+    @sync_app.get("/slots", response_model=list[schemas.SlotOut])
+    def list_slots(date: dt.date, db: Session = Depends(get_db)):
+        return (
+            db.query(models.Slot)
+            .filter(models.Slot.date == date)
+            .order_by(models.Slot.date, models.Slot.start_time, models.Slot.id)
+            .limit(50)
+            .all()
+        )
+
+    return sync_app
+
+
+def seed(slot_count):
+    models.Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        if db.query(models.Slot).count() >= slot_count:
+            return
+        user = models.User(email=f"bench-{time.time_ns()}@example.com", name="Bench")
+        db.add(user)
+        db.flush()
+        rows = []
+        for i in range(slot_count):
+            # One-minute slots spread over 28 days, never overlapping
+            start = dt.datetime(2030, 1, (i % 28) + 1) + dt.timedelta(minutes=(i // 28) % 1439)
+            rows.append({
+                "title": f"Slot {i}",
+                "date": start.date(),
+                "start_time": start.time(),
+                "end_time": (start + dt.timedelta(minutes=1)).time(),
+                "is_booked": False,
+                "user_id": user.id,
+            })
+        db.bulk_insert_mappings(models.Slot, rows)
+        db.commit()
+    finally:
+        db.close()
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+async def drive(asgi_app, clients, requests, slot_count, timeout):
+    latencies = []
+    errors = 0
+    counter = iter(range(requests))
+    transport = httpx.ASGITransport(app=asgi_app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker():
+            for i in counter:
+                if i % 2:
+                    url = f"/slots/{(i % slot_count) + 1}"
+                else:
+                    url = f"/slots?date=2030-01-{(i % 28) + 1:02d}&limit=50"
+                start = time.perf_counter()
+                try:
+                    response = await asyncio.wait_for(client.get(url), timeout)
+                    ok = response.status_code == 200
+                except Exception:
+                    ok = False
+                latencies.append(time.perf_counter() - start)
+                if not ok:
+                    nonlocal errors
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(clients)])
+        elapsed = time.perf_counter() - started
+
+    return {
+        "requests_per_sec": round(requests / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "errors": errors,
+    }
+
+
+async def run(clients, requests, slot_count, timeout):
+    try:
+        return {
+            "async": await drive(async_app, clients, requests, slot_count, timeout),
+            "sync": await drive(build_sync_app(), clients, requests, slot_count, timeout),
+        }
+    finally:
+        await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=500, help="Concurrent clients")
+    parser.add_argument("--requests", type=int, default=5000, help="Total requests per path")
+    parser.add_argument("--slots", type=int, default=10000, help="Slots to seed")
+    parser.add_argument("--timeout", type=float, default=10.0, help="Per-request timeout in seconds; timeouts count as errors")
+    args = parser.parse_args()
+
+    seed(args.slots)
+    results = asyncio.run(run(args.clients, args.requests, args.slots, args.timeout))
+
+    print(f"{'path':<8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for name, stats in results.items():
+        print(f"{name:<8}{stats['requests_per_sec']:>10}{stats['p50_ms']:>10}{stats['p99_ms']:>10}{stats['errors']:>8}")
+
+
+if __name__ == "__main__":
+    main()
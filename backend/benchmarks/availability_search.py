@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Availability search benchmark and dataset generator
+
+Generates a large slot table (providers with 30- and 60-minute slots on
+weekdays, most of them booked, a few held) and times
+availability.search_free_slots for typical searches, reporting p50/p95
+latency. Uses a throwaway SQLite database unless DATABASE_URL is set;
+pass --reuse to search an already generated dataset again.
+
+    python benchmarks/availability_search.py --slots 1000000
+    DATABASE_URL=postgresql://... python benchmarks/availability_search.py --reuse
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, time as dtime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+from sqlalchemy import func, insert, select, text
+
+from app import availability, holds, models
+from app.database import AsyncSessionLocal, async_engine, engine
+from app.pagination import SLOT_ORDER
+from app.serialization import SLOT_LIST_COLUMNS
+
+TITLE = "Availability bench"
+START = date(2035, 1, 1)
+
+
+def provider_day(provider_id, day, long_slots):
+    """One provider's slots for one day, 08:00-18:00"""
+    length = 60 if long_slots else 30
+    for minute in range(8 * 60, 18 * 60, length):
+        yield {
+            "title": TITLE,
+            "date": day,
+            "start_time": dtime(minute // 60, minute % 60),
+            "end_time": dtime((minute + length) // 60, (minute + length) % 60),
+            "user_id": provider_id,
+            "is_booked": False,
+            "booked_by_user_id": None,
+            "held_by_user_id": None,
+            "hold_expires_at": None,
+        }
+
+
+def generate(slots, providers, booked, held, seed):
+    """Insert about `slots` slots, a weekday at a time"""
+    rng = random.Random(seed)
+    models.Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        provider_ids = [
+            row.id for row in conn.execute(
+                insert(models.User).returning(models.User.id),
+                [{"email": f"bench-provider-{seed}-{i}@example.com", "name": f"Provider {i}"} for i in range(providers)],
+            )
+        ]
+        customer_id = provider_ids[0]
+        lapse = holds.utcnow() + timedelta(hours=1)
+
+        created, day, batch = 0, START, []
+        while created < slots:
+            if day.weekday() < 5:
+                for i, provider_id in enumerate(provider_ids):
+                    for slot in provider_day(provider_id, day, long_slots=i % 2 == 1):
+                        roll = rng.random()
+                        if roll < booked:
+                            slot.update(is_booked=True, booked_by_user_id=customer_id)
+                        elif roll < booked + held:
+                            slot.update(held_by_user_id=customer_id, hold_expires_at=lapse)
+                        batch.append(slot)
+                if len(batch) >= 20000:
+                    conn.execute(insert(models.Slot), batch)
+                    created += len(batch)
+                    batch = []
+                    print(f"  {created} slots", end="\r", flush=True)
+            day += timedelta(days=1)
+        if batch:
+            conn.execute(insert(models.Slot), batch)
+            created += len(batch)
+    print(f"Generated {created} slots for {providers} providers up to {day}")
+
+
+async def dataset_bounds():
+    async with AsyncSessionLocal() as db:
+        count, last = (await db.execute(
+            select(func.count(), func.max(models.Slot.date)).where(models.Slot.title == TITLE)
+        )).one()
+        provider_ids = (await db.scalars(
+            select(models.Slot.user_id).where(models.Slot.title == TITLE).distinct().limit(50)
+        )).all()
+    return count, last, provider_ids
+
+
+def searches(last, provider_ids):
+    middle = START + (last - START) / 2
+    return {
+        "next 10 free": dict(date_from=START),
+        "next 10 free, mid-range": dict(date_from=middle),
+        "afternoons, 60+ min": dict(date_from=START, time_from=dtime(13, 0), duration_minutes=60),
+        "3 providers, next 20": dict(date_from=START, user_ids=provider_ids[:3], limit=20),
+        "one week window": dict(date_from=middle, date_to=middle + timedelta(days=7), limit=100),
+    }
+
+
+async def explain(kwargs):
+    # Show which index the base search uses
+    if engine.dialect.name != "sqlite":
+        return
+    stmt = select(*SLOT_LIST_COLUMNS).where(
+        models.Slot.is_booked == False,  # noqa: E712
+        models.Slot.date >= kwargs["date_from"],
+        holds.hold_is_free(datetime(2035, 1, 1)),
+    ).order_by(*SLOT_ORDER).limit(10)
+    compiled = stmt.compile(engine, compile_kwargs={"literal_binds": True})
+    async with AsyncSessionLocal() as db:
+        plan = (await db.execute(text(f"EXPLAIN QUERY PLAN {compiled}"))).all()
+    print("Plan: " + "; ".join(row[-1] for row in plan))
+
+
+async def run(args):
+    if not args.reuse:
+        generate(args.slots, args.providers, args.booked, args.held, args.seed)
+    count, last, provider_ids = await dataset_bounds()
+    if not count:
+        sys.exit("No benchmark dataset found; run without --reuse first")
+    print(f"Dataset: {count} slots, {START} to {last}")
+
+    cases = searches(last, provider_ids)
+    await explain(cases["next 10 free"])
+    print(f"{'search':<26} {'rows':>5} {'p50 ms':>8} {'p95 ms':>8}")
+    for label, kwargs in cases.items():
+        timings = []
+        async with AsyncSessionLocal() as db:
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                rows = await availability.search_free_slots(db, **kwargs)
+                timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        p95 = timings[max(0, int(len(timings) * 0.95) - 1)]
+        print(f"{label:<26} {len(rows):>5} {statistics.median(timings):>8.2f} {p95:>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--slots", type=int, default=1000000, help="Approximate number of slots to generate")
+    parser.add_argument("--providers", type=int, default=200, help="Number of providers")
+    parser.add_argument("--booked", type=float, default=0.8, help="Fraction of slots already booked")
+    parser.add_argument("--held", type=float, default=0.02, help="Fraction of slots currently held")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for the dataset")
+    parser.add_argument("--repeat", type=int, default=50, help="Runs per search")
+    parser.add_argument("--reuse", action="store_true", help="Search an existing dataset instead of generating one")
+    args = parser.parse_args()
+
+    async def main_async():
+        try:
+            await run(args)
+        finally:
+            await async_engine.dispose()
+            engine.dispose()
+
+    asyncio.run(main_async())
+
+
+if __name__ == "__main__":
+    main()
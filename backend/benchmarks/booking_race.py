@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Booking race stress check
+
+Fires many concurrent booking requests at a single slot and verifies
+that exactly one of them wins. Runs in-process against a throwaway
+SQLite database by default, or against a running server with --base-url.
+
+    python benchmarks/booking_race.py --requests 500
+    python benchmarks/booking_race.py --base-url http://localhost:8000
+"""
+
+import argparse
+import asyncio
+import contextlib
+import os
+import sys
+import tempfile
+import uuid
+from collections import Counter
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def build_client(base_url):
+    import httpx
+
+    if base_url:
+        return httpx.AsyncClient(base_url=base_url, timeout=60), None
+
+    # Point the app at a fresh database before it is imported
+    db_path = os.path.join(tempfile.mkdtemp(), "booking_race.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    from app.main import app
+
+    client = httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://test", timeout=60
+    )
+    return client, app
+
+
+async def run(base_url, requests):
+    client, app = build_client(base_url)
+    # In-process, the lifespan creates the schema before the first request
+    lifespan = app.router.lifespan_context(app) if app else contextlib.nullcontext()
+    async with lifespan, client:
+        # One provider plus one would-be customer per request
+        tag = uuid.uuid4().hex[:8]
+        provider = (await client.post("/users", json={"email": f"provider-{tag}@example.com", "name": "Provider"})).json()
+        slot = (await client.post("/slots", json={
+            "title": "Race",
+            "date": "2030-01-01",
+            "start_time": "09:00",
+            "end_time": "09:30",
+            "user_id": provider["id"],
+        })).json()
+
+        customers = []
+        for i in range(requests):
+            user = (await client.post("/users", json={"email": f"customer-{tag}-{i}@example.com", "name": f"Customer {i}"})).json()
+            customers.append(user["id"])
+
+        responses = await asyncio.gather(*[
+            client.patch(f"/slots/{slot['id']}/book", json={"user_id": user_id})
+            for user_id in customers
+        ])
+
+        statuses = Counter(r.status_code for r in responses)
+        winners = [r.json() for r in responses if r.status_code == 200]
+        final = (await client.get(f"/slots/{slot['id']}")).json()
+
+    if app is not None:
+        from app.database import async_engine
+        await async_engine.dispose()
+
+    print(f"Requests: {requests}")
+    print(f"Status codes: {dict(statuses)}")
+
+    ok = (
+        len(winners) == 1
+        and statuses[400] == requests - 1
+        and final["is_booked"]
+        and final["booked_by_user_id"] == winners[0]["booked_by_user_id"]
+    )
+    print("PASS: exactly one booking won" if ok else "FAIL: booking race detected")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", help="Run against a live server instead of in-process")
+    parser.add_argument("--requests", type=int, default=300, help="Number of concurrent booking attempts")
+    args = parser.parse_args()
+
+    ok = asyncio.run(run(args.base_url, args.requests))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Slot creation throughput benchmark
+
+Creates the same number of slots through per-row POST /slots calls,
+POST /slots/bulk batches and POST /slots/recurring, and reports rows/sec
+for each. Uses a throwaway SQLite database unless DATABASE_URL is set.
+
+    python benchmarks/bulk_insert.py --rows 5000 --batch 1000
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+import httpx
+
+from app.database import async_engine
+from app.main import app
+
+
+def slot_payload(i, user_id):
+    # One-minute slots, 1439 per day, so a provider's slots never overlap
+    day = date(2031, 1, 1) + timedelta(days=i // 1439)
+    minute = i % 1439
+    return {
+        "title": f"Slot {i}",
+        "date": day.isoformat(),
+        "start_time": f"{minute // 60:02d}:{minute % 60:02d}",
+        "end_time": f"{(minute + 1) // 60:02d}:{(minute + 1) % 60:02d}",
+        "user_id": user_id,
+    }
+
+
+async def timed(label, rows, coro):
+    start = time.perf_counter()
+    created = await coro
+    elapsed = time.perf_counter() - start
+    assert created == rows, f"{label}: expected {rows} rows, created {created}"
+    return label, rows / elapsed
+
+
+async def per_row(client, rows, user_id):
+    created = 0
+    for i in range(rows):
+        response = await client.post("/slots", json=slot_payload(i, user_id))
+        response.raise_for_status()
+        created += 1
+    return created
+
+
+async def bulk(client, rows, batch, user_id):
+    created = 0
+    for offset in range(0, rows, batch):
+        payload = [slot_payload(i, user_id) for i in range(offset, min(rows, offset + batch))]
+        response = await client.post("/slots/bulk", json=payload)
+        response.raise_for_status()
+        created += len(response.json())
+    return created
+
+
+async def recurring(client, rows, user_id):
+    # One slot per minute, every day, over enough days to reach the row count
+    days = -(-rows // (24 * 60))
+    response = await client.post("/slots/recurring", json={
+        "title": "Recurring",
+        "user_id": user_id,
+        "start_date": "2032-01-01",
+        "end_date": f"2032-01-{days:02d}",
+        "weekdays": list(range(7)),
+        "day_start": "00:00",
+        "day_end": "23:59",
+        "slot_minutes": 1,
+    })
+    response.raise_for_status()
+    return len(response.json())
+
+
+async def run(rows, batch):
+    try:
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+                # Separate providers so each path starts from an empty calendar
+                providers = []
+                for path in ("per-row", "bulk", "recurring"):
+                    user = (await client.post("/users", json={"email": f"{path}-{time.time_ns()}@example.com", "name": path})).json()
+                    providers.append(user["id"])
+                results = [
+                    await timed("per-row", rows, per_row(client, rows, providers[0])),
+                    await timed("bulk", rows, bulk(client, rows, batch, providers[1])),
+                ]
+                recurring_rows = -(-rows // (24 * 60)) * (24 * 60 - 1)
+                if recurring_rows <= int(os.getenv("MAX_BULK_SLOTS", "5000")):
+                    results.append(await timed("recurring", recurring_rows, recurring(client, rows, providers[2])))
+    finally:
+        await async_engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5000, help="Slots to create per path")
+    parser.add_argument("--batch", type=int, default=1000, help="Slots per POST /slots/bulk request")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.rows, args.batch))
+    print(f"{'path':<12}{'rows/sec':>12}")
+    for label, rate in results:
+        print(f"{label:<12}{rate:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Burst read benchmark: request coalescing
+
+Sends bursts of identical concurrent GET /slots?date=... requests (a
+popular provider's calendar day being opened) through the app in-process
+and reports latency and the number of slot queries per burst, with the
+cache's single-flight coalescing on and off. The response cache backend
+is "none", as with several workers, so every burst misses the cache.
+Uses a throwaway SQLite database unless DATABASE_URL is set.
+
+    python benchmarks/burst_reads.py --burst 200 --rounds 20
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+os.environ["CACHE_BACKEND"] = "none"
+
+import httpx
+from sqlalchemy import event
+
+from app.database import async_engine
+from app.main import app, slot_cache
+
+DAY = "2033-03-03"
+# Uncoalesced bursts queue hundreds of queries; do not log each as slow
+logging.getLogger("app.instrumentation").setLevel(logging.ERROR)
+
+
+async def seed(client, slots):
+    user = (await client.post("/users", json={"email": f"burst-{time.time()}@example.com", "name": "Burst"})).json()
+    batch = [
+        {"title": "Burst bench", "date": DAY, "start_time": f"{m // 60:02d}:{m % 60:02d}",
+         "end_time": f"{(m + 5) // 60:02d}:{(m + 5) % 60:02d}", "user_id": user["id"]}
+        for m in range(0, min(slots, 280) * 5, 5)
+    ]
+    (await client.post("/slots/bulk", json=batch)).raise_for_status()
+
+
+async def run(args):
+    queries = 0
+
+    @event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+    def count(conn, cursor, statement, *rest):
+        nonlocal queries
+        if "FROM slots" in statement:
+            queries += 1
+
+    flights = slot_cache.flights
+    coalesce = flights.do
+
+    async def no_coalescing(key, load):
+        return await load()
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            await seed(client, args.slots)
+            print(f"{args.burst} identical requests per burst, {args.rounds} bursts")
+            print(f"{'coalescing':<11} {'p50 ms':>8} {'p95 ms':>8} {'burst ms':>9} {'queries/burst':>14}")
+            for label, do in (("off", no_coalescing), ("on", coalesce)):
+                flights.do = do
+                latencies, bursts, queries = [], [], 0
+
+                async def one():
+                    start = time.perf_counter()
+                    response = await client.get("/slots", params={"date": DAY, "limit": 100})
+                    response.raise_for_status()
+                    latencies.append((time.perf_counter() - start) * 1000)
+
+                for _ in range(args.rounds):
+                    start = time.perf_counter()
+                    await asyncio.gather(*(one() for _ in range(args.burst)))
+                    bursts.append((time.perf_counter() - start) * 1000)
+                latencies.sort()
+                print(
+                    f"{label:<11} {statistics.median(latencies):>8.1f} "
+                    f"{latencies[int(len(latencies) * 0.95) - 1]:>8.1f} "
+                    f"{statistics.median(bursts):>9.1f} {queries / args.rounds:>14.1f}"
+                )
+    await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--burst", type=int, default=200, help="Concurrent identical requests per burst")
+    parser.add_argument("--rounds", type=int, default=20, help="Bursts per mode")
+    parser.add_argument("--slots", type=int, default=100, help="Slots on the requested day (max 280)")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
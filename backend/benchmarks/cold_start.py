@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Worker cold-start benchmark
+
+Starts --workers workers at once and measures how long each takes from
+being launched until its first /health/ready check passes, in three
+modes:
+
+    import+migrate     every worker imports the app and runs the
+                       migrations at startup (how workers used to
+                       create the schema)
+    import             every worker imports the app and checks the
+                       schema revision; migrated beforehand by init_db.py
+    preload            the app is imported once, workers are forked
+                       from that process (gunicorn --preload)
+
+Uses a throwaway SQLite database unless DATABASE_URL is set.
+
+    python benchmarks/cold_start.py --workers 4 --rounds 5
+    DATABASE_URL=postgresql://... python benchmarks/cold_start.py
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND)
+
+MODES = ("import+migrate", "import", "preload")
+
+
+def report(event, at):
+    # One write per line, so forked workers cannot interleave their output
+    os.write(sys.stdout.fileno(), f"{event} {at}\n".encode())
+
+
+async def start_worker(app_module):
+    """Run the app's startup and wait for the first passing readiness check"""
+    async with app_module.app.router.lifespan_context(app_module.app):
+        while await app_module.readiness.check():
+            await asyncio.sleep(0.01)
+        ready_at = time.time()
+    await app_module.async_engine.dispose()
+    return ready_at
+
+
+def child(mode, workers):
+    """Entry point of the launched process; prints when the app was imported and each worker was ready"""
+    if mode != "preload":
+        import app.main
+        report("ready", asyncio.run(start_worker(app.main)))
+        return
+
+    # Imported once, as the gunicorn master does with preload_app
+    import app.main
+    from app.database import reset_after_fork
+    report("import", time.time())
+    pids = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            reset_after_fork()
+            report("ready", asyncio.run(start_worker(app.main)))
+            os._exit(0)
+        pids.append(pid)
+    for pid in pids:
+        os.waitpid(pid, 0)
+
+
+def run_round(mode, workers):
+    """Launch the workers together; return (seconds until each is ready, master import seconds)"""
+    env = dict(os.environ, AUTO_MIGRATE=str(mode == "import+migrate").lower())
+    command = [sys.executable, os.path.abspath(__file__), "--child", mode, "--workers", str(workers)]
+    launched = time.time()
+    if mode == "preload":
+        processes = [subprocess.Popen(command, cwd=BACKEND, env=env, stdout=subprocess.PIPE, text=True)]
+    else:
+        processes = [
+            subprocess.Popen(command, cwd=BACKEND, env=env, stdout=subprocess.PIPE, text=True)
+            for _ in range(workers)
+        ]
+    ready, imported = [], None
+    for process in processes:
+        out, _ = process.communicate()
+        if process.returncode:
+            sys.exit(f"{mode} worker failed")
+        for line in out.splitlines():
+            event, at = line.split()
+            if event == "import":
+                imported = float(at) - launched
+            else:
+                ready.append(float(at) - launched)
+    return ready, imported
+
+
+def prepare_database():
+    if "DATABASE_URL" not in os.environ:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'cold_start.db')}"
+    # The one-shot schema step, as in a deploy
+    subprocess.run([sys.executable, "-c", "from init_db import init_database; init_database()"], cwd=BACKEND, check=True,
+                   stdout=subprocess.DEVNULL)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4, help="Workers started at once")
+    parser.add_argument("--rounds", type=int, default=5, help="Rounds per mode")
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        # Workers stop right after becoming ready, often cancelling the
+        # reaper's first sweep; the pool logs that as an error
+        logging.getLogger("sqlalchemy.pool").setLevel(logging.CRITICAL)
+        child(args.child, args.workers)
+        return
+
+    prepare_database()
+    print(f"{args.workers} workers, {args.rounds} rounds, {os.environ['DATABASE_URL'].split('://')[0]}")
+    print(f"{'mode':<18} {'p50 ready s':>12} {'max ready s':>12} {'master import s':>16}")
+    for mode in MODES:
+        ready, imports = [], []
+        for _ in range(args.rounds):
+            seconds, imported = run_round(mode, args.workers)
+            ready.extend(seconds)
+            if imported is not None:
+                imports.append(imported)
+        master = f"{statistics.median(imports):>16.3f}" if imports else f"{'-':>16}"
+        print(f"{mode:<18} {statistics.median(ready):>12.3f} {max(ready):>12.3f} {master}")
+
+
+if __name__ == "__main__":
+    main()
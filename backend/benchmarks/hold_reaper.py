@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Hold reaper sweep cost and hold/confirm throughput
+
+Seeds a table of slots, expires thousands of holds at once, and times
+the sweeps that release them: statements issued, total time and time
+per hold, plus the cost of an idle sweep with nothing to release. Then
+measures POST /slots/{id}/hold + /confirm round trips per second.
+Uses a throwaway SQLite database unless DATABASE_URL is set.
+
+    python benchmarks/hold_reaper.py --holds 10000 --slots 100000
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import date, time as dtime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+# The app's own reaper sweeps once at startup, then stays out of the timed sweeps
+os.environ["HOLD_REAP_INTERVAL"] = "3600"
+
+import httpx
+from sqlalchemy import delete, event, insert, select
+
+from app import holds, models
+from app.database import AsyncSessionLocal, async_engine, engine
+from app.main import app
+
+
+def seed(slots, held, holder_id):
+    # Provider-less slots, so the overlap guard never applies
+    expired = holds.utcnow() - timedelta(minutes=1)
+    with engine.begin() as conn:
+        conn.execute(insert(models.Slot), [
+            {
+                "title": "Reaper bench",
+                "date": date(2034, 1, 1) + timedelta(days=i // 48),
+                "start_time": dtime((i % 48) // 2, (i % 2) * 30),
+                "end_time": dtime((i % 48) // 2, 29 + (i % 2) * 30),
+                "held_by_user_id": holder_id if i < held else None,
+                "hold_expires_at": expired if i < held else None,
+            }
+            for i in range(slots)
+        ])
+
+
+class StatementCounter:
+    def __init__(self):
+        self.count = 0
+        event.listen(async_engine.sync_engine, "before_cursor_execute", self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+
+async def sweep(counter, batch):
+    counter.count = 0
+    start = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        released = await holds.release_expired_holds(db, batch_size=batch)
+    return len(released), counter.count, time.perf_counter() - start
+
+
+async def hold_confirm(client, user_id, slot_ids, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(slot_id):
+        async with semaphore:
+            r = await client.post(f"/slots/{slot_id}/hold", json={"user_id": user_id})
+            r.raise_for_status()
+            r = await client.post(f"/slots/{slot_id}/confirm", json={"user_id": user_id})
+            r.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(slot_id) for slot_id in slot_ids))
+    return len(slot_ids) / (time.perf_counter() - start)
+
+
+async def run(slots, held, batch, pairs, concurrency):
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=60) as client:
+            user = (await client.post("/users", json={"email": f"holder-{time.time_ns()}@example.com", "name": "Holder"})).json()
+            seed(slots, held, user["id"])
+            counter = StatementCounter()
+
+            released, statements, elapsed = await sweep(counter, batch)
+            assert released == held, f"expected {held} released holds, got {released}"
+            print(f"Slots: {slots}  expired holds: {held}  batch: {batch}")
+            print(f"Sweep: {statements} statements, {elapsed * 1000:.1f}ms, {elapsed / held * 1e6:.1f}us per hold")
+
+            released, statements, elapsed = await sweep(counter, batch)
+            print(f"Idle sweep: {statements} statements, {elapsed * 1000:.2f}ms")
+
+            async with AsyncSessionLocal() as db:
+                free = (await db.scalars(
+                    select(models.Slot.id).where(models.Slot.title == "Reaper bench", models.Slot.is_booked.is_(False)).limit(pairs)
+                )).all()
+            rate = await hold_confirm(client, user["id"], free, concurrency)
+            print(f"Hold + confirm: {rate:.0f} pairs/sec ({len(free)} slots, concurrency {concurrency})")
+
+            async with AsyncSessionLocal() as db:
+                # Leave nothing behind when pointed at a shared database
+                await db.execute(delete(models.Slot).where(models.Slot.title == "Reaper bench"))
+                await db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--slots", type=int, default=50000, help="Slots in the table")
+    parser.add_argument("--holds", type=int, default=5000, help="Holds expiring at once")
+    parser.add_argument("--batch", type=int, default=holds.HOLD_REAP_BATCH, help="Holds released per UPDATE")
+    parser.add_argument("--pairs", type=int, default=1000, help="Hold + confirm round trips to time")
+    parser.add_argument("--concurrency", type=int, default=50, help="Concurrent hold + confirm round trips")
+    args = parser.parse_args()
+
+    async def main_async():
+        try:
+            await run(args.slots, args.holds, args.batch, args.pairs, args.concurrency)
+        finally:
+            await async_engine.dispose()
+
+    asyncio.run(main_async())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Load test for the Schedulink API
+
+Seeds users and slots through the API, then drives a weighted mix of
+list, get, create, bulk, book, cancel, availability and overview traffic
+from concurrent async clients for a fixed time, and reports throughput
+and p50/p95/p99 latency per endpoint as JSON.
+
+Runs app.main:app in-process on a throwaway SQLite database by default;
+set DATABASE_URL to test another database (e.g. a local Postgres), or
+pass --base-url to load a running server.
+
+Save a run as the baseline, then compare later runs against it; the
+comparison exits non-zero when an endpoint's p95 latency or throughput
+regressed by more than --threshold:
+
+    python benchmarks/load_test.py --duration 30 --save-baseline benchmarks/baseline.json
+    python benchmarks/load_test.py --duration 30 --baseline benchmarks/baseline.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from datetime import date, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DEFAULT_MIX = "list=40,get=15,overview=5,availability=5,create=10,bulk=2,book=15,cancel=8"
+BULK_SIZE = 50
+
+
+def build_client(base_url, concurrency):
+    import httpx
+
+    limits = httpx.Limits(max_connections=concurrency + 10)
+    if base_url:
+        return httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits), None
+
+    # Point the app at a fresh database before it is imported
+    if "DATABASE_URL" not in os.environ:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'load_test.db')}"
+    from app.main import app
+
+    client = httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://test", timeout=60, limits=limits
+    )
+    return client, app
+
+
+class Workload:
+    """Seeded data and the request generators for each operation"""
+
+    def __init__(self, client, rng):
+        self.client = client
+        self.rng = rng
+        self.tag = uuid.uuid4().hex[:8]
+        self.user_ids = []
+        self.free = []
+        self.booked = []
+        self.dates = []
+        # Each provider creates slots on its own run of days, so new
+        # slots never overlap existing ones
+        self.next_day = {}
+
+    def slot(self, provider_id):
+        day, minute = self.next_day[provider_id]
+        self.next_day[provider_id] = (day, minute + 30) if minute < 23 * 60 else (day + timedelta(days=1), 0)
+        return {
+            "title": "Load test",
+            "date": day.isoformat(),
+            "start_time": f"{minute // 60:02d}:{minute % 60:02d}",
+            "end_time": f"{(minute + 30) // 60:02d}:{(minute + 30) % 60:02d}",
+            "user_id": provider_id,
+        }
+
+    async def seed(self, users, slots):
+        for i in range(users):
+            response = await self.client.post(
+                "/users", json={"email": f"load-{self.tag}-{i}@example.com", "name": f"Load {i}"}
+            )
+            response.raise_for_status()
+            user_id = response.json()["id"]
+            self.user_ids.append(user_id)
+            # Days far from other benchmarks' data, 400 days apart per provider
+            self.next_day[user_id] = (date(2040, 1, 1) + timedelta(days=400 * i), 0)
+
+        remaining = slots
+        while remaining > 0:
+            batch = [self.slot(self.rng.choice(self.user_ids)) for _ in range(min(remaining, 1000))]
+            response = await self.client.post("/slots/bulk", json=batch)
+            response.raise_for_status()
+            self.free.extend(slot["id"] for slot in response.json())
+            self.dates.extend({slot["date"] for slot in batch})
+            remaining -= len(batch)
+
+    # Each operation returns its response; bookkeeping keeps the pools of
+    # free and booked slots roughly in step with the server
+
+    async def list(self):
+        params = {"limit": 100}
+        if self.rng.random() < 0.5:
+            params["date"] = self.rng.choice(self.dates)
+        return await self.client.get("/slots", params=params)
+
+    async def get(self):
+        return await self.client.get(f"/slots/{self.rng.choice(self.free or self.booked)}")
+
+    async def overview(self):
+        return await self.client.get(f"/users/{self.rng.choice(self.user_ids)}/overview", params={"limit": 20})
+
+    async def availability(self):
+        return await self.client.get(
+            "/availability/search", params={"date_from": self.rng.choice(self.dates), "limit": 10}
+        )
+
+    async def create(self):
+        response = await self.client.post("/slots", json=self.slot(self.rng.choice(self.user_ids)))
+        if response.status_code == 200:
+            self.free.append(response.json()["id"])
+        return response
+
+    async def bulk(self):
+        provider_id = self.rng.choice(self.user_ids)
+        response = await self.client.post("/slots/bulk", json=[self.slot(provider_id) for _ in range(BULK_SIZE)])
+        if response.status_code == 200:
+            self.free.extend(slot["id"] for slot in response.json())
+        return response
+
+    async def book(self):
+        if not self.free:
+            return await self.list()
+        slot_id = self.free.pop(self.rng.randrange(len(self.free)))
+        response = await self.client.patch(f"/slots/{slot_id}/book", json={"user_id": self.rng.choice(self.user_ids)})
+        (self.booked if response.status_code == 200 else self.free).append(slot_id)
+        return response
+
+    async def cancel(self):
+        if not self.booked:
+            return await self.book()
+        slot_id = self.booked.pop(self.rng.randrange(len(self.booked)))
+        response = await self.client.patch(f"/slots/{slot_id}/cancel")
+        (self.free if response.status_code == 200 else self.booked).append(slot_id)
+        return response
+
+
+def parse_mix(mix):
+    weights = {}
+    for part in mix.split(","):
+        name, weight = part.split("=")
+        if not hasattr(Workload, name.strip()):
+            raise SystemExit(f"Unknown operation in --mix: {name}")
+        weights[name.strip()] = float(weight)
+    return weights
+
+
+def percentile(sorted_values, q):
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    return statistics.quantiles(sorted_values, n=100, method="inclusive")[q - 1]
+
+
+def summarize(samples, elapsed, args):
+    endpoints = {}
+    for name, results in sorted(samples.items()):
+        latencies = sorted(ms for ms, _ in results)
+        statuses = [status for _, status in results]
+        endpoints[name] = {
+            "requests": len(results),
+            "throughput_rps": round(len(results) / elapsed, 1),
+            "p50_ms": round(percentile(latencies, 50), 2),
+            "p95_ms": round(percentile(latencies, 95), 2),
+            "p99_ms": round(percentile(latencies, 99), 2),
+            "mean_ms": round(statistics.fmean(latencies), 2),
+            # 4xx answers (e.g. booking a slot someone just took) are
+            # expected under contention; 5xx and transport failures are not
+            "rejected": sum(1 for s in statuses if 400 <= s < 500),
+            "errors": sum(1 for s in statuses if s == 0 or s >= 500),
+        }
+    total = sum(e["requests"] for e in endpoints.values())
+    return {
+        "config": {
+            "target": args.base_url or os.environ.get("DATABASE_URL", "").split("://")[0] or "in-process",
+            "users": args.users,
+            "slots": args.slots,
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "mix": args.mix,
+        },
+        "total": {
+            "requests": total,
+            "throughput_rps": round(total / elapsed, 1),
+            "errors": sum(e["errors"] for e in endpoints.values()),
+        },
+        "endpoints": endpoints,
+    }
+
+
+def compare(report, baseline, threshold):
+    """Print a comparison with the baseline; return the regressed endpoints"""
+    regressions = []
+    print(f"{'endpoint':<14} {'p95 ms':>17} {'rps':>19}")
+    for name, current in report["endpoints"].items():
+        before = baseline["endpoints"].get(name)
+        if not before:
+            continue
+        slower = current["p95_ms"] > before["p95_ms"] * (1 + threshold)
+        fewer = current["throughput_rps"] < before["throughput_rps"] * (1 - threshold)
+        flag = "  REGRESSION" if slower or fewer else ""
+        print(
+            f"{name:<14} {before['p95_ms']:>7.2f} -> {current['p95_ms']:>7.2f} "
+            f"{before['throughput_rps']:>8.1f} -> {current['throughput_rps']:>8.1f}{flag}"
+        )
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+async def run(args):
+    rng = random.Random(args.seed)
+    weights = parse_mix(args.mix)
+    names, cumulative = list(weights), list(weights.values())
+    client, app = build_client(args.base_url, args.concurrency)
+    samples = defaultdict(list)
+    # In-process, the lifespan creates the schema before the first request
+    lifespan = app.router.lifespan_context(app) if app else contextlib.nullcontext()
+
+    async with lifespan, client:
+        workload = Workload(client, rng)
+        print(f"Seeding {args.users} users and {args.slots} slots...", file=sys.stderr)
+        await workload.seed(args.users, args.slots)
+
+        async def worker(deadline):
+            while time.perf_counter() < deadline:
+                name = rng.choices(names, weights=cumulative)[0]
+                start = time.perf_counter()
+                try:
+                    status = (await getattr(workload, name)()).status_code
+                except Exception:
+                    status = 0
+                samples[name].append(((time.perf_counter() - start) * 1000, status))
+
+        print(f"Running for {args.duration}s with {args.concurrency} clients...", file=sys.stderr)
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(start + args.duration) for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+
+    if app is not None:
+        from app.database import async_engine
+        await async_engine.dispose()
+
+    return summarize(samples, elapsed, args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", help="Run against a live server instead of in-process")
+    parser.add_argument("--users", type=int, default=50, help="Users to seed")
+    parser.add_argument("--slots", type=int, default=5000, help="Slots to seed")
+    parser.add_argument("--concurrency", type=int, default=50, help="Concurrent clients")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds of traffic")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Operation weights, e.g. list=40,book=15")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed for the traffic mix")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    parser.add_argument("--save-baseline", metavar="PATH", help="Write the JSON report as the new baseline")
+    parser.add_argument("--baseline", metavar="PATH", help="Compare against this baseline and fail on regressions")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Allowed relative slowdown (default 0.15)")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print(json.dumps(report, indent=2))
+    for path in filter(None, [args.output, args.save_baseline]):
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+
+    ok = report["total"]["errors"] == 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        if regressions:
+            print(f"FAIL: regressions in {', '.join(regressions)}")
+            ok = False
+        else:
+            print("PASS: no regressions against baseline")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
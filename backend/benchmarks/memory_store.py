@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+In-memory store benchmark
+
+Compares the list storage simple_main.py used to have (lists of dicts
+scanned on every lookup) with app.memory_store (dicts by id, an email
+index and per-date / per-provider slot indexes, __slots__ records).
+Reports, per store size, the time of a user signup (duplicate email
+check), a booking plus its cancellation, listing one day's slots and
+one provider's slots, and the memory the records take. Then races
+threads booking the same slots and fails (exit status 1) unless every
+slot has exactly one winner.
+
+    python benchmarks/memory_store.py --sizes 1000 10000 100000
+"""
+
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.memory_store import Conflict, MemoryRepository
+
+DAYS = 90
+PROVIDERS = 200
+
+
+class ListStore:
+    """The old simple_main.py storage and lookups"""
+
+    def __init__(self):
+        self.users_db = []
+        self.slots_db = []
+        self.user_counter = 1
+        self.slot_counter = 1
+
+    def create_user(self, name, email, phone=None):
+        for existing_user in self.users_db:
+            if existing_user["email"] == email:
+                raise Conflict("Email already registered")
+        new_user = {"id": self.user_counter, "name": name, "email": email, "phone": phone}
+        self.users_db.append(new_user)
+        self.user_counter += 1
+        return new_user
+
+    def create_slot(self, title, date, start_time, end_time, description=None, user_id=None):
+        new_slot = {
+            "id": self.slot_counter, "title": title, "description": description, "date": date,
+            "start_time": start_time, "end_time": end_time, "is_booked": False,
+            "user_id": user_id, "booked_by_user_id": None,
+        }
+        self.slots_db.append(new_slot)
+        self.slot_counter += 1
+        return new_slot
+
+    def _find_slot(self, slot_id):
+        for s in self.slots_db:
+            if s["id"] == slot_id:
+                return s
+
+    def book_slot(self, slot_id, user_id):
+        slot = self._find_slot(slot_id)
+        if slot["is_booked"]:
+            raise Conflict("Slot already booked")
+        if not any(user["id"] == user_id for user in self.users_db):
+            raise LookupError("User not found")
+        slot["is_booked"] = True
+        slot["booked_by_user_id"] = user_id
+        return slot
+
+    def cancel_booking(self, slot_id):
+        slot = self._find_slot(slot_id)
+        slot["is_booked"] = False
+        slot["booked_by_user_id"] = None
+        return slot
+
+    def list_slots(self, date=None, user_id=None):
+        return [
+            s for s in self.slots_db
+            if (date is None or s["date"] == date) and (user_id is None or s["user_id"] == user_id)
+        ]
+
+
+def fill(store, size):
+    """size users and size slots; the list store skips its O(n) duplicate check while filling"""
+    for i in range(size):
+        if isinstance(store, ListStore):
+            store.users_db.append({"id": i + 1, "name": f"User {i}", "email": f"user{i}@example.com", "phone": None})
+            store.user_counter += 1
+        else:
+            store.create_user(f"User {i}", f"user{i}@example.com")
+    for i in range(size):
+        store.create_slot(
+            "Bench slot", f"2040-{1 + (i % DAYS) // 30:02d}-{1 + (i % DAYS) % 30:02d}",
+            f"{9 + (i // DAYS) % 8:02d}:00", f"{9 + (i // DAYS) % 8:02d}:30",
+            user_id=1 + i % PROVIDERS,
+        )
+
+
+def per_op_us(ops, fn):
+    start = time.perf_counter()
+    for op in ops:
+        fn(op)
+    return (time.perf_counter() - start) / len(ops) * 1e6
+
+
+def measure(store_type, size, ops):
+    tracemalloc.start()
+    store = store_type()
+    fill(store, size)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    rng = random.Random(size)
+    slot_ids = [rng.randint(1, size) for _ in range(ops)]
+    signup = per_op_us(range(ops), lambda i: store.create_user("New", f"new{size}-{i}@example.com"))
+
+    def book_and_cancel(slot_id):
+        store.book_slot(slot_id, 1)
+        store.cancel_booking(slot_id)
+
+    booking = per_op_us(slot_ids, book_and_cancel)
+    by_date = per_op_us(range(ops), lambda i: store.list_slots(date="2040-02-15"))
+    by_user = per_op_us(range(ops), lambda i: store.list_slots(user_id=1 + i % PROVIDERS))
+    return signup, booking, by_date, by_user, memory / size
+
+
+class YieldingRepository(MemoryRepository):
+    """Gives up the GIL between a booking's "is it free?" check and its update"""
+
+    def get_user(self, user_id):
+        time.sleep(0)
+        return super().get_user(user_id)
+
+
+def race(slots, threads):
+    """threads threads book every slot at once; count the winners per slot"""
+    store = YieldingRepository()
+    for i in range(threads):
+        store.create_user(f"Racer {i}", f"racer{i}@example.com")
+    for i in range(slots):
+        store.create_slot("Race slot", "2040-01-01", "09:00", "09:30")
+    wins = [0] * (slots + 1)
+    wins_lock = threading.Lock()
+    barrier = threading.Barrier(threads)
+
+    def racer(user_id):
+        barrier.wait()
+        for slot_id in range(1, slots + 1):
+            try:
+                store.book_slot(slot_id, user_id)
+            except Conflict:
+                continue
+            with wins_lock:
+                wins[slot_id] += 1
+
+    workers = [threading.Thread(target=racer, args=(i + 1,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return wins[1:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="Users and slots per store")
+    parser.add_argument("--ops", type=int, default=200, help="Operations timed per measurement")
+    parser.add_argument("--race-slots", type=int, default=2000, help="Slots booked in the race")
+    parser.add_argument("--race-threads", type=int, default=16, help="Threads booking each slot")
+    args = parser.parse_args()
+
+    print(f"{'size':>8} {'store':<7} {'signup us':>10} {'book+cancel us':>15} {'day list us':>12} {'provider list us':>17} {'B/record':>9}")
+    for size in args.sizes:
+        for label, store_type in (("list", ListStore), ("indexed", MemoryRepository)):
+            signup, booking, by_date, by_user, memory = measure(store_type, size, args.ops)
+            print(f"{size:>8} {label:<7} {signup:>10.2f} {booking:>15.2f} {by_date:>12.2f} {by_user:>17.2f} {memory:>9.0f}")
+
+    wins = race(args.race_slots, args.race_threads)
+    wrong = [slot_id + 1 for slot_id, count in enumerate(wins) if count != 1]
+    print(f"Race: {args.race_threads} threads booking {args.race_slots} slots; {len(wrong)} slots without exactly one winner")
+    if wrong:
+        print(f"FAIL: slots {wrong[:10]} had {[wins[slot_id - 1] for slot_id in wrong[:10]]} winners")
+        sys.exit(1)
+    print("ok: every slot booked exactly once")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Overlap guard cost benchmark
+
+Measures the per-write cost of inserting a slot for a provider that
+already owns N slots, for increasing N. With the overlap guard probing
+the (user_id, date, start_time, end_time) index the cost should stay
+flat as N grows. Uses a throwaway SQLite database unless DATABASE_URL
+is set.
+
+    python benchmarks/overlap_probe.py --sizes 1000 10000 50000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, time as dtime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+
+from app import models
+from app.database import engine
+
+SLOTS_PER_DAY = 16  # 08:00-16:00 in 30-minute slots
+FIRST_DAY = date(2030, 1, 1)
+
+
+def slot_row(i, user_id):
+    day = FIRST_DAY + timedelta(days=i // SLOTS_PER_DAY)
+    minutes = 8 * 60 + (i % SLOTS_PER_DAY) * 30
+    return {
+        "title": f"Slot {i}",
+        "date": day,
+        "start_time": dtime(minutes // 60, minutes % 60),
+        "end_time": dtime((minutes + 30) // 60, (minutes + 30) % 60),
+        "is_booked": False,
+        "user_id": user_id,
+    }
+
+
+def measure(conn, user_id, existing, probes):
+    """Time conflicting and non-conflicting single-row inserts"""
+    ok_times, conflict_times = [], []
+    for p in range(probes):
+        # Probe days after the seeded range, so these never collide
+        free = dict(slot_row(existing + SLOTS_PER_DAY * (p + 1), user_id), title="probe")
+        clash = dict(slot_row(p % existing, user_id), title="clash")
+
+        start = time.perf_counter()
+        with conn.begin_nested():
+            conn.execute(insert(models.Slot), free)
+        ok_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        try:
+            with conn.begin_nested():
+                conn.execute(insert(models.Slot), clash)
+        except IntegrityError:
+            pass
+        conflict_times.append(time.perf_counter() - start)
+    return sum(ok_times) / probes, sum(conflict_times) / probes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000], help="Existing slots per provider")
+    parser.add_argument("--probes", type=int, default=500, help="Inserts to time at each size")
+    args = parser.parse_args()
+
+    models.Base.metadata.create_all(bind=engine)
+    print(f"{'existing':>10}{'insert us':>12}{'conflict us':>14}")
+    for size in args.sizes:
+        with engine.connect() as conn:
+            trans = conn.begin()
+            user_id = conn.execute(
+                insert(models.User).values(email=f"overlap-{time.time_ns()}@example.com", name="Provider")
+            ).inserted_primary_key[0]
+            conn.execute(insert(models.Slot), [slot_row(i, user_id) for i in range(size)])
+            ok, conflict = measure(conn, user_id, size, args.probes)
+            trans.rollback()
+        print(f"{size:>10}{ok * 1e6:>12.1f}{conflict * 1e6:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+"Places near me" benchmark and dataset generator
+
+Generates a large places table across the contiguous United States (half
+spread evenly, half clustered around 25 cities) and times
+places.find_nearby_places for searches around random points, against the
+naive alternative of loading every place and sorting by distance in
+Python. Reports p50/p95 latency and queries per search. Uses a
+throwaway SQLite database unless DATABASE_URL is set (the GiST path is
+used on PostgreSQL); pass --reuse to search an already generated dataset
+again.
+
+    python benchmarks/places_nearby.py --places 1000000
+    DATABASE_URL=postgresql://... python benchmarks/places_nearby.py --reuse
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+from sqlalchemy import event, func, insert, select, text
+
+from app import models, places
+from app.database import AsyncSessionLocal, async_engine, engine
+
+LAT_RANGE = (25.0, 49.0)
+LON_RANGE = (-125.0, -67.0)
+CITIES = 25
+# Loading every place is slow on purpose; do not log each as a slow query
+logging.getLogger("app.instrumentation").setLevel(logging.ERROR)
+
+
+def random_point(rng, cities):
+    if rng.random() < 0.5:
+        return rng.uniform(*LAT_RANGE), rng.uniform(*LON_RANGE)
+    lat, lon = rng.choice(cities)
+    return lat + rng.gauss(0, 0.15), lon + rng.gauss(0, 0.2)
+
+
+def city_centres(seed):
+    rng = random.Random(seed)
+    return [(rng.uniform(*LAT_RANGE), rng.uniform(*LON_RANGE)) for _ in range(CITIES)]
+
+
+def generate(count, seed):
+    rng = random.Random(seed + 1)
+    cities = city_centres(seed)
+    models.Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        created, batch = 0, []
+        while created < count:
+            lat, lon = random_point(rng, cities)
+            batch.append({
+                "name": f"Place {created + len(batch)}",
+                "latitude": lat,
+                "longitude": lon,
+                "geohash": places.geohash(lat, lon),
+            })
+            if len(batch) >= 20000 or created + len(batch) >= count:
+                conn.execute(insert(models.Place), batch)
+                created += len(batch)
+                batch = []
+                print(f"  {created} places", end="\r", flush=True)
+    print(f"Generated {created} places")
+
+
+async def naive_nearby(db, lat, lon, radius_m, limit):
+    """Load every place and sort by distance: what the index probe avoids"""
+    rows = (await db.execute(select(models.Place.id, models.Place.latitude, models.Place.longitude))).all()
+    found = sorted(
+        (distance, row.id)
+        for row in rows
+        if (distance := places.distance_m(lat, lon, row.latitude, row.longitude)) <= radius_m
+    )
+    return found[:limit]
+
+
+async def explain():
+    # Show which index a probe uses
+    box = places.bounding_box(39.0, -95.0, 1000)
+    probe = places._gist_probe if engine.dialect.name == "postgresql" else places._geohash_probe
+    compiled = select(models.Place).where(probe(*box)).compile(engine, compile_kwargs={"literal_binds": True})
+    prefix = "EXPLAIN QUERY PLAN" if engine.dialect.name == "sqlite" else "EXPLAIN"
+    async with AsyncSessionLocal() as db:
+        plan = (await db.execute(text(f"{prefix} {compiled}"))).all()
+    print("Plan: " + "; ".join(str(row[-1]).strip() for row in plan[:4]))
+
+
+queries_run = [0]
+
+
+@event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+def count_queries(conn, cursor, statement, *rest):
+    if "FROM places" in statement:
+        queries_run[0] += 1
+
+
+async def run(args):
+    if not args.reuse:
+        generate(args.places, args.seed)
+    cities = city_centres(args.seed)
+    rng = random.Random(args.seed + 2)
+    async with AsyncSessionLocal() as db:
+        count = await db.scalar(select(func.count()).select_from(models.Place))
+    if not count:
+        sys.exit("No benchmark dataset found; run without --reuse first")
+    print(f"Dataset: {count} places")
+    await explain()
+
+    points = [random_point(rng, cities) for _ in range(args.repeat)]
+    print(f"{args.limit} nearest per search")
+    print(f"{'search':<34} {'found':>5} {'p50 ms':>9} {'p95 ms':>9} {'queries':>8}")
+    cases = [
+        (f"index probe, {args.radius:.0f} m", places.find_nearby_places, points, args.radius),
+        (f"index probe, {args.radius * 10:.0f} m", places.find_nearby_places, points, args.radius * 10),
+        (f"load all + sort, {args.radius:.0f} m", naive_nearby, points[:args.naive_repeat], args.radius),
+    ]
+    for label, search, case_points, radius in cases:
+        timings, found, queries = [], 0, 0
+        async with AsyncSessionLocal() as db:
+            for lat, lon in case_points:
+                before = queries_run[0]
+                start = time.perf_counter()
+                result = await search(db, lat, lon, radius, args.limit)
+                timings.append((time.perf_counter() - start) * 1000)
+                found += len(result)
+                queries += queries_run[0] - before
+        timings.sort()
+        p95 = timings[max(0, int(len(timings) * 0.95) - 1)]
+        print(
+            f"{label:<34} {found / len(case_points):>5.1f} {statistics.median(timings):>9.2f} "
+            f"{p95:>9.2f} {queries / len(case_points):>8.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--places", type=int, default=1000000, help="Number of places to generate")
+    parser.add_argument("--radius", type=float, default=5000, help="Search radius in metres")
+    parser.add_argument("--limit", type=int, default=10, help="Places to return per search")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for the dataset")
+    parser.add_argument("--repeat", type=int, default=200, help="Index probe searches per case")
+    parser.add_argument("--naive-repeat", type=int, default=5, help="Load-all searches (slow)")
+    parser.add_argument("--reuse", action="store_true", help="Search an existing dataset instead of generating one")
+    args = parser.parse_args()
+
+    async def main_async():
+        try:
+            await run(args)
+        finally:
+            await async_engine.dispose()
+            engine.dispose()
+
+    asyncio.run(main_async())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Slot list serialization micro-benchmark
+
+Compares the old listing path (ORM entities validated one by one through
+SlotOut, then encoded with the stdlib json module as FastAPI's
+JSONResponse does) with the current one (column rows encoded directly by
+slot_rows_body with orjson). Reports the fetch and serialization time for
+each size. Uses a throwaway SQLite database unless DATABASE_URL is set.
+
+    python benchmarks/serialization.py --sizes 1000 10000 100000
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import date, time as dtime, timedelta
+from typing import List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+from pydantic import TypeAdapter
+from sqlalchemy import delete, insert, select
+
+from app import models, schemas
+from app.database import SessionLocal, engine
+from app.serialization import SLOT_LIST_COLUMNS, slot_rows_body
+
+SLOT_LIST = TypeAdapter(List[schemas.SlotOut])
+
+
+def seed(rows):
+    # Provider-less slots, so the overlap guard never applies
+    models.Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(delete(models.Slot).where(models.Slot.title == "Serialization bench"))
+        conn.execute(insert(models.Slot), [
+            {
+                "title": "Serialization bench",
+                "description": "Benchmark slot",
+                "date": date(2032, 1, 1) + timedelta(days=i // 48),
+                "start_time": dtime((i % 48) // 2, (i % 2) * 30),
+                "end_time": dtime((i % 48) // 2, 29 + (i % 2) * 30),
+            }
+            for i in range(rows)
+        ])
+
+
+def old_body(slots):
+    content = SLOT_LIST.dump_python(SLOT_LIST.validate_python(slots, from_attributes=True), mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+
+def best_of(repeat, fn, *args):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run(sizes, repeat):
+    seed(max(sizes))
+    query = select(models.Slot).where(models.Slot.title == "Serialization bench").order_by(models.Slot.id)
+    rows_query = select(*SLOT_LIST_COLUMNS).where(models.Slot.title == "Serialization bench").order_by(models.Slot.id)
+
+    print(f"{'slots':>8}  {'fetch old':>10}  {'fetch new':>10}  {'encode old':>11}  {'encode new':>11}  {'speedup':>8}")
+    for size in sizes:
+        with SessionLocal() as db:
+            fetch_old, slots = best_of(repeat, lambda: db.scalars(query.limit(size)).all())
+        with SessionLocal() as db:
+            fetch_new, rows = best_of(repeat, lambda: db.execute(rows_query.limit(size)).all())
+
+        encode_old, old = best_of(repeat, old_body, slots)
+        encode_new, new = best_of(repeat, slot_rows_body, rows)
+        assert json.loads(old) == json.loads(new), "bodies differ"
+
+        print(
+            f"{size:>8}  {fetch_old * 1000:>8.1f}ms  {fetch_new * 1000:>8.1f}ms  "
+            f"{encode_old * 1000:>9.1f}ms  {encode_new * 1000:>9.1f}ms  {encode_old / encode_new:>7.1f}x"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="List sizes to serialize")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement; the best is reported")
+    args = parser.parse_args()
+
+    try:
+        run(args.sizes, args.repeat)
+    finally:
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Slot export memory benchmark
+
+Generates a large slot table, then streams GET /slots/export through the
+app in-process (the body is counted and dropped as a client would write
+it to disk) and reports throughput and the growth of the process's peak
+RSS: first for a tenth of the rows, then for all of them. A streamed
+export holds one batch at a time, so both peaks must be about the same;
+the run fails (exit status 1) if exporting every row grows the peak by
+more than --max-growth-mb over the tenth. For contrast it then loads the
+whole list the way an unpaginated GET /slots would (query().all() and
+one JSON array). Uses a throwaway SQLite database unless DATABASE_URL is
+set; the rows are generated in a child process so generating them does
+not count towards the peak.
+
+    python benchmarks/slot_export.py --slots 1000000
+    python benchmarks/slot_export.py --slots 1000000 --format csv --gzip
+"""
+
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+from datetime import date, time as dtime, timedelta
+from urllib.parse import urlencode
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+os.environ["CACHE_BACKEND"] = "none"
+
+from sqlalchemy import func, insert, select
+
+from app import models
+from app.database import AsyncSessionLocal, async_engine, engine
+from app.main import app
+from app.pagination import SLOT_ORDER
+from app.serialization import SLOT_LIST_COLUMNS, slot_rows_body
+
+START = date(2040, 1, 2)
+SLOTS_PER_DAY = 48
+# The load-all contrast is slow on purpose; do not log it as a slow query
+logging.getLogger("app.instrumentation").setLevel(logging.ERROR)
+
+
+def generate(slots):
+    # Provider-less slots, so the overlap guard never applies
+    models.Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        for first in range(0, slots, 20000):
+            conn.execute(insert(models.Slot), [
+                {
+                    "title": "Export bench",
+                    "description": f"Benchmark slot {i}",
+                    "date": START + timedelta(days=i // SLOTS_PER_DAY),
+                    "start_time": dtime((i % SLOTS_PER_DAY) // 2, (i % 2) * 30),
+                    "end_time": dtime((i % SLOTS_PER_DAY) // 2, 29 + (i % 2) * 30),
+                    "is_booked": i % 3 == 0,
+                }
+                for i in range(first, min(first + 20000, slots))
+            ])
+            print(f"  {min(first + 20000, slots)} slots", end="\r", flush=True)
+    print(f"Generated {slots} slots")
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+async def asgi_get(path, params, headers):
+    """GET through the ASGI app, counting the streamed body instead of keeping it"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+        "query_string": urlencode(params).encode(),
+        "headers": [(b"host", b"bench")] + [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+        "client": ("127.0.0.1", 50000), "server": ("bench", 80),
+    }
+    requested = False
+    disconnected = asyncio.Event()
+    status, size, chunks = None, 0, 0
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status, size, chunks
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            size += len(message.get("body", b""))
+            chunks += 1
+
+    await app(scope, receive, send)
+    disconnected.set()
+    return status, size, chunks
+
+
+async def timed_export(label, params, args):
+    headers = {"Accept-Encoding": "gzip" if args.gzip else "identity"}
+    before = peak_rss_mb()
+    start = time.perf_counter()
+    status, size, chunks = await asgi_get("/slots/export", {"format": args.format, **params}, headers)
+    elapsed = time.perf_counter() - start
+    if status != 200:
+        sys.exit(f"{label}: GET /slots/export answered {status}")
+    peak = peak_rss_mb()
+    print(f"{label:<28} {size / 1e6:>9.1f} {chunks:>7} {elapsed:>7.2f} {peak:>9.1f} {peak - before:>+8.1f}")
+    return peak
+
+
+async def load_all(label):
+    before = peak_rss_mb()
+    start = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        body = slot_rows_body((await db.execute(select(*SLOT_LIST_COLUMNS).order_by(*SLOT_ORDER))).all())
+    elapsed = time.perf_counter() - start
+    peak = peak_rss_mb()
+    print(f"{label:<28} {len(body) / 1e6:>9.1f} {1:>7} {elapsed:>7.2f} {peak:>9.1f} {peak - before:>+8.1f}")
+
+
+async def run(args):
+    async with AsyncSessionLocal() as db:
+        count, first, last = (await db.execute(
+            select(func.count(), func.min(models.Slot.date), func.max(models.Slot.date))
+        )).one()
+    tenth = first + (last - first) / 10
+    print(f"Dataset: {count} slots, {first} to {last}; format {args.format}{', gzip' if args.gzip else ''}")
+    print(f"{'export':<28} {'MB sent':>9} {'chunks':>7} {'s':>7} {'peak MB':>9} {'growth':>8}")
+    async with app.router.lifespan_context(app):
+        baseline = peak_rss_mb()
+        part = await timed_export("stream, first tenth", {"date_to": tenth.isoformat()}, args)
+        full = await timed_export("stream, every row", {}, args)
+        if not args.skip_load_all:
+            await load_all("load all + JSON array")
+    growth = full - part
+    print(f"Peak RSS: {baseline:.1f} MB before exporting; a tenth of the rows +{part - baseline:.1f} MB, every row +{growth:.1f} MB more")
+    if growth > args.max_growth_mb:
+        print(f"FAIL: exporting every row grew the peak RSS {growth:.1f} MB over a tenth (limit {args.max_growth_mb} MB)")
+        return False
+    print("ok: peak RSS stays flat as the export grows")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--slots", type=int, default=1000000, help="Number of slots to generate")
+    parser.add_argument("--format", choices=("ndjson", "csv"), default="ndjson", help="Export format")
+    parser.add_argument("--gzip", action="store_true", help="Ask for a gzip-compressed export")
+    parser.add_argument("--max-growth-mb", type=float, default=32, help="Allowed peak RSS growth over the tenth")
+    parser.add_argument("--skip-load-all", action="store_true", help="Skip the load-all contrast (needs a lot of memory)")
+    parser.add_argument("--reuse", action="store_true", help="Export an existing dataset instead of generating one")
+    args = parser.parse_args()
+
+    if not args.reuse:
+        child = multiprocessing.Process(target=generate, args=(args.slots,))
+        child.start()
+        child.join()
+        if child.exitcode:
+            sys.exit("Generating the dataset failed")
+
+    async def main_async():
+        try:
+            return await run(args)
+        finally:
+            await async_engine.dispose()
+            engine.dispose()
+
+    sys.exit(0 if asyncio.run(main_async()) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Slot full-text search benchmark and dataset generator
+
+Generates a large slot table (providers with 30-minute slots on
+weekdays, titles from a list of services, descriptions drawn from a
+Zipf-distributed vocabulary, so some words are rare and some very
+common) and times search.search_slots for typical searches, reporting
+matches, p50/p95 latency. Uses a throwaway SQLite database (FTS5)
+unless DATABASE_URL is set (GIN on PostgreSQL); pass --reuse to search
+an already generated dataset again.
+
+    python benchmarks/slot_search.py --slots 1000000
+    DATABASE_URL=postgresql://... python benchmarks/slot_search.py --reuse
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, time as dtime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+from sqlalchemy import func, insert, select
+
+from app import models, search
+from app.database import AsyncSessionLocal, async_engine, engine
+from app.serialization import SLOT_LIST_COLUMNS
+
+START = date(2036, 1, 5)
+SERVICES = [
+    "Haircut", "Beard trim", "Massage", "Yoga class", "Pilates", "Dental checkup", "Teeth cleaning",
+    "Eye exam", "Physiotherapy", "Personal training", "Guitar lesson", "Piano lesson", "Tax advice",
+    "Legal consultation", "Car service", "Tyre change", "Dog grooming", "Vet visit", "Tutoring",
+    "Career coaching", "Nutrition consultation", "Photo shoot", "Tattoo session", "Manicure",
+]
+# Searches for very common words are slow on purpose; do not log each
+logging.getLogger("app.instrumentation").setLevel(logging.ERROR)
+SYLLABLES = ["ka", "lo", "mi", "ra", "te", "su", "no", "vi", "de", "po", "ly", "zen", "tor", "bel", "quin"]
+
+
+def vocabulary(size, rng):
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def generate(slots, providers, seed):
+    """Insert about `slots` slots, a weekday at a time"""
+    rng = random.Random(seed)
+    words = vocabulary(5000, rng)
+    weights = [1 / (rank + 1) for rank in range(len(words))]
+    models.Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        provider_ids = [
+            row.id for row in conn.execute(
+                insert(models.User).returning(models.User.id),
+                [{"email": f"search-provider-{seed}-{i}@example.com", "name": f"Provider {i}"} for i in range(providers)],
+            )
+        ]
+        created, day, batch = 0, START, []
+        while created < slots:
+            if day.weekday() < 5:
+                for provider_id in provider_ids:
+                    for minute in range(8 * 60, 18 * 60, 30):
+                        batch.append({
+                            "title": rng.choice(SERVICES),
+                            "description": " ".join(rng.choices(words, weights, k=8)),
+                            "date": day,
+                            "start_time": dtime(minute // 60, minute % 60),
+                            "end_time": dtime((minute + 30) // 60, (minute + 30) % 60),
+                            "user_id": provider_id,
+                        })
+                if len(batch) >= 20000:
+                    conn.execute(insert(models.Slot), batch)
+                    created += len(batch)
+                    batch = []
+                    print(f"  {created} slots", end="\r", flush=True)
+            day += timedelta(days=1)
+        if batch:
+            conn.execute(insert(models.Slot), batch)
+            created += len(batch)
+    print(f"Generated {created} slots for {providers} providers up to {day}")
+    return words
+
+
+def searches(words, provider_id, last):
+    middle = START + (last - START) / 2
+    return {
+        "rare word": dict(q=words[4000]),
+        "uncommon word": dict(q=words[300]),
+        "common word": dict(q=words[0]),
+        "title word": dict(q="lesson"),
+        "two words": dict(q=f"{words[0]} {words[20]}"),
+        "common word, one provider": dict(q=words[0], user_id=provider_id),
+        "common word, one day": dict(q=words[0], date=middle),
+    }
+
+
+async def run(args):
+    if not args.reuse:
+        generate(args.slots, args.providers, args.seed)
+    words = vocabulary(5000, random.Random(args.seed))
+    async with AsyncSessionLocal() as db:
+        count, last = (await db.execute(select(func.count(), func.max(models.Slot.date)))).one()
+        provider_id = await db.scalar(select(func.min(models.Slot.user_id)))
+    if not count:
+        sys.exit("No benchmark dataset found; run without --reuse first")
+    print(f"Dataset: {count} slots, {START} to {last}; page size {args.limit}")
+
+    print(f"{'search':<28} {'rows':>5} {'p50 ms':>8} {'p95 ms':>8}")
+    for label, kwargs in searches(words, provider_id, last).items():
+        stmt = select(*SLOT_LIST_COLUMNS)
+        if "user_id" in kwargs:
+            stmt = stmt.where(models.Slot.user_id == kwargs["user_id"])
+        if "date" in kwargs:
+            stmt = stmt.where(models.Slot.date == kwargs["date"])
+        terms = search.search_terms(kwargs["q"])
+        timings = []
+        async with AsyncSessionLocal() as db:
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                rows, _ = await search.search_slots(db, stmt, terms, args.limit)
+                timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        p95 = timings[max(0, int(len(timings) * 0.95) - 1)]
+        print(f"{label:<28} {len(rows):>5} {statistics.median(timings):>8.2f} {p95:>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--slots", type=int, default=1000000, help="Approximate number of slots to generate")
+    parser.add_argument("--providers", type=int, default=200, help="Number of providers")
+    parser.add_argument("--limit", type=int, default=20, help="Page size")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for the dataset")
+    parser.add_argument("--repeat", type=int, default=20, help="Runs per search")
+    parser.add_argument("--reuse", action="store_true", help="Search an existing dataset instead of generating one")
+    args = parser.parse_args()
+
+    async def main_async():
+        try:
+            await run(args)
+        finally:
+            await async_engine.dispose()
+            engine.dispose()
+
+    asyncio.run(main_async())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Slot stream fan-out benchmark
+
+Opens many /slots/stream clients against a running server, books one
+slot, and reports how long it took every client to receive the "booked"
+event. Run the server with several workers on Postgres to exercise the
+LISTEN/NOTIFY fan-out; on SQLite only one worker's clients are reached.
+
+    python benchmarks/stream_fanout.py --base-url http://localhost:8000 --clients 500
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+import uuid
+
+import httpx
+
+
+async def listen(client, slot_id, connected, received):
+    async with client.stream("GET", "/slots/stream", params={"date": "2033-01-01"}) as response:
+        response.raise_for_status()
+        event = None
+        async for line in response.aiter_lines():
+            if line == ": connected":
+                connected.release()
+            elif line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: ") and event == "booked" and f'"id":{slot_id},' in line:
+                received.append(time.perf_counter())
+                return
+
+
+async def run(base_url, clients, timeout):
+    limits = httpx.Limits(max_connections=clients + 10)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        tag = uuid.uuid4().hex[:8]
+        provider = (await client.post("/users", json={"email": f"provider-{tag}@example.com", "name": "Provider"})).json()
+        customer = (await client.post("/users", json={"email": f"customer-{tag}@example.com", "name": "Customer"})).json()
+        # Minute-of-day from the tag, so repeated runs do not overlap
+        minute = int(tag, 16) % 1439
+        slot = (await client.post("/slots", json={
+            "title": "Fan-out",
+            "date": "2033-01-01",
+            "start_time": f"{minute // 60:02d}:{minute % 60:02d}",
+            "end_time": f"{(minute + 1) // 60:02d}:{(minute + 1) % 60:02d}",
+            "user_id": provider["id"],
+        })).json()
+
+        connected = asyncio.Semaphore(0)
+        received = []
+        listeners = [asyncio.create_task(listen(client, slot["id"], connected, received)) for _ in range(clients)]
+        for _ in range(clients):
+            await connected.acquire()
+
+        start = time.perf_counter()
+        response = await client.patch(f"/slots/{slot['id']}/book", json={"user_id": customer["id"]})
+        response.raise_for_status()
+        done, pending = await asyncio.wait(listeners, timeout=timeout)
+        for task in pending:
+            task.cancel()
+
+    latencies = sorted((t - start) * 1000 for t in received)
+    print(f"Clients: {clients}")
+    print(f"Received: {len(latencies)}")
+    if latencies:
+        print(f"Latency ms: p50={statistics.median(latencies):.1f} "
+              f"p95={latencies[int(len(latencies) * 0.95) - 1]:.1f} max={latencies[-1]:.1f}")
+    return len(latencies) == clients
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", required=True, help="Server to run against")
+    parser.add_argument("--clients", type=int, default=200, help="Number of concurrent stream clients")
+    parser.add_argument("--timeout", type=float, default=30, help="Seconds to wait for every client")
+    args = parser.parse_args()
+
+    ok = asyncio.run(run(args.base_url, args.clients, args.timeout))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Gunicorn configuration for production (see Dockerfile.prod)
+
+The app is imported once in the master (preload_app) and workers are
+forked from it, so a worker only has to open its own pools and run the
+app's startup. The schema is not touched here: run `python init_db.py`
+once per deploy before starting gunicorn.
+"""
+
+import os
+import shutil
+
+bind = "0.0.0.0:8000"
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() in ("1", "true", "yes")
+# Proxies whose X-Forwarded-For is believed, so request.client (and with
+# it the rate limiter's client key) is the real client rather than nginx
+forwarded_allow_ips = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1,::1")
+
+
+def _reset_metrics_dir():
+    # Start every run with an empty Prometheus multiprocess directory.
+    # This runs when the config is loaded, before --preload imports the
+    # app (and its metrics) in the master.
+    metrics_dir = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if metrics_dir:
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+        os.makedirs(metrics_dir, exist_ok=True)
+
+
+_reset_metrics_dir()
+
+
+def post_fork(server, worker):
+    # Connections must not be shared with the master or sibling workers
+    if preload_app:
+        from app.database import reset_after_fork
+        reset_after_fork()
+
+
+def child_exit(server, worker):
+    # Drop live gauges (e.g. pool checkouts) of workers that have exited
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -1,40 +1,49 @@
 #!/usr/bin/env python3
 """
 Database initialization script
-Creates all tables defined in the models
+Creates or upgrades the tables through the Alembic migrations in
+migrations/ (alembic upgrade head), adopting databases whose tables
+were created before migrations existed. DATABASE_URL must be set, in
+the environment or a .env file.
+
+Run once per deploy, before the app servers start (the migrate service
+in docker-compose.prod.yml, the Dockerfile's command); app workers only
+check the schema revision and refuse to start if it is behind, except
+in local SQLite development (see AUTO_MIGRATE in app/main.py).
 """
 
 import sys
 import os
+from dotenv import load_dotenv
 sys.path.append('/app')
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 def init_database():
-    """Initialize database with all tables"""
+    """Create or migrate the database to the latest schema revision"""
+    # Read from the environment or a .env file, as the app does, but never
+    # defaulted: migrating the wrong database must not pass silently
+    load_dotenv()
+    if not os.getenv("DATABASE_URL"):
+        print("Error initializing database: DATABASE_URL is not set")
+        sys.exit(1)
+
     try:
-        # Print environment variables for debugging
-        db_url = os.getenv("DATABASE_URL")
-        print(f"DATABASE_URL from environment: {db_url}")
-        
-        # Set a clean DATABASE_URL if needed
-        if not db_url or "983@db" in db_url:
-            clean_url = "postgresql://schedulink_user:SecurePass123@db:5432/schedulink_db"
-            os.environ["DATABASE_URL"] = clean_url
-            print(f"Set clean DATABASE_URL: {clean_url}")
+        from sqlalchemy import inspect
+        from app.database import engine
+        from app.migrate import BASELINE_REVISION, current_revision, upgrade_database
         
-        # Import after setting environment
-        from app.database import engine, Base
-        from app.models import User, Slot
+        if current_revision() is None and inspect(engine).has_table("slots"):
+            # Created by create_all before migrations existed: recorded at
+            # the baseline and upgraded through every migration from there
+            print(f"Adopting existing tables at revision {BASELINE_REVISION}...")
         
-        print("Creating database tables...")
-        Base.metadata.create_all(bind=engine)
-        print("Database tables created successfully!")
+        print("Running migrations...")
+        upgrade_database()
+        print("Database migrated successfully!")
         
         # Test connection
-        from sqlalchemy import text
-        with engine.connect() as conn:
-            result = conn.execute(text("SELECT table_name FROM information_schema.tables WHERE table_schema = 'public'"))
-            tables = [row[0] for row in result]
-            print(f"Created tables: {tables}")
+        tables = inspect(engine).get_table_names()
+        print(f"Created tables: {tables}")
             
     except Exception as e:
         print(f"Error initializing database: {e}")
@@ -0,0 +1,69 @@
+"""
+Alembic environment
+
+Migrates the database named by DATABASE_URL using the app's sync engine.
+Every migration runs in its own transaction, so a migration can step
+out of it (op.get_context().autocommit_block()) for statements such as
+CREATE INDEX CONCURRENTLY; see migrations/online.py.
+"""
+
+import os
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import text
+
+from app import models  # also registers the tables on Base.metadata
+from app.database import Base, DATABASE_URL, engine
+
+config = context.config
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = Base.metadata
+
+# DDL that needs a strong lock gives up after this long instead of
+# queueing every booking behind it while it waits
+MIGRATION_LOCK_TIMEOUT = os.getenv("MIGRATION_LOCK_TIMEOUT", "5s")
+
+
+def include_name(name, type_, parent_names):
+    # Autogenerate must not drop the full-text search column, index and
+    # tables, which are not in the metadata (see app/models.py)
+    return not models.is_search_schema(name, type_, parent_names)
+
+
+def run_migrations_offline():
+    context.configure(
+        url=DATABASE_URL,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        transaction_per_migration=True,
+        include_name=include_name,
+        render_as_batch=DATABASE_URL.startswith("sqlite"),
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    with engine.connect() as connection:
+        if connection.dialect.name == "postgresql":
+            connection.execute(text(f"SET lock_timeout = '{MIGRATION_LOCK_TIMEOUT}'"))
+            connection.commit()
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            transaction_per_migration=True,
+            include_name=include_name,
+            # SQLite cannot ALTER most things; batch operations copy the table
+            render_as_batch=connection.dialect.name == "sqlite",
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,117 @@
+"""
+Helpers for migrations that must not block a live slots table
+
+On PostgreSQL a plain CREATE INDEX holds a lock that stops every
+INSERT/UPDATE (bookings included) until the build finishes, and an
+UPDATE of every row in one transaction holds all those row locks until
+it commits. Migrations that touch slots use these instead:
+
+- create_index_concurrently / drop_index_concurrently build and drop
+  indexes with CONCURRENTLY, outside the migration's transaction.
+- backfill_in_batches fills a new column a batch of rows at a time,
+  committing each batch.
+
+A column type change is then: add the new column (nullable, no default,
+so no table rewrite), keep it in step with the old one from a trigger,
+backfill, build its indexes concurrently, and swap the columns in one
+short transaction (see 0001a_slot_native_datetimes.py).
+
+On other databases (SQLite in development) the same calls fall back to
+the plain statements.
+
+Databases created by create_all before migrations existed are stamped
+at the baseline and brought up through every migration, so migrations
+that change slots first look (has_column, has_index, ...) at what is
+already there and skip it.
+"""
+
+import os
+
+from alembic import op
+from sqlalchemy import inspect, text
+
+BACKFILL_BATCH = int(os.getenv("MIGRATION_BACKFILL_BATCH", "5000"))
+
+
+def _is_postgresql() -> bool:
+    return op.get_bind().dialect.name == "postgresql"
+
+
+def create_index_concurrently(name: str, table: str, columns, **kw):
+    """Create an index without blocking writes to the table"""
+    if not _is_postgresql():
+        op.create_index(name, table, columns, if_not_exists=True, **kw)
+        return
+    with op.get_context().autocommit_block():
+        # An interrupted concurrent build leaves an INVALID index that
+        # IF NOT EXISTS would keep; drop it and build again (not knowable
+        # when only generating SQL with --sql)
+        if not op.get_context().as_sql and op.get_bind().execute(text(
+            "SELECT 1 FROM pg_index JOIN pg_class ON pg_class.oid = pg_index.indexrelid "
+            "WHERE pg_class.relname = :name AND NOT pg_index.indisvalid"
+        ), {"name": name}).scalar():
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+        op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True, **kw)
+
+
+def drop_index_concurrently(name: str, table: str):
+    """Drop an index without blocking reads or writes of the table"""
+    if not _is_postgresql():
+        op.drop_index(name, table_name=table, if_exists=True)
+        return
+    with op.get_context().autocommit_block():
+        op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+
+
+def backfill_in_batches(table: str, assignments: str, pending: str, batch_size: int = BACKFILL_BATCH) -> int:
+    """
+    Run UPDATE table SET assignments on the rows matching `pending`,
+    batch_size rows per committed statement, and return the rows updated.
+    `pending` must stop matching a row once it is updated, e.g.
+    "new_column IS NULL".
+    """
+    statement = text(
+        f"UPDATE {table} SET {assignments} "
+        f"WHERE id IN (SELECT id FROM {table} WHERE {pending} LIMIT :batch_size)"
+    )
+    total = 0
+    with op.get_context().autocommit_block():
+        while True:
+            updated = op.get_bind().execute(statement, {"batch_size": batch_size}).rowcount
+            total += updated
+            if updated < batch_size:
+                return total
+
+
+def _inspector():
+    return inspect(op.get_bind())
+
+
+def column_types(table: str) -> dict:
+    """The table's columns and their reflected types; empty when only generating SQL"""
+    if op.get_context().as_sql:
+        return {}
+    return {column["name"]: column["type"] for column in _inspector().get_columns(table)}
+
+
+def has_column(table: str, column: str) -> bool:
+    return column in column_types(table)
+
+
+def has_index(table: str, name: str) -> bool:
+    if op.get_context().as_sql:
+        return False
+    return any(index["name"] == name for index in _inspector().get_indexes(table))
+
+
+def has_foreign_key(table: str, column: str) -> bool:
+    if op.get_context().as_sql:
+        return False
+    return any(fk["constrained_columns"] == [column] for fk in _inspector().get_foreign_keys(table))
+
+
+def has_constraint(name: str) -> bool:
+    """Whether a PostgreSQL constraint (CHECK, EXCLUDE, ...) of this name exists"""
+    if op.get_context().as_sql or not _is_postgresql():
+        return False
+    return bool(op.get_bind().execute(text("SELECT 1 FROM pg_constraint WHERE conname = :name"), {"name": name}).scalar())
@@ -0,0 +1,206 @@
+"""Store slot dates and times as native DATE and TIME
+
+slots.date, start_time and end_time were "YYYY-MM-DD" / "HH:MM" strings.
+
+PostgreSQL, without blocking writes to slots for longer than the final
+swap: date_new / start_time_new / end_time_new are added (nullable, no
+default, so nothing is rewritten), a trigger keeps them in step with
+every write, existing rows are backfilled in batches, indexes on the
+old columns are rebuilt on the new ones concurrently, and a NOT VALID
+check proves them filled while writes go on. One short transaction then
+drops the old columns and renames the new ones into place; SET NOT NULL
+trusts the validated check instead of scanning the table.
+
+SQLite: times are rewritten as the "HH:MM:SS" text the app compares
+("9:00" becomes "09:00:00"), and the table is copied with the new
+column types.
+
+The string columns accepted anything, so every row is checked first: a
+database with values that are not a YYYY-MM-DD date or an H:MM / HH:MM
+/ HH:MM:SS time fails with their ids before anything is changed.
+
+Revision ID: 0001a
+Revises: 0001
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import sqlite
+
+from migrations.online import backfill_in_batches, column_types, create_index_concurrently, has_constraint
+
+# revision identifiers, used by Alembic.
+revision: str = "0001a"
+down_revision: Union[str, Sequence[str], None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SlotTime = sa.Time().with_variant(sqlite.TIME(truncate_microseconds=True), "sqlite")
+
+# Column -> its PostgreSQL type
+NATIVE_TYPES = {"date": "date", "start_time": "time", "end_time": "time"}
+FILLED_CHECK = "slots_native_datetimes_filled"
+TIME_COLUMNS = ("start_time", "end_time")
+
+# PostgreSQL: the shape of each value, then whether it names a real
+# date; the cast runs in a function of its own so a bad value is a
+# false rather than an error
+PG_DATE_CHECK = r"""
+    CREATE FUNCTION pg_temp.slots_is_date(value text) RETURNS boolean AS $$
+    BEGIN
+        PERFORM value::date;
+        RETURN true;
+    EXCEPTION WHEN others THEN
+        RETURN false;
+    END $$ LANGUAGE plpgsql
+"""
+PG_VALID_DATE = r"CASE WHEN btrim(date) ~ '^\d{4}-\d{2}-\d{2}$' THEN pg_temp.slots_is_date(btrim(date)) ELSE false END"
+PG_VALID_TIME = r"btrim({column}) ~ '^([01]?\d|2[0-3]):[0-5]\d(:[0-5]\d)?$'"
+
+# SQLite: the same rules on the value as it will be stored, with a
+# single-digit hour padded and seconds added
+SQLITE_PADDED_HOUR = "CASE WHEN trim({column}) GLOB '[0-9]:*' THEN '0' || trim({column}) ELSE trim({column}) END"
+SQLITE_TIME = f"CASE WHEN length({SQLITE_PADDED_HOUR}) = 5 THEN {SQLITE_PADDED_HOUR} || :seconds ELSE {SQLITE_PADDED_HOUR} END"
+SQLITE_VALID_DATE = (
+    "trim(date) GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]' "
+    "AND date(trim(date), '+0 days') = trim(date) AND trim(date) >= '0001-01-01'"
+)
+SQLITE_VALID_TIME = f"{SQLITE_TIME} GLOB '[0-2][0-9]:[0-5][0-9]:[0-5][0-9]' AND {SQLITE_TIME} <= '23:59:59'"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        upgrade_postgresql()
+    elif dialect == "sqlite":
+        upgrade_sqlite()
+
+
+def check_legacy_values(valid_date: str, valid_time: str) -> None:
+    """Fail, naming up to twenty of them, if any slot's strings are not a date and times"""
+    if op.get_context().as_sql:
+        return
+    valid = " AND ".join([valid_date, *(valid_time.format(column=column) for column in TIME_COLUMNS)])
+    query = sa.text(f"SELECT id FROM slots WHERE NOT ({valid}) ORDER BY id LIMIT 20")
+    if ":seconds" in valid:
+        query = query.bindparams(seconds=":00")
+    invalid = op.get_bind().execute(query).scalars().all()
+    if invalid:
+        raise RuntimeError(
+            "Cannot convert slot dates and times: these slots have a date that is not YYYY-MM-DD or a time "
+            f"that is not H:MM, HH:MM or HH:MM:SS (slot ids): {invalid}. Fix or delete them and migrate again."
+        )
+
+
+def upgrade_postgresql() -> None:
+    if isinstance(column_types("slots").get("date"), sa.Date):
+        return
+
+    if not op.get_context().as_sql:
+        op.execute(PG_DATE_CHECK)
+        check_legacy_values(PG_VALID_DATE, PG_VALID_TIME)
+        op.execute("DROP FUNCTION pg_temp.slots_is_date(text)")
+
+    op.execute("ALTER TABLE slots " + ", ".join(
+        f"ADD COLUMN IF NOT EXISTS {column}_new {type_}" for column, type_ in NATIVE_TYPES.items()
+    ))
+    # Rows written from here on fill the new columns themselves
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION slots_sync_native_datetimes() RETURNS trigger AS $$
+        BEGIN
+            {" ".join(f"NEW.{column}_new := NEW.{column}::{type_};" for column, type_ in NATIVE_TYPES.items())}
+            RETURN NEW;
+        END $$ LANGUAGE plpgsql
+    """)
+    op.execute("DROP TRIGGER IF EXISTS slots_sync_native_datetimes ON slots")
+    op.execute("""
+        CREATE TRIGGER slots_sync_native_datetimes
+        BEFORE INSERT OR UPDATE OF date, start_time, end_time ON slots
+        FOR EACH ROW EXECUTE FUNCTION slots_sync_native_datetimes()
+    """)
+    backfill_in_batches(
+        "slots",
+        ", ".join(f"{column}_new = {column}::{type_}" for column, type_ in NATIVE_TYPES.items()),
+        "date_new IS NULL",
+    )
+
+    # Databases from before migrations may already index the old columns
+    rebuilt = []
+    if not op.get_context().as_sql:
+        for index in sa.inspect(op.get_bind()).get_indexes("slots"):
+            columns = index["column_names"]
+            if None in columns or not set(columns) & set(NATIVE_TYPES):
+                continue
+            create_index_concurrently(
+                f"{index['name']}_native", "slots",
+                [f"{column}_new" if column in NATIVE_TYPES else column for column in columns],
+                unique=index["unique"],
+            )
+            rebuilt.append(index["name"])
+
+    if not has_constraint(FILLED_CHECK):
+        op.execute(
+            f"ALTER TABLE slots ADD CONSTRAINT {FILLED_CHECK} CHECK ("
+            + " AND ".join(f"{column}_new IS NOT NULL" for column in NATIVE_TYPES) + ") NOT VALID"
+        )
+    with op.get_context().autocommit_block():
+        op.execute(f"ALTER TABLE slots VALIDATE CONSTRAINT {FILLED_CHECK}")
+
+    # The swap: catalog changes only, in the migration's own transaction
+    op.execute("DROP TRIGGER slots_sync_native_datetimes ON slots")
+    op.execute("DROP FUNCTION slots_sync_native_datetimes()")
+    # An overlap guard built on the strings goes with them; 0001e adds
+    # it back on the native columns
+    op.execute("ALTER TABLE slots DROP CONSTRAINT IF EXISTS slots_no_overlap")
+    op.execute("DROP FUNCTION IF EXISTS slot_time_range(text, text, text)")
+    op.execute("ALTER TABLE slots " + ", ".join(f"DROP COLUMN {column}" for column in NATIVE_TYPES))
+    for column in NATIVE_TYPES:
+        op.execute(f"ALTER TABLE slots RENAME COLUMN {column}_new TO {column}")
+    op.execute("ALTER TABLE slots " + ", ".join(f"ALTER COLUMN {column} SET NOT NULL" for column in NATIVE_TYPES))
+    op.execute(f"ALTER TABLE slots DROP CONSTRAINT {FILLED_CHECK}")
+    for name in rebuilt:
+        op.execute(f"ALTER INDEX {name}_native RENAME TO {name}")
+
+
+def upgrade_sqlite() -> None:
+    check_legacy_values(SQLITE_VALID_DATE, SQLITE_VALID_TIME)
+    normalized = {"date": "trim(date)", **{column: SQLITE_TIME.format(column=column) for column in TIME_COLUMNS}}
+    op.execute(sa.text(
+        "UPDATE slots SET " + ", ".join(f"{column} = {value}" for column, value in normalized.items())
+        + " WHERE " + " OR ".join(f"{column} IS NOT {value}" for column, value in normalized.items())
+    ).bindparams(seconds=":00"))
+    if isinstance(column_types("slots").get("date"), sa.Date):
+        return
+    # Copy the table as reflected but with the new types; batch mode's own
+    # alter_column would CAST the text to the numeric DATE affinity
+    slots = sa.Table("slots", sa.MetaData(), autoload_with=op.get_bind())
+    slots.c.date.type = sa.Date()
+    slots.c.start_time.type = SlotTime
+    slots.c.end_time.type = SlotTime
+    with op.batch_alter_table("slots", copy_from=slots, recreate="always"):
+        pass
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        # Rewrites the table; downgrades are not run against live traffic
+        op.execute(
+            "ALTER TABLE slots "
+            "ALTER COLUMN date TYPE varchar USING to_char(date, 'YYYY-MM-DD'), "
+            "ALTER COLUMN start_time TYPE varchar USING to_char(start_time, 'HH24:MI'), "
+            "ALTER COLUMN end_time TYPE varchar USING to_char(end_time, 'HH24:MI')"
+        )
+    elif dialect == "sqlite":
+        slots = sa.Table("slots", sa.MetaData(), autoload_with=op.get_bind())
+        for column in NATIVE_TYPES:
+            slots.c[column].type = sa.String()
+        with op.batch_alter_table("slots", copy_from=slots, recreate="always"):
+            pass
+        for column in ("start_time", "end_time"):
+            op.execute(f"UPDATE slots SET {column} = substr({column}, 1, 5)")
@@ -0,0 +1,54 @@
+"""Row version on slots
+
+slots.version backs ETags and optimistic locking and is bumped on every
+change. On PostgreSQL the NOT NULL DEFAULT 1 column is added without
+rewriting the table (the default is kept in the catalog). SQLite tables
+are copied to switch on AUTOINCREMENT, so the id of a deleted slot is
+never reused with a colliding (id, version) ETag.
+
+Revision ID: 0001b
+Revises: 0001a
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.online import has_column
+
+# revision identifiers, used by Alembic.
+revision: str = "0001b"
+down_revision: Union[str, Sequence[str], None] = "0001a"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _sqlite_autoincrement() -> bool:
+    if op.get_context().as_sql:
+        return False
+    sql = op.get_bind().execute(sa.text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'slots'")).scalar()
+    return "AUTOINCREMENT" in sql.upper()
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        op.execute("ALTER TABLE slots ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1")
+    elif dialect == "sqlite":
+        if has_column("slots", "version") and _sqlite_autoincrement():
+            return
+        with op.batch_alter_table("slots", recreate="always", table_kwargs={"sqlite_autoincrement": True}) as batch:
+            if not has_column("slots", "version"):
+                batch.add_column(sa.Column("version", sa.Integer(), server_default="1", nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == "sqlite":
+        with op.batch_alter_table("slots", recreate="always", table_kwargs={"sqlite_autoincrement": False}) as batch:
+            batch.drop_column("version")
+    else:
+        op.drop_column("slots", "version")
@@ -0,0 +1,57 @@
+"""Checkout holds on slots
+
+held_by_user_id and hold_expires_at record who holds a slot and until
+when; ix_slots_hold_expires_at lets the hold reaper find lapsed holds.
+
+On PostgreSQL both columns are nullable without a default, so adding
+them rewrites nothing; the foreign key is added NOT VALID and validated
+afterwards, which does not block writes, and the index is built
+concurrently.
+
+Revision ID: 0001c
+Revises: 0001b
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.online import create_index_concurrently, drop_index_concurrently, has_column, has_foreign_key
+
+# revision identifiers, used by Alembic.
+revision: str = "0001c"
+down_revision: Union[str, Sequence[str], None] = "0001b"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute(
+            "ALTER TABLE slots ADD COLUMN IF NOT EXISTS held_by_user_id INTEGER, "
+            "ADD COLUMN IF NOT EXISTS hold_expires_at TIMESTAMP WITHOUT TIME ZONE"
+        )
+        if not has_foreign_key("slots", "held_by_user_id"):
+            op.execute(
+                "ALTER TABLE slots ADD CONSTRAINT slots_held_by_user_id_fkey "
+                "FOREIGN KEY (held_by_user_id) REFERENCES users (id) NOT VALID"
+            )
+            with op.get_context().autocommit_block():
+                op.execute("ALTER TABLE slots VALIDATE CONSTRAINT slots_held_by_user_id_fkey")
+    elif not has_column("slots", "held_by_user_id"):
+        with op.batch_alter_table("slots") as batch:
+            batch.add_column(sa.Column("held_by_user_id", sa.Integer(), nullable=True))
+            batch.add_column(sa.Column("hold_expires_at", sa.DateTime(), nullable=True))
+            batch.create_foreign_key("fk_slots_held_by_user_id_users", "users", ["held_by_user_id"], ["id"])
+    create_index_concurrently("ix_slots_hold_expires_at", "slots", ["hold_expires_at"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    drop_index_concurrently("ix_slots_hold_expires_at", "slots")
+    with op.batch_alter_table("slots") as batch:
+        batch.drop_column("hold_expires_at")
+        batch.drop_column("held_by_user_id")
@@ -0,0 +1,37 @@
+"""Indexes for slot and booking lists
+
+ix_slots_date_start_time_id serves GET /slots keyset pagination in
+(date, start_time, id) order; ix_slots_booked_by_user_id_date_start_time_id
+serves a user's bookings in the same order. Both are built concurrently.
+
+The free-slot indexes added alongside them at the time are not created
+here: 0002 replaced them with one partial index.
+
+Revision ID: 0001d
+Revises: 0001c
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from migrations.online import create_index_concurrently, drop_index_concurrently
+
+# revision identifiers, used by Alembic.
+revision: str = "0001d"
+down_revision: Union[str, Sequence[str], None] = "0001c"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    create_index_concurrently("ix_slots_date_start_time_id", "slots", ["date", "start_time", "id"])
+    create_index_concurrently(
+        "ix_slots_booked_by_user_id_date_start_time_id", "slots", ["booked_by_user_id", "date", "start_time", "id"]
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    drop_index_concurrently("ix_slots_booked_by_user_id_date_start_time_id", "slots")
+    drop_index_concurrently("ix_slots_date_start_time_id", "slots")
@@ -0,0 +1,104 @@
+"""Reject overlapping slots of the same user in the database
+
+ix_slots_user_id_date_start_time_end_time, built concurrently, serves
+provider views and the SQLite overlap triggers, and replaces
+ix_slots_user_id_date where a database already has that. PostgreSQL
+enforces the rule with a GiST exclusion constraint (see app/models.py).
+
+Exclusion constraints cannot be added NOT VALID: building it holds a
+lock that blocks writes to slots for the length of one index build.
+lock_timeout (MIGRATION_LOCK_TIMEOUT) bounds only the wait for that
+lock. Existing overlaps are looked for first, so a database that has
+some fails with their ids before taking any lock.
+
+Revision ID: 0001e
+Revises: 0001d
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.online import create_index_concurrently, drop_index_concurrently, has_constraint
+
+# revision identifiers, used by Alembic.
+revision: str = "0001e"
+down_revision: Union[str, Sequence[str], None] = "0001d"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SQLITE_OVERLAP_PROBE = """
+    NEW.user_id IS NOT NULL AND EXISTS (
+        SELECT 1 FROM slots
+        WHERE user_id = NEW.user_id
+          AND date = NEW.date
+          AND start_time < NEW.end_time
+          AND end_time > NEW.start_time
+          {extra}
+    )
+"""
+
+# Up to five overlapping pairs, found through the new index
+OVERLAPPING_PAIRS = sa.text("""
+    SELECT a.id, b.id FROM slots a
+    JOIN slots b ON b.user_id = a.user_id AND b.date = a.date AND b.id > a.id
+        AND b.start_time < a.end_time AND b.end_time > a.start_time
+    LIMIT 5
+""")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    create_index_concurrently(
+        "ix_slots_user_id_date_start_time_end_time", "slots", ["user_id", "date", "start_time", "end_time"]
+    )
+    drop_index_concurrently("ix_slots_user_id_date", "slots")
+
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql" and has_constraint("slots_no_overlap"):
+        return
+    if not op.get_context().as_sql:
+        pairs = op.get_bind().execute(OVERLAPPING_PAIRS).all()
+        if pairs:
+            raise RuntimeError(
+                "Cannot add the slot overlap guard: these slots overlap another slot of the same user "
+                f"(slot id pairs): {[tuple(pair) for pair in pairs]}. Move or delete one of each pair and migrate again."
+            )
+
+    if dialect == "sqlite":
+        op.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS slots_no_overlap_insert
+            BEFORE INSERT ON slots
+            WHEN {SQLITE_OVERLAP_PROBE.format(extra="")}
+            BEGIN
+                SELECT RAISE(ABORT, 'slots_no_overlap');
+            END
+        """)
+        op.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS slots_no_overlap_update
+            BEFORE UPDATE OF user_id, date, start_time, end_time ON slots
+            WHEN {SQLITE_OVERLAP_PROBE.format(extra="AND id != NEW.id")}
+            BEGIN
+                SELECT RAISE(ABORT, 'slots_no_overlap');
+            END
+        """)
+    elif dialect == "postgresql":
+        op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+        op.execute("""
+            ALTER TABLE slots ADD CONSTRAINT slots_no_overlap
+                EXCLUDE USING gist (user_id WITH =, tsrange(date + start_time, date + end_time) WITH &&)
+                WHERE (user_id IS NOT NULL)
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        op.execute("DROP TRIGGER IF EXISTS slots_no_overlap_insert")
+        op.execute("DROP TRIGGER IF EXISTS slots_no_overlap_update")
+    elif dialect == "postgresql":
+        op.execute("ALTER TABLE slots DROP CONSTRAINT IF EXISTS slots_no_overlap")
+    drop_index_concurrently("ix_slots_user_id_date_start_time_end_time", "slots")
@@ -0,0 +1,53 @@
+"""Places with a location and spatial indexes
+
+ix_places_geohash serves "places near me" on every database (each
+geohash prefix is one range of it); on PostgreSQL the GiST index
+ix_places_location on point(longitude, latitude) serves it instead.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, Sequence[str], None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # IF NOT EXISTS for databases whose tables were made by create_all
+    # and adopted by init_db.py
+    op.create_table(
+        "places",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("address", sa.String(), nullable=True),
+        sa.Column("city", sa.String(), nullable=True),
+        sa.Column("state", sa.String(), nullable=True),
+        sa.Column("zip_code", sa.String(), nullable=True),
+        sa.Column("latitude", sa.Float(), nullable=False),
+        sa.Column("longitude", sa.Float(), nullable=False),
+        sa.Column(
+            "geohash", sa.String(length=12).with_variant(sa.String(length=12, collation="C"), "postgresql"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("id"),
+        if_not_exists=True,
+    )
+    op.create_index("ix_places_geohash", "places", ["geohash"], if_not_exists=True)
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("CREATE INDEX IF NOT EXISTS ix_places_location ON places USING gist (point(longitude, latitude))")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_places_geohash", table_name="places")
+    op.drop_table("places")
@@ -0,0 +1,91 @@
+"""Full-text search over slot titles and descriptions
+
+PostgreSQL: the column slots.search_vector holding the weighted tsvector
+of title and description, set by a trigger on every write and backfilled
+in batches, and a GIN index on it built concurrently. The column is
+nullable without a default, so adding it does not rewrite the table (a
+stored generated column would). SQLite: the FTS5 table slots_fts, filled
+from slots and kept in step by triggers.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.online import backfill_in_batches, create_index_concurrently, drop_index_concurrently
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, Sequence[str], None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Must stay identical to SLOT_SEARCH_VECTOR in app/models.py
+SEARCH_VECTOR = (
+    "setweight(to_tsvector('english'::regconfig, {row}title), 'A') || "
+    "setweight(to_tsvector('english'::regconfig, coalesce({row}description, '')), 'B')"
+)
+
+SQLITE_FTS_DELETE = """
+    INSERT INTO slots_fts(slots_fts, rowid, title, description)
+    VALUES ('delete', OLD.id, OLD.title, OLD.description);
+"""
+SQLITE_FTS_INSERT = """
+    INSERT INTO slots_fts(rowid, title, description) VALUES (NEW.id, NEW.title, NEW.description);
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        op.execute("ALTER TABLE slots ADD COLUMN IF NOT EXISTS search_vector tsvector")
+        # Slots written from here on get their vector from the trigger
+        op.execute(f"""
+            CREATE OR REPLACE FUNCTION slots_search_vector() RETURNS trigger AS $$
+            BEGIN
+                NEW.search_vector := {SEARCH_VECTOR.format(row="NEW.")};
+                RETURN NEW;
+            END $$ LANGUAGE plpgsql
+        """)
+        op.execute("DROP TRIGGER IF EXISTS slots_search_vector ON slots")
+        op.execute("""
+            CREATE TRIGGER slots_search_vector
+            BEFORE INSERT OR UPDATE OF title, description ON slots
+            FOR EACH ROW EXECUTE FUNCTION slots_search_vector()
+        """)
+        backfill_in_batches("slots", f"search_vector = {SEARCH_VECTOR.format(row='')}", "search_vector IS NULL")
+        create_index_concurrently("ix_slots_search", "slots", ["search_vector"], postgresql_using="gin")
+    elif dialect == "sqlite":
+        op.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS slots_fts USING fts5(
+                title, description, content='slots', content_rowid='id', tokenize='porter unicode61'
+            )
+        """)
+        op.execute(f"CREATE TRIGGER IF NOT EXISTS slots_fts_insert AFTER INSERT ON slots BEGIN {SQLITE_FTS_INSERT} END")
+        op.execute(f"CREATE TRIGGER IF NOT EXISTS slots_fts_delete AFTER DELETE ON slots BEGIN {SQLITE_FTS_DELETE} END")
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS slots_fts_update AFTER UPDATE OF title, description ON slots "
+            f"BEGIN {SQLITE_FTS_DELETE} {SQLITE_FTS_INSERT} END"
+        )
+        # Index the slots that already exist
+        op.execute("INSERT INTO slots_fts(slots_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        drop_index_concurrently("ix_slots_search", "slots")
+        op.execute("DROP TRIGGER IF EXISTS slots_search_vector ON slots")
+        op.execute("DROP FUNCTION IF EXISTS slots_search_vector()")
+        op.execute("ALTER TABLE slots DROP COLUMN IF EXISTS search_vector")
+    elif dialect == "sqlite":
+        for trigger in ("slots_fts_insert", "slots_fts_delete", "slots_fts_update"):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS slots_fts")
@@ -1,11 +1,29 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from typing import Optional, List
 import sqlite3
 import os
 
-app = FastAPI(title="Schedulink API", version="1.0.0")
+from app.memory_store import Conflict, MemoryRepository, NotFound
+
+# Optional JSON file the store is loaded from at startup and saved to at
+# shutdown; unset keeps everything in memory only
+SNAPSHOT_PATH = os.getenv("MEMORY_STORE_SNAPSHOT")
+
+# Indexed in-memory storage for testing
+store = MemoryRepository.load(SNAPSHOT_PATH) if SNAPSHOT_PATH else MemoryRepository()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    if SNAPSHOT_PATH:
+        store.save(SNAPSHOT_PATH)
+
+
+app = FastAPI(title="Schedulink API", version="1.0.0", lifespan=lifespan)
 
 # Enable CORS
 app.add_middleware(
@@ -16,12 +34,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Simple in-memory storage for testing
-users_db = []
-slots_db = []
-user_counter = 1
-slot_counter = 1
-
 # Pydantic models
 class UserCreate(BaseModel):
     name: str
@@ -29,6 +41,8 @@ class UserCreate(BaseModel):
     phone: Optional[str] = None
 
 class UserOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     name: str
     email: str
@@ -43,6 +57,8 @@ class SlotCreate(BaseModel):
     user_id: Optional[int] = None
 
 class SlotOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     title: str
     description: Optional[str] = None
@@ -64,55 +80,28 @@ def health_check():
 
 @app.post("/users", response_model=UserOut)
 def create_user(user: UserCreate):
-    global user_counter
-    
-    # Check for duplicate email
-    for existing_user in users_db:
-        if existing_user["email"] == user.email:
-            raise HTTPException(status_code=400, detail="Email already registered")
-    
-    new_user = {
-        "id": user_counter,
-        "name": user.name,
-        "email": user.email,
-        "phone": user.phone
-    }
-    users_db.append(new_user)
-    user_counter += 1
-    return new_user
+    try:
+        return store.create_user(user.name, user.email, user.phone)
+    except Conflict as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @app.get("/users", response_model=List[UserOut])
 def get_users():
-    return users_db
+    return store.list_users()
 
 @app.post("/slots", response_model=SlotOut)  
 def create_slot(slot: SlotCreate):
-    global slot_counter
-    
-    # Validate user exists if provided
-    if slot.user_id:
-        user_exists = any(user["id"] == slot.user_id for user in users_db)
-        if not user_exists:
-            raise HTTPException(status_code=404, detail="User not found")
-    
-    new_slot = {
-        "id": slot_counter,
-        "title": slot.title,
-        "description": slot.description,
-        "date": slot.date,
-        "start_time": slot.start_time,
-        "end_time": slot.end_time,
-        "is_booked": False,
-        "user_id": slot.user_id,
-        "booked_by_user_id": None
-    }
-    slots_db.append(new_slot)
-    slot_counter += 1
-    return new_slot
+    try:
+        return store.create_slot(
+            slot.title, slot.date, slot.start_time, slot.end_time,
+            description=slot.description, user_id=slot.user_id,
+        )
+    except NotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
 
 @app.get("/slots", response_model=List[SlotOut])
-def get_slots():
-    return slots_db
+def get_slots(date: Optional[str] = None, user_id: Optional[int] = None):
+    return store.list_slots(date=date, user_id=user_id)
 
 @app.patch("/slots/{slot_id}/book", response_model=SlotOut)
 def book_slot(slot_id: int, booking_data: dict):
@@ -120,46 +109,21 @@ def book_slot(slot_id: int, booking_data: dict):
     if not user_id:
         raise HTTPException(status_code=400, detail="user_id is required")
     
-    # Find slot
-    slot = None
-    for s in slots_db:
-        if s["id"] == slot_id:
-            slot = s
-            break
-    
-    if not slot:
-        raise HTTPException(status_code=404, detail="Slot not found")
-    
-    if slot["is_booked"]:
-        raise HTTPException(status_code=400, detail="Slot already booked")
-    
-    # Verify user exists
-    user_exists = any(user["id"] == user_id for user in users_db)
-    if not user_exists:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    slot["is_booked"] = True
-    slot["booked_by_user_id"] = user_id
-    return slot
+    try:
+        return store.book_slot(slot_id, user_id)
+    except NotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Conflict as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @app.patch("/slots/{slot_id}/cancel", response_model=SlotOut)
 def cancel_booking(slot_id: int):
-    # Find slot
-    slot = None
-    for s in slots_db:
-        if s["id"] == slot_id:
-            slot = s
-            break
-    
-    if not slot:
-        raise HTTPException(status_code=404, detail="Slot not found")
-    
-    if not slot["is_booked"]:
-        raise HTTPException(status_code=400, detail="Slot is not booked")
-    
-    slot["is_booked"] = False
-    slot["booked_by_user_id"] = None
-    return slot
+    try:
+        return store.cancel_booking(slot_id)
+    except NotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Conflict as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,68 @@
+"""
+Shared fixtures
+
+The suite drives the app in-process against a throwaway SQLite database
+that the app's lifespan migrates. Set TEST_DATABASE_URL to run it
+against PostgreSQL instead; the database is migrated to head and the
+tests leave their rows behind, so point it at a disposable one.
+
+    python -m pytest
+    TEST_DATABASE_URL=postgresql://user@localhost/scratch python -m pytest
+"""
+
+import os
+import sys
+import tempfile
+import uuid
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Point the app at the test database before it is imported
+os.environ["DATABASE_URL"] = os.getenv("TEST_DATABASE_URL") or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}"
+os.environ["AUTO_MIGRATE"] = "true"
+# Tests that need the hold reaper call it themselves
+os.environ["HOLD_REAP_INTERVAL"] = "3600"
+
+
+@pytest.fixture(scope="session")
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(scope="session")
+async def app(anyio_backend):
+    """The app with its lifespan running: schema migrated, reaper started"""
+    from app.database import async_engine
+    from app.main import app
+
+    async with app.router.lifespan_context(app):
+        yield app
+    await async_engine.dispose()
+
+
+@pytest.fixture
+async def client(app):
+    import httpx
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+@pytest.fixture
+def dialect():
+    from app.database import engine
+
+    return engine.dialect.name
+
+
+@pytest.fixture
+def create_user(client):
+    """Create a user with a unique email through the API; returns its id"""
+    async def create_user(name="Test user"):
+        response = await client.post("/users", json={"email": f"user-{uuid.uuid4().hex}@example.com", "name": name})
+        assert response.status_code == 200, response.text
+        return response.json()["id"]
+
+    return create_user
@@ -0,0 +1,73 @@
+"""
+Booking a slot is a single conditional UPDATE: of any number of
+concurrent requests for one slot, exactly one wins
+"""
+
+import asyncio
+from collections import Counter
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+CUSTOMERS = 50
+
+
+async def create_slot(client, create_user, title="Race"):
+    provider = await create_user("Provider")
+    response = await client.post("/slots", json={
+        "title": title, "date": "2031-05-05", "start_time": "09:00", "end_time": "09:30", "user_id": provider,
+    })
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+async def test_concurrent_bookings_have_one_winner(client, create_user):
+    slot = await create_slot(client, create_user)
+    customers = [await create_user(f"Customer {i}") for i in range(CUSTOMERS)]
+
+    responses = await asyncio.gather(*[
+        client.patch(f"/slots/{slot['id']}/book", json={"user_id": user_id}) for user_id in customers
+    ])
+
+    assert Counter(r.status_code for r in responses) == {200: 1, 400: CUSTOMERS - 1}
+    assert {r.json()["detail"] for r in responses if r.status_code == 400} == {"Slot is already booked"}
+    winner = next(r.json() for r in responses if r.status_code == 200)
+    assert winner["is_booked"] and winner["booked_by_user_id"] in customers
+
+    final = (await client.get(f"/slots/{slot['id']}")).json()
+    assert final["is_booked"] and final["booked_by_user_id"] == winner["booked_by_user_id"]
+
+
+async def test_concurrent_holds_have_one_winner(client, create_user):
+    slot = await create_slot(client, create_user, title="Hold race")
+    customers = [await create_user(f"Customer {i}") for i in range(CUSTOMERS)]
+
+    responses = await asyncio.gather(*[
+        client.post(f"/slots/{slot['id']}/hold", json={"user_id": user_id}) for user_id in customers
+    ])
+
+    assert Counter(r.status_code for r in responses) == {200: 1, 400: CUSTOMERS - 1}
+    holder = next(customers[i] for i, r in enumerate(responses) if r.status_code == 200)
+
+    # Only the holder may book it while the hold lasts
+    others = [user_id for user_id in customers if user_id != holder]
+    responses = await asyncio.gather(*[
+        client.patch(f"/slots/{slot['id']}/book", json={"user_id": user_id}) for user_id in others[:10]
+    ], client.post(f"/slots/{slot['id']}/confirm", json={"user_id": holder}))
+    assert [r.status_code for r in responses] == [400] * 10 + [200]
+    assert responses[-1].json()["booked_by_user_id"] == holder
+
+
+async def test_booking_errors(client, create_user):
+    slot = await create_slot(client, create_user, title="Errors")
+    customer = await create_user()
+
+    assert (await client.patch("/slots/999999999/book", json={"user_id": customer})).status_code == 404
+    assert (await client.patch(f"/slots/{slot['id']}/book", json={"user_id": 999999999})).status_code == 404
+    assert (await client.get(f"/slots/{slot['id']}")).json()["is_booked"] is False
+
+    assert (await client.patch(f"/slots/{slot['id']}/book", json={"user_id": customer})).status_code == 200
+    assert (await client.patch(f"/slots/{slot['id']}/cancel")).status_code == 200
+    assert (await client.patch(f"/slots/{slot['id']}/cancel")).status_code == 400
+    assert (await client.patch(f"/slots/{slot['id']}/book", json={"user_id": customer})).status_code == 200
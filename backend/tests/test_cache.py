@@ -0,0 +1,117 @@
+"""
+Slot lists are served from the response cache until a write changes
+them, and concurrent identical misses share one load
+"""
+
+import asyncio
+
+import pytest
+from sqlalchemy import update
+
+from app import models
+from app.cache import MemoryCache, NullCache, ResponseCache, SingleFlight
+from app.database import engine
+
+pytestmark = pytest.mark.anyio
+
+
+def rename_behind_the_cache(slot_id, title):
+    """Change a slot without going through the API, so nothing is invalidated"""
+    with engine.begin() as conn:
+        conn.execute(update(models.Slot).where(models.Slot.id == slot_id).values(title=title))
+
+
+async def test_book_and_cancel_invalidate_cached_lists(client, create_user):
+    provider, customer = await create_user(), await create_user()
+    slot = (await client.post("/slots", json={
+        "title": "Cached", "date": "2031-09-09", "start_time": "09:00", "end_time": "09:30", "user_id": provider,
+    })).json()
+
+    async def listed():
+        return (await client.get("/slots", params={"date": "2031-09-09", "user_id": provider})).json()
+
+    async def bookings():
+        return (await client.get(f"/users/{customer}/bookings")).json()
+
+    assert [s["is_booked"] for s in await listed()] == [False]
+    assert await bookings() == []
+
+    # Served from the cache: a change the API did not make goes unseen
+    rename_behind_the_cache(slot["id"], "Renamed")
+    assert [s["title"] for s in await listed()] == ["Cached"]
+
+    booked = await client.patch(f"/slots/{slot['id']}/book", json={"user_id": customer})
+    assert booked.status_code == 200, booked.text
+    assert [(s["title"], s["is_booked"]) for s in await listed()] == [("Renamed", True)]
+    assert [s["id"] for s in await bookings()] == [slot["id"]]
+
+    rename_behind_the_cache(slot["id"], "Renamed again")
+    cancelled = await client.patch(f"/slots/{slot['id']}/cancel")
+    assert cancelled.status_code == 200, cancelled.text
+    assert [(s["title"], s["is_booked"]) for s in await listed()] == [("Renamed again", False)]
+    # The cancellation does not name the booker, yet their list is refreshed
+    assert await bookings() == []
+
+
+async def test_single_flight_coalesces_concurrent_loads():
+    flights, release, loads = SingleFlight(), asyncio.Event(), []
+
+    async def load():
+        loads.append(1)
+        await release.wait()
+        return len(loads)
+
+    waiting = [asyncio.ensure_future(flights.do("key", load)) for _ in range(10)]
+    await asyncio.sleep(0)
+    release.set()
+    assert await asyncio.gather(*waiting) == [1] * 10
+    assert len(loads) == 1
+
+    # Finished loads are forgotten: the next caller loads again
+    assert await flights.do("key", load) == 2
+
+
+async def test_single_flight_shares_failures_and_survives_cancelled_callers():
+    flights, release, loads = SingleFlight(), asyncio.Event(), []
+
+    async def failing_load():
+        loads.append(1)
+        await release.wait()
+        raise ValueError("load failed")
+
+    first, second = (asyncio.ensure_future(flights.do("key", failing_load)) for _ in range(2))
+    third = asyncio.ensure_future(flights.do("key", failing_load))
+    await asyncio.sleep(0)
+    third.cancel()
+    release.set()
+    for caller in (first, second):
+        with pytest.raises(ValueError, match="load failed"):
+            await caller
+    assert third.cancelled()
+    assert len(loads) == 1
+
+
+@pytest.mark.parametrize("backend", [NullCache, MemoryCache])
+async def test_invalidated_cache_does_not_join_earlier_loads(backend):
+    cache, release, loads = ResponseCache(backend()), asyncio.Event(), []
+
+    async def load():
+        loads.append(1)
+        number = len(loads)
+        await release.wait()
+        return str(number).encode(), {}
+
+    async def get():
+        key = await cache.key("slots", {"date": "2031-09-09"}, ["date:2031-09-09"])
+        return await cache.get_or_load(key, load)
+
+    before = [asyncio.ensure_future(get()) for _ in range(5)]
+    await asyncio.sleep(0.01)
+    await cache.invalidate(["date:2031-09-09"])
+    after = asyncio.ensure_future(get())
+    await asyncio.sleep(0.01)
+    release.set()
+
+    assert {body for body, _ in await asyncio.gather(*before)} == {b"1"}
+    assert (await after)[0] == b"2"
+    assert len(loads) == 2
@@ -0,0 +1,73 @@
+"""
+Reads carry ETags, so unchanged resources are revalidated with a 304,
+and updates guarded by If-Match fail with 412 once the slot has changed
+"""
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+async def create_slot(client, provider, date="2031-10-10"):
+    response = await client.post("/slots", json={
+        "title": "Tagged", "date": date, "start_time": "09:00", "end_time": "09:30", "user_id": provider,
+    })
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+async def test_unchanged_slot_is_not_modified(client, create_user):
+    slot = await create_slot(client, await create_user())
+    first = await client.get(f"/slots/{slot['id']}")
+    etag = first.headers["etag"]
+
+    again = await client.get(f"/slots/{slot['id']}", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["etag"] == etag
+
+    await client.put(f"/slots/{slot['id']}", json={"title": "Changed"})
+    changed = await client.get(f"/slots/{slot['id']}", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert changed.json()["title"] == "Changed"
+
+
+async def test_unchanged_list_and_user_are_not_modified(client, create_user):
+    provider, customer = await create_user(), await create_user()
+    slot = await create_slot(client, provider)
+    params = {"user_id": provider}
+
+    etag = (await client.get("/slots", params=params)).headers["etag"]
+    assert (await client.get("/slots", params=params, headers={"If-None-Match": etag})).status_code == 304
+    # Any of several tags, weak or not, matches
+    either = f'"other", {etag.removeprefix("W/")}'
+    assert (await client.get("/slots", params=params, headers={"If-None-Match": either})).status_code == 304
+
+    await client.patch(f"/slots/{slot['id']}/book", json={"user_id": customer})
+    relisted = await client.get("/slots", params=params, headers={"If-None-Match": etag})
+    assert relisted.status_code == 200
+    assert [s["is_booked"] for s in relisted.json()] == [True]
+
+    user_etag = (await client.get(f"/users/{provider}")).headers["etag"]
+    assert (await client.get(f"/users/{provider}", headers={"If-None-Match": user_etag})).status_code == 304
+
+
+async def test_update_with_stale_if_match_is_412(client, create_user):
+    slot = await create_slot(client, await create_user())
+    etag = (await client.get(f"/slots/{slot['id']}")).headers["etag"]
+
+    updated = await client.put(f"/slots/{slot['id']}", json={"title": "First"}, headers={"If-Match": etag})
+    assert updated.status_code == 200, updated.text
+    assert updated.headers["etag"] != etag
+
+    # A second writer still holding the old ETag does not overwrite it
+    stale = await client.put(f"/slots/{slot['id']}", json={"title": "Second"}, headers={"If-Match": etag})
+    assert stale.status_code == 412, stale.text
+    assert (await client.get(f"/slots/{slot['id']}")).json()["title"] == "First"
+
+    current = await client.put(
+        f"/slots/{slot['id']}", json={"title": "Second"}, headers={"If-Match": updated.headers["etag"]}
+    )
+    assert current.status_code == 200, current.text
+    assert (await client.put(f"/slots/{slot['id']}", json={"title": "Third"}, headers={"If-Match": "*"})).status_code == 200
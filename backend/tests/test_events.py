@@ -0,0 +1,136 @@
+"""
+Slot changes reach /slots/stream subscribers once their transaction
+commits, never before and never when it rolls back
+"""
+
+import asyncio
+import datetime as dt
+import json
+
+import pytest
+
+from app import events, models
+from app.database import AsyncSessionLocal
+
+pytestmark = pytest.mark.anyio
+
+# Long enough for a NOTIFY sent before the commit to have arrived, had
+# PostgreSQL delivered it
+SETTLE_SECONDS = 0.2
+
+
+async def next_event(subscription, timeout=5):
+    return await asyncio.wait_for(subscription.queue.get(), timeout)
+
+
+async def write_slot(broker, provider, title, commit=True):
+    """Insert a slot and publish its event in the same transaction; returns the slot's id"""
+    async with AsyncSessionLocal() as db:
+        slot = models.Slot(
+            title=title, date=dt.date(2031, 11, 11), start_time=dt.time(9), end_time=dt.time(9, 30),
+            is_booked=False, user_id=provider,
+        )
+        db.add(slot)
+        await db.flush()
+        await db.refresh(slot)
+        await broker.publish(db, [events.slot_event(events.CREATED, slot)])
+        await asyncio.sleep(SETTLE_SECONDS)
+        if commit:
+            await db.commit()
+        else:
+            await db.rollback()
+        return slot.id
+
+
+async def test_events_wait_for_the_commit(app, create_user):
+    from app.main import slot_events
+
+    provider = await create_user()
+    subscription = slot_events.subscribe(user_id=provider)
+    try:
+        async with AsyncSessionLocal() as db:
+            slot = models.Slot(
+                title="Pending", date=dt.date(2031, 11, 11), start_time=dt.time(9), end_time=dt.time(9, 30),
+                is_booked=False, user_id=provider,
+            )
+            db.add(slot)
+            await db.flush()
+            await db.refresh(slot)
+            await slot_events.publish(db, [events.slot_event(events.CREATED, slot)])
+            await asyncio.sleep(SETTLE_SECONDS)
+            assert subscription.queue.empty()
+            await db.commit()
+
+        event = await next_event(subscription)
+        assert event["type"] == events.CREATED
+        assert event["slot"]["id"] == slot.id and event["slot"]["title"] == "Pending"
+    finally:
+        slot_events.unsubscribe(subscription)
+
+
+async def test_rolled_back_events_are_never_delivered(app, create_user):
+    from app.main import slot_events
+
+    provider = await create_user()
+    subscription = slot_events.subscribe(user_id=provider)
+    try:
+        await write_slot(slot_events, provider, "Rolled back", commit=False)
+        committed = await write_slot(slot_events, provider, "Committed")
+
+        # The first event to arrive is the committed write's
+        event = await next_event(subscription)
+        assert event["slot"]["id"] == committed and event["slot"]["title"] == "Committed"
+        await asyncio.sleep(SETTLE_SECONDS)
+        assert subscription.queue.empty()
+    finally:
+        slot_events.unsubscribe(subscription)
+
+
+async def test_stream_pushes_a_providers_slot_changes(app, client, create_user):
+    provider, other, customer = await create_user(), await create_user(), await create_user()
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": "/slots/stream", "raw_path": b"/slots/stream", "root_path": "",
+        "query_string": f"user_id={provider}".encode(), "headers": [(b"host", b"test")],
+        "client": ("127.0.0.1", 50000), "server": ("test", 80),
+    }
+    request_sent, disconnected = False, asyncio.Event()
+    received: "asyncio.Queue[str]" = asyncio.Queue()
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.body" and message.get("body"):
+            received.put_nowait(message["body"].decode())
+
+    async def next_message():
+        return await asyncio.wait_for(received.get(), 5)
+
+    stream = asyncio.ensure_future(app(scope, receive, send))
+    try:
+        assert await next_message() == ": connected\n\n"
+
+        await client.post("/slots", json={
+            "title": "Elsewhere", "date": "2031-11-12", "start_time": "09:00", "end_time": "09:30", "user_id": other,
+        })
+        slot = (await client.post("/slots", json={
+            "title": "Streamed", "date": "2031-11-12", "start_time": "09:00", "end_time": "09:30", "user_id": provider,
+        })).json()
+        await client.patch(f"/slots/{slot['id']}/book", json={"user_id": customer})
+
+        pushed = []
+        for _ in range(2):
+            kind, data = (await next_message()).strip().split("\n")
+            pushed.append((kind, json.loads(data.removeprefix("data: "))))
+        assert [kind for kind, _ in pushed] == ["event: created", "event: booked"]
+        assert pushed[0][1] == slot
+        assert pushed[1][1]["id"] == slot["id"] and pushed[1][1]["booked_by_user_id"] == customer
+    finally:
+        disconnected.set()
+        await asyncio.wait_for(stream, 5)
@@ -0,0 +1,140 @@
+"""
+Exports are streamed a batch of rows at a time: the response goes out
+in many body chunks and memory does not grow with the size of the export
+"""
+
+import asyncio
+import csv
+import datetime as dt
+import gzip
+import io
+import json
+import math
+import tracemalloc
+import uuid
+
+import pytest
+from sqlalchemy import insert, select
+
+from app import export, models
+from app.database import engine
+from app.serialization import SLOT_LIST_COLUMNS
+
+pytestmark = pytest.mark.anyio
+
+SLOTS_PER_DAY = 16  # 08:00-16:00 in 30-minute slots
+
+
+def seed_slots(count, booked_by=None):
+    """A provider with count slots, booked by booked_by when given; returns the provider's id"""
+    with engine.begin() as conn:
+        user_id = conn.execute(
+            insert(models.User).values(email=f"export-{uuid.uuid4().hex}@example.com", name="Provider")
+        ).inserted_primary_key[0]
+        rows = []
+        for i in range(count):
+            minutes = 8 * 60 + (i % SLOTS_PER_DAY) * 30
+            rows.append({
+                "title": f"Slot {i}",
+                "description": "Export test slot",
+                "date": dt.date(2032, 1, 1) + dt.timedelta(days=i // SLOTS_PER_DAY),
+                "start_time": dt.time(minutes // 60, minutes % 60),
+                "end_time": dt.time((minutes + 30) // 60, (minutes + 30) % 60),
+                "is_booked": booked_by is not None,
+                "booked_by_user_id": booked_by,
+                "user_id": user_id,
+            })
+        if rows:
+            conn.execute(insert(models.Slot), rows)
+    return user_id
+
+
+async def asgi_get(app, path, query="", headers=()):
+    """Call app directly, returning the status, headers and every body chunk it sent"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "root_path": "", "query_string": query.encode(),
+        "headers": [(b"host", b"test"), *headers], "client": ("127.0.0.1", 50000), "server": ("test", 80),
+    }
+    request_sent = False
+    disconnected = asyncio.Event()
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    start, chunks = None, []
+
+    async def send(message):
+        nonlocal start
+        if message["type"] == "http.response.start":
+            start = message
+        elif message["type"] == "http.response.body" and message.get("body"):
+            chunks.append(message["body"])
+
+    await app(scope, receive, send)
+    disconnected.set()
+    return start["status"], dict(start["headers"]), chunks
+
+
+async def test_export_is_streamed_in_batches(app):
+    user_id = seed_slots(2300)
+
+    status, headers, chunks = await asgi_get(app, "/slots/export", f"user_id={user_id}")
+    assert status == 200
+    assert headers[b"content-type"].startswith(b"application/x-ndjson")
+    # One chunk per batch of rows fetched
+    assert len(chunks) == math.ceil(2300 / export.EXPORT_BATCH_ROWS) > 1
+    assert chunks[0].count(b"\n") == export.EXPORT_BATCH_ROWS
+
+    slots = [json.loads(line) for line in b"".join(chunks).splitlines()]
+    assert len(slots) == 2300
+    assert [slot["title"] for slot in slots[:3]] == ["Slot 0", "Slot 1", "Slot 2"]
+    assert slots[-1]["title"] == "Slot 2299" and slots[-1]["start_time"] == "13:30"
+    assert [(slot["date"], slot["start_time"]) for slot in slots] == sorted((slot["date"], slot["start_time"]) for slot in slots)
+
+
+async def test_csv_and_gzip_exports(app):
+    customer = seed_slots(0)
+    seed_slots(1200, booked_by=customer)
+
+    status, headers, chunks = await asgi_get(app, f"/users/{customer}/bookings/export", "format=csv")
+    assert status == 200
+    assert headers[b"content-type"].startswith(b"text/csv")
+    rows = list(csv.DictReader(io.StringIO(b"".join(chunks).decode())))
+    assert len(rows) == 1200
+    assert {row["booked_by_user_id"] for row in rows} == {str(customer)}
+    assert rows[0]["title"] == "Slot 0" and rows[0]["is_booked"] == "true"
+
+    status, headers, chunks = await asgi_get(
+        app, f"/users/{customer}/bookings/export", "format=csv", headers=[(b"accept-encoding", b"gzip")]
+    )
+    assert headers[b"content-encoding"] == b"gzip"
+    assert list(csv.DictReader(io.StringIO(gzip.decompress(b"".join(chunks)).decode()))) == rows
+
+
+async def test_export_memory_stays_flat(app):
+    async def peak_memory(user_id):
+        """Peak traced memory while exporting a provider's slots, and the bytes exported"""
+        stmt = select(*SLOT_LIST_COLUMNS).where(models.Slot.user_id == user_id).order_by(models.Slot.id)
+        tracemalloc.start()
+        try:
+            exported = 0
+            async for chunk in export.export_slots(stmt, "ndjson", batch_rows=500):
+                exported += len(chunk)
+            return tracemalloc.get_traced_memory()[1], exported
+        finally:
+            tracemalloc.stop()
+
+    small, large = seed_slots(2000), seed_slots(20000)
+    await peak_memory(small)  # warm up caches so they do not count against the first export
+    small_peak, _ = await peak_memory(small)
+    large_peak, large_bytes = await peak_memory(large)
+
+    # Ten times the rows, about the same peak; far below the export's own size
+    assert large_peak < small_peak * 1.5, (small_peak, large_peak)
+    assert large_peak < large_bytes / 3, (large_peak, large_bytes)
@@ -0,0 +1,108 @@
+"""
+Holds lapse after HOLD_TTL_SECONDS and the reaper releases them in
+batches, one UPDATE per batch
+"""
+
+import datetime as dt
+import math
+
+import pytest
+from sqlalchemy import event, insert, select, update
+
+from app import holds, models
+from app.database import AsyncSessionLocal, async_engine, engine
+
+pytestmark = pytest.mark.anyio
+
+# The reaper sweeps below run "now", long before any hold the rest of
+# the suite makes expires
+NOW = dt.datetime(2001, 1, 1)
+EXPIRED = 2600
+LIVE = 300
+BATCH = 500
+
+
+async def test_lapsed_hold_frees_the_slot(client, create_user):
+    provider, holder, other = await create_user(), await create_user(), await create_user()
+    slot = (await client.post("/slots", json={
+        "title": "Held", "date": "2031-06-06", "start_time": "09:00", "end_time": "09:30", "user_id": provider,
+    })).json()
+
+    held = await client.post(f"/slots/{slot['id']}/hold", json={"user_id": holder})
+    assert held.status_code == 200 and held.json()["hold_expires_at"] is not None
+    assert (await client.post(f"/slots/{slot['id']}/hold", json={"user_id": other})).status_code == 400
+
+    # Let the hold lapse without waiting HOLD_TTL_SECONDS
+    with engine.begin() as conn:
+        conn.execute(
+            update(models.Slot).where(models.Slot.id == slot["id"]).values(hold_expires_at=holds.utcnow() - dt.timedelta(seconds=1))
+        )
+    assert (await client.post(f"/slots/{slot['id']}/confirm", json={"user_id": holder})).status_code == 400
+    # Free to others even before the reaper has run
+    assert (await client.post(f"/slots/{slot['id']}/hold", json={"user_id": other})).status_code == 200
+    assert (await client.post(f"/slots/{slot['id']}/confirm", json={"user_id": other})).json()["booked_by_user_id"] == other
+
+
+async def test_reaper_releases_lapsed_holds(client, create_user):
+    from app.main import reap_expired_holds
+
+    provider, holder = await create_user(), await create_user()
+    slot = (await client.post("/slots", json={
+        "title": "Reaped", "date": "2031-06-07", "start_time": "09:00", "end_time": "09:30", "user_id": provider,
+    })).json()
+    await client.post(f"/slots/{slot['id']}/hold", json={"user_id": holder})
+    with engine.begin() as conn:
+        conn.execute(
+            update(models.Slot).where(models.Slot.id == slot["id"]).values(hold_expires_at=holds.utcnow() - dt.timedelta(seconds=1))
+        )
+
+    await reap_expired_holds()
+
+    released = (await client.get(f"/slots/{slot['id']}")).json()
+    assert released["hold_expires_at"] is None and not released["is_booked"]
+
+
+async def test_sweep_costs_one_statement_per_batch(app, create_user):
+    holder = await create_user()
+    rows = [
+        {
+            "title": f"Hold {i}", "date": dt.date(2031, 7, 1), "start_time": dt.time(9), "end_time": dt.time(10),
+            "is_booked": False, "held_by_user_id": holder,
+            "hold_expires_at": NOW - dt.timedelta(minutes=1) if i < EXPIRED else NOW + dt.timedelta(days=365),
+        }
+        for i in range(EXPIRED + LIVE)
+    ]
+    with engine.begin() as conn:
+        ids = conn.scalars(insert(models.Slot).returning(models.Slot.id), rows).all()
+
+    updates, batches = [], []
+
+    def count_updates(conn, cursor, statement, parameters, context, executemany):
+        if "UPDATE slots" in statement:
+            updates.append(statement)
+
+    async def record_batch(db, batch):
+        batches.append(len(batch))
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", count_updates)
+    try:
+        async with AsyncSessionLocal() as db:
+            released = await holds.release_expired_holds(db, now=NOW, batch_size=BATCH, before_commit=record_batch)
+        assert len(released) == EXPIRED
+        assert batches == [BATCH] * (EXPIRED // BATCH) + [EXPIRED % BATCH]
+        assert len(updates) == math.ceil(EXPIRED / BATCH)
+
+        # Nothing left to release: one statement
+        updates.clear()
+        async with AsyncSessionLocal() as db:
+            assert await holds.release_expired_holds(db, now=NOW, batch_size=BATCH) == []
+        assert len(updates) == 1
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", count_updates)
+
+    with engine.connect() as conn:
+        still_held = conn.scalars(
+            select(models.Slot.id).where(models.Slot.id.in_(ids), models.Slot.held_by_user_id.is_not(None))
+        ).all()
+    assert sorted(still_held) == sorted(ids[EXPIRED:])
+    assert {slot["id"] for slot in released} == set(ids[:EXPIRED])
@@ -0,0 +1,103 @@
+"""
+Writes carrying an Idempotency-Key run once: retries get the stored
+response back, and expired keys are purged in batches
+"""
+
+import datetime as dt
+import uuid
+
+import orjson
+import pytest
+from sqlalchemy import event, insert, select
+
+from app import models
+from app.database import async_engine, engine
+from app.holds import utcnow
+from app.idempotency import DatabaseIdempotencyStore, request_fingerprint
+
+pytestmark = pytest.mark.anyio
+
+
+def user_body():
+    return orjson.dumps({"email": f"idem-{uuid.uuid4().hex}@example.com", "name": "Idempotent"})
+
+
+async def post_user(client, key, body):
+    return await client.post("/users", content=body, headers={"Idempotency-Key": key, "Content-Type": "application/json"})
+
+
+async def test_retry_replays_the_stored_response(client):
+    key, body = uuid.uuid4().hex, user_body()
+
+    first = await post_user(client, key, body)
+    assert first.status_code == 200, first.text
+    assert "idempotent-replayed" not in first.headers
+
+    retry = await post_user(client, key, body)
+    assert retry.status_code == 200
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert retry.json() == first.json()
+
+    users = (await client.get("/users")).json()
+    assert [user["id"] for user in users if user["email"] == first.json()["email"]] == [first.json()["id"]]
+
+
+async def test_key_reused_for_another_request_is_422(client):
+    key = uuid.uuid4().hex
+    assert (await post_user(client, key, user_body())).status_code == 200
+
+    response = await post_user(client, key, user_body())
+    assert response.status_code == 422, response.text
+    assert "different request" in response.json()["detail"]
+
+
+async def test_retry_while_first_request_runs_is_409(client):
+    from app.main import idempotency_store
+
+    key, body = uuid.uuid4().hex, user_body()
+    # As if the first request were still running in another worker
+    fingerprint = request_fingerprint({"method": "POST", "path": "/users", "query_string": b""}, body)
+    assert await idempotency_store.reserve(key, fingerprint) is None
+    try:
+        response = await post_user(client, key, body)
+        assert response.status_code == 409, response.text
+        assert response.headers["retry-after"] == "1"
+    finally:
+        await idempotency_store.release(key, fingerprint)
+
+    # Released without a response, so a retry runs the request
+    assert (await post_user(client, key, body)).status_code == 200
+
+
+async def test_purge_deletes_expired_keys_in_batches(app):
+    batch, expired_count = 500, 2600
+    prefix = uuid.uuid4().hex
+    now = utcnow()
+    rows = [
+        {
+            "key": f"{prefix}-{i}", "fingerprint": "0" * 64, "status_code": 200, "headers": b"[]", "body": b"{}",
+            "expires_at": now - dt.timedelta(minutes=1) if i < expired_count else now + dt.timedelta(hours=1),
+        }
+        for i in range(expired_count + 300)
+    ]
+    with engine.begin() as conn:
+        conn.execute(insert(models.IdempotencyKey), rows)
+
+    deletes = []
+
+    def count_deletes(conn, cursor, statement, parameters, context, executemany):
+        if "DELETE FROM idempotency_keys" in statement:
+            deletes.append(cursor)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", count_deletes)
+    try:
+        purged = await DatabaseIdempotencyStore(batch_size=batch).purge()
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", count_deletes)
+
+    # Keys other tests let lapse are purged too, still batch rows per DELETE
+    assert purged >= expired_count
+    assert len(deletes) == purged // batch + 1
+    with engine.connect() as conn:
+        left = conn.scalars(select(models.IdempotencyKey.key).where(models.IdempotencyKey.key.like(f"{prefix}-%"))).all()
+    assert sorted(left) == sorted(f"{prefix}-{i}" for i in range(expired_count, expired_count + 300))
@@ -0,0 +1,174 @@
+"""
+The Alembic migrations, run against an empty database of their own:
+
+- upgrading to head produces exactly the schema app/models.py describes
+- downgrading to base removes it again
+- databases created before migrations existed, by create_all with
+  today's models or with the original string date/time columns, are
+  adopted by init_db.py and end up with the same schema and their data
+
+Each test gets a fresh SQLite file, and a fresh PostgreSQL database
+created next to TEST_DATABASE_URL when that is set (CONCURRENTLY index
+builds, the exclusion constraint); the PostgreSQL cases are skipped
+otherwise.
+"""
+
+import datetime as dt
+import os
+import uuid
+
+import pytest
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.runtime.migration import MigrationContext
+from sqlalchemy import Boolean, Column, ForeignKey, Integer, MetaData, String, Table, Text, create_engine, event, inspect, make_url, select, text
+
+from app import database, migrate, models
+from app.database import Base
+
+
+@pytest.fixture(params=["sqlite", "postgresql"])
+def scratch_engine(request, monkeypatch, tmp_path):
+    """An empty database that the migrations, app.migrate and init_db.py run against"""
+    if request.param == "sqlite":
+        scratch = create_engine(f"sqlite:///{tmp_path / 'migrations.db'}")
+        event.listen(scratch, "connect", database._enable_sqlite_foreign_keys)
+        drop = None
+    else:
+        url = os.getenv("TEST_DATABASE_URL")
+        if not url or make_url(url).get_backend_name() != "postgresql":
+            pytest.skip("set TEST_DATABASE_URL to a PostgreSQL database to run the migrations there")
+        admin = create_engine(url, isolation_level="AUTOCOMMIT")
+        name = f"migrations_{uuid.uuid4().hex[:12]}"
+        with admin.connect() as conn:
+            conn.execute(text(f"CREATE DATABASE {name}"))
+        scratch = create_engine(make_url(url).set(database=name))
+
+        def drop():
+            with admin.connect() as conn:
+                conn.execute(text(f"DROP DATABASE IF EXISTS {name}"))
+            admin.dispose()
+
+    # migrations/env.py and init_db.py look the engine up when they run
+    monkeypatch.setattr(database, "engine", scratch)
+    monkeypatch.setattr(migrate, "engine", scratch)
+    try:
+        yield scratch
+    finally:
+        scratch.dispose()
+        if drop:
+            drop()
+
+
+def include_name(name, type_, parent_names):
+    # The full-text search column, index and tables are not in the metadata
+    return not models.is_search_schema(name, type_, parent_names)
+
+
+def schema_differences(engine):
+    with engine.connect() as conn:
+        context = MigrationContext.configure(conn, opts={"include_name": include_name})
+        return compare_metadata(context, Base.metadata)
+
+
+def user_tables(engine):
+    return {
+        name for name in inspect(engine).get_table_names()
+        if name != "alembic_version" and include_name(name, "table", {})
+    }
+
+
+def create_pre_series_tables(engine, slots_rows):
+    """users and slots as create_all made them before migrations, with a provider and slots_rows in them"""
+    metadata = MetaData()
+    users = Table(
+        "users", metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("email", String, unique=True, index=True, nullable=False),
+        Column("name", String, nullable=False),
+        Column("phone", String, nullable=True),
+    )
+    slots = Table(
+        "slots", metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("title", String, nullable=False),
+        Column("description", Text, nullable=True),
+        Column("date", String, nullable=False),
+        Column("start_time", String, nullable=False),
+        Column("end_time", String, nullable=False),
+        Column("is_booked", Boolean, nullable=False),
+        Column("user_id", Integer, ForeignKey("users.id"), nullable=True),
+        Column("booked_by_user_id", Integer, ForeignKey("users.id"), nullable=True),
+    )
+    metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(users.insert().values(id=1, email="provider@example.com", name="Provider"))
+        conn.execute(slots.insert(), [dict(title="Checkup", is_booked=False, user_id=1, **row) for row in slots_rows])
+
+
+def slot_times(engine):
+    with engine.connect() as conn:
+        return conn.execute(
+            select(models.Slot.date, models.Slot.start_time, models.Slot.end_time, models.Slot.version).order_by(models.Slot.id)
+        ).all()
+
+
+def test_upgrade_matches_models_and_downgrade_drops_it(scratch_engine):
+    config = migrate.alembic_config()
+    command.upgrade(config, "head")
+    assert schema_differences(scratch_engine) == []
+    assert migrate.current_revision() == migrate.head_revision()
+
+    command.downgrade(config, "base")
+    assert user_tables(scratch_engine) == set()
+
+
+def test_init_db_adopts_a_create_all_database(scratch_engine):
+    from init_db import init_database
+
+    Base.metadata.create_all(bind=scratch_engine)
+    init_database()
+    assert schema_differences(scratch_engine) == []
+    assert migrate.current_revision() == migrate.head_revision()
+
+
+def test_init_db_adopts_a_pre_series_database(scratch_engine):
+    from init_db import init_database
+
+    create_pre_series_tables(scratch_engine, [
+        {"date": "2030-01-02", "start_time": "09:00", "end_time": "09:30"},
+        {"date": "2030-01-02", "start_time": "14:15", "end_time": "15:00:00"},
+        # Shapes the string columns accepted: single-digit hours, stray spaces
+        {"date": " 2030-01-03", "start_time": "9:00", "end_time": "9:45 "},
+    ])
+    init_database()
+    assert schema_differences(scratch_engine) == []
+    assert [tuple(row) for row in slot_times(scratch_engine)] == [
+        (dt.date(2030, 1, 2), dt.time(9, 0), dt.time(9, 30), 1),
+        (dt.date(2030, 1, 2), dt.time(14, 15), dt.time(15, 0), 1),
+        (dt.date(2030, 1, 3), dt.time(9, 0), dt.time(9, 45), 1),
+    ]
+    # Compared and ordered as times, not as the strings they were
+    with scratch_engine.connect() as conn:
+        assert conn.scalars(
+            select(models.Slot.id).where(models.Slot.start_time < dt.time(10)).order_by(models.Slot.start_time, models.Slot.id)
+        ).all() == [1, 3]
+
+
+def test_pre_series_values_that_are_not_dates_or_times_stop_the_upgrade(scratch_engine):
+    create_pre_series_tables(scratch_engine, [
+        {"date": "2030-01-02", "start_time": "09:00", "end_time": "09:30"},
+        {"date": "tomorrow", "start_time": "09:00", "end_time": "09:30"},
+        {"date": "2030-02-30", "start_time": "10:00", "end_time": "10:30"},
+        {"date": "2030-01-02", "start_time": "25:00", "end_time": "26:00"},
+        {"date": "2030-01-02", "start_time": "11:00", "end_time": "noon"},
+        {"date": "2030-01-02", "start_time": "9", "end_time": "9:30"},
+    ])
+
+    with pytest.raises(RuntimeError, match=r"\(slot ids\): \[2, 3, 4, 5, 6\]"):
+        migrate.upgrade_database()
+
+    # Nothing converted: the strings are as they were, at the baseline
+    assert migrate.current_revision() == migrate.BASELINE_REVISION
+    with scratch_engine.connect() as conn:
+        assert conn.execute(text("SELECT date, start_time, end_time FROM slots WHERE id = 1")).one() == ("2030-01-02", "09:00", "09:30")
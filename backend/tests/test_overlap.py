@@ -0,0 +1,176 @@
+"""
+The slot overlap guard: a user's slots may not overlap in time
+
+Exercised both through the API, which answers 409, and against the
+database directly, so the guard itself (SQLite triggers, PostgreSQL
+exclusion constraint) is what is being tested, not an application
+check in front of it.
+"""
+
+import datetime as dt
+import uuid
+
+import pytest
+from sqlalchemy import insert, text, update
+from sqlalchemy.exc import IntegrityError
+
+from app import models
+from app.database import engine
+
+pytestmark = pytest.mark.anyio
+
+DAY = "2031-03-03"
+
+
+def slot(user_id, start, end, date=DAY, title="Slot"):
+    return {"title": title, "date": date, "start_time": start, "end_time": end, "user_id": user_id}
+
+
+# ===== API =====
+
+
+async def test_clashing_slot_is_rejected(client, create_user):
+    user_id = await create_user()
+    assert (await client.post("/slots", json=slot(user_id, "09:00", "10:00"))).status_code == 200
+
+    for start, end in [("09:30", "10:30"), ("08:30", "09:01"), ("09:15", "09:45"), ("08:00", "11:00"), ("09:00", "10:00")]:
+        response = await client.post("/slots", json=slot(user_id, start, end, title="Clash"))
+        assert response.status_code == 409, (start, end, response.text)
+
+    listed = (await client.get(f"/users/{user_id}/slots")).json()
+    assert [(s["start_time"], s["end_time"]) for s in listed] == [("09:00", "10:00")]
+
+
+async def test_adjacent_slots_are_allowed(client, create_user):
+    user_id = await create_user()
+    for start, end in [("09:00", "09:30"), ("09:30", "10:00"), ("08:30", "09:00")]:
+        response = await client.post("/slots", json=slot(user_id, start, end))
+        assert response.status_code == 200, (start, end, response.text)
+
+
+async def test_other_users_and_days_are_independent(client, create_user):
+    first, second = await create_user(), await create_user()
+    assert (await client.post("/slots", json=slot(first, "09:00", "10:00"))).status_code == 200
+    assert (await client.post("/slots", json=slot(second, "09:00", "10:00"))).status_code == 200
+    assert (await client.post("/slots", json=slot(first, "09:00", "10:00", date="2031-03-04"))).status_code == 200
+    # Slots without a provider are never checked against each other
+    assert (await client.post("/slots", json=slot(None, "09:00", "10:00"))).status_code == 200
+    assert (await client.post("/slots", json=slot(None, "09:00", "10:00"))).status_code == 200
+
+
+async def test_update_into_a_clash_is_rejected(client, create_user):
+    user_id = await create_user()
+    await client.post("/slots", json=slot(user_id, "09:00", "10:00"))
+    later = (await client.post("/slots", json=slot(user_id, "10:00", "11:00"))).json()
+
+    response = await client.put(f"/slots/{later['id']}", json={"start_time": "09:45"})
+    assert response.status_code == 409, response.text
+    assert (await client.get(f"/slots/{later['id']}")).json()["start_time"] == "10:00"
+
+    # Moving a slot within its own time, or next to its neighbour, is fine
+    response = await client.put(f"/slots/{later['id']}", json={"start_time": "10:15", "end_time": "10:45"})
+    assert response.status_code == 200, response.text
+    response = await client.put(f"/slots/{later['id']}", json={"start_time": "10:00"})
+    assert response.status_code == 200, response.text
+
+
+async def test_update_onto_another_day_is_checked(client, create_user):
+    user_id = await create_user()
+    await client.post("/slots", json=slot(user_id, "09:00", "10:00"))
+    other = (await client.post("/slots", json=slot(user_id, "09:00", "10:00", date="2031-03-05"))).json()
+
+    response = await client.put(f"/slots/{other['id']}", json={"date": DAY})
+    assert response.status_code == 409, response.text
+    response = await client.put(f"/slots/{other['id']}", json={"date": DAY, "start_time": "10:00", "end_time": "11:00"})
+    assert response.status_code == 200, response.text
+
+
+async def test_bulk_insert_with_a_clash_inserts_nothing(client, create_user):
+    user_id = await create_user()
+    response = await client.post("/slots/bulk", json=[
+        slot(user_id, "09:00", "10:00"),
+        slot(user_id, "10:00", "11:00"),
+        slot(user_id, "10:30", "11:30"),
+    ])
+    assert response.status_code == 409, response.text
+    assert (await client.get(f"/users/{user_id}/slots")).json() == []
+
+
+# ===== DATABASE =====
+
+
+def test_guard_is_installed(app, dialect):
+    with engine.connect() as conn:
+        if dialect == "postgresql":
+            kind = conn.scalar(text("SELECT contype FROM pg_constraint WHERE conname = 'slots_no_overlap'"))
+            assert kind == "x"  # an exclusion constraint
+        else:
+            triggers = conn.scalars(text("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'slots'")).all()
+            assert {"slots_no_overlap_insert", "slots_no_overlap_update"} <= set(triggers)
+
+
+def test_database_rejects_overlapping_rows(app):
+    row = {"title": "Direct", "date": dt.date(2031, 4, 4), "is_booked": False}
+    with engine.connect() as conn:
+        trans = conn.begin()
+        user_id = conn.execute(insert(models.User).values(email=f"overlap-{uuid.uuid4().hex}@example.com", name="Direct")).inserted_primary_key[0]
+        other_id = conn.execute(insert(models.User).values(email=f"overlap-{uuid.uuid4().hex}@example.com", name="Direct")).inserted_primary_key[0]
+        conn.execute(insert(models.Slot), [
+            dict(row, user_id=user_id, start_time=dt.time(9), end_time=dt.time(10)),
+            dict(row, user_id=user_id, start_time=dt.time(10), end_time=dt.time(11)),
+            dict(row, user_id=other_id, start_time=dt.time(9, 30), end_time=dt.time(10, 30)),
+        ])
+        moved_id = conn.scalar(
+            insert(models.Slot)
+            .values(dict(row, user_id=other_id, start_time=dt.time(10, 45), end_time=dt.time(12)))
+            .returning(models.Slot.id)
+        )
+
+        with pytest.raises(IntegrityError) as raised, conn.begin_nested():
+            conn.execute(insert(models.Slot).values(dict(row, user_id=user_id, start_time=dt.time(10, 59), end_time=dt.time(11, 30))))
+        assert models.is_overlap_error(raised.value)
+
+        # Updates: changing the times, or the owner, into a clash
+        with pytest.raises(IntegrityError) as raised, conn.begin_nested():
+            conn.execute(update(models.Slot).where(models.Slot.id == moved_id).values(start_time=dt.time(10)))
+        assert models.is_overlap_error(raised.value)
+        with pytest.raises(IntegrityError) as raised, conn.begin_nested():
+            conn.execute(update(models.Slot).where(models.Slot.id == moved_id).values(user_id=user_id))
+        assert models.is_overlap_error(raised.value)
+
+        with conn.begin_nested():
+            conn.execute(update(models.Slot).where(models.Slot.id == moved_id).values(start_time=dt.time(10, 30)))
+        trans.rollback()
+
+
+# ===== OTHER CONSTRAINTS =====
+
+
+@pytest.mark.parametrize("values, status, detail", [
+    ({"user_id": 999999999}, 404, "User not found"),
+    ({"booked_by_user_id": 999999999, "is_booked": True}, 404, "User not found"),
+    ({"title": None}, 422, "title must not be null"),
+    ({"start_time": None}, 422, "start_time must not be null"),
+])
+async def test_integrity_errors_are_told_apart(app, values, status, detail):
+    from fastapi import HTTPException
+
+    from app.database import AsyncSessionLocal
+    from app.main import raise_for_slot_integrity_error
+
+    row = {"title": "Constraint", "date": dt.date(2031, 4, 5), "start_time": dt.time(9), "end_time": dt.time(10), "is_booked": False}
+    async with AsyncSessionLocal() as db:
+        with pytest.raises(IntegrityError) as raised:
+            await db.execute(insert(models.Slot).values(dict(row, **values)))
+        await db.rollback()
+    assert not models.is_overlap_error(raised.value)
+
+    with pytest.raises(HTTPException) as http_error:
+        raise_for_slot_integrity_error(raised.value)
+    assert (http_error.value.status_code, http_error.value.detail) == (status, detail)
+
+
+async def test_bulk_insert_for_a_missing_user_is_404(client):
+    response = await client.post("/slots/bulk", json=[slot(999999999, "09:00", "10:00")])
+    assert response.status_code == 404, response.text
+    assert response.json()["detail"] == "User not found"
@@ -0,0 +1,87 @@
+"""
+A client that has spent its token bucket gets 429 with Retry-After until
+the bucket refills; other clients and exempt paths are unaffected
+"""
+
+import types
+
+import httpx
+import pytest
+
+from app import ratelimit
+from app.ratelimit import MemoryRateLimiter, RateLimitMiddleware, RedisRateLimiter
+
+pytestmark = pytest.mark.anyio
+
+
+class Clock:
+    """Stands in for the time module, so buckets refill when the test says"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(ratelimit, "time", types.SimpleNamespace(monotonic=clock.monotonic, time=clock.time))
+    return clock
+
+
+def memory_limiter():
+    return MemoryRateLimiter(rate=0.5, burst=3)
+
+
+def redis_limiter():
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa", reason="fakeredis runs the bucket's Lua script with lupa")
+    return RedisRateLimiter(rate=0.5, burst=3, client=fakeredis.FakeAsyncRedis())
+
+
+@pytest.fixture(params=[memory_limiter, redis_limiter], ids=["memory", "redis"])
+async def limited_client(request, app, clock):
+    limited = RateLimitMiddleware(app, request.param(), key_header="X-User-Id")
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=limited), base_url="http://test") as client:
+        yield client
+
+
+async def test_spent_bucket_is_429_with_retry_after(limited_client, clock):
+    for _ in range(3):
+        assert (await limited_client.get("/")).status_code == 200
+
+    limited = await limited_client.get("/")
+    assert limited.status_code == 429
+    assert limited.json() == {"detail": "Too many requests"}
+    # One token every two seconds
+    assert limited.headers["retry-after"] == "2"
+
+    clock.now += 1
+    assert (await limited_client.get("/")).headers["retry-after"] == "1"
+    clock.now += 1
+    assert (await limited_client.get("/")).status_code == 200
+    assert (await limited_client.get("/")).status_code == 429
+
+
+async def test_clients_and_exempt_paths_are_not_limited(limited_client):
+    for _ in range(3):
+        await limited_client.get("/", headers={"X-User-Id": "spender"})
+    assert (await limited_client.get("/", headers={"X-User-Id": "spender"})).status_code == 429
+
+    assert (await limited_client.get("/", headers={"X-User-Id": "someone else"})).status_code == 200
+    assert (await limited_client.get("/health/live", headers={"X-User-Id": "spender"})).status_code == 200
+
+
+async def test_limiter_outage_lets_requests_through(app):
+    class BrokenLimiter:
+        async def take(self, key):
+            raise ConnectionError("limiter is down")
+
+    limited = RateLimitMiddleware(app, BrokenLimiter())
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=limited), base_url="http://test") as client:
+        assert (await client.get("/")).status_code == 200
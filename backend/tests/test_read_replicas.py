@@ -0,0 +1,99 @@
+"""
+With DATABASE_READ_URLS set, GET endpoints read from the replicas in
+turn, skip a replica that cannot be reached, and read from the primary
+for a while after the same client has written
+"""
+
+import uuid
+
+import httpx
+import pytest
+from sqlalchemy import create_engine, insert
+
+from app import database, models
+from app.database import Base, ReadRouter, ReadYourWritesMiddleware, async_engine, pinned_to_primary
+
+pytestmark = pytest.mark.anyio
+
+
+def create_replica(path, name):
+    """A SQLite database standing in for a replica, holding one user called name; returns its URL"""
+    url = f"sqlite:///{path}"
+    replica = create_engine(url)
+    Base.metadata.create_all(bind=replica)
+    with replica.begin() as conn:
+        conn.execute(insert(models.User).values(email=f"{name.lower().replace(' ', '-')}@example.com", name=name))
+    replica.dispose()
+    return url
+
+
+@pytest.fixture
+async def replicas(app, monkeypatch, tmp_path):
+    """Route reads over two replicas, then back to the primary alone"""
+    router = ReadRouter(async_engine, [
+        database._create_replica_engine(create_replica(tmp_path / f"replica{i}.db", f"Replica {i}")) for i in range(2)
+    ])
+    monkeypatch.setattr(database, "read_router", router)
+    yield router
+    await router.dispose()
+
+
+async def served_by(client):
+    """Which database answered GET /users: the name of a replica's user, or "primary\""""
+    names = {user["name"] for user in (await client.get("/users")).json()}
+    replicas = sorted(name for name in names if name.startswith("Replica"))
+    return replicas[0] if replicas else "primary"
+
+
+async def test_reads_go_to_replicas_in_turn(client, replicas):
+    assert [await served_by(client) for _ in range(4)] == ["Replica 0", "Replica 1", "Replica 0", "Replica 1"]
+
+
+async def test_unreachable_replica_is_skipped(client, replicas, tmp_path):
+    unreachable = database._create_replica_engine(f"sqlite:///{tmp_path / 'missing' / 'replica.db'}")
+    replicas.replicas.insert(0, unreachable)
+    replicas._down_until.insert(0, float("-inf"))
+
+    assert {await served_by(client) for _ in range(6)} == {"Replica 0", "Replica 1"}
+    # Marked down after its first failure: not tried again until retry_after passes
+    assert replicas._down_until[0] > 0
+
+    # With no replica left, reads fall back to the primary
+    replicas._down_until = [float("inf")] * len(replicas.replicas)
+    assert await served_by(client) == "primary"
+    await unreachable.dispose()
+
+
+async def test_write_pins_the_client_to_the_primary(client, replicas):
+    user = {"email": f"pinned-{uuid.uuid4().hex}@example.com", "name": "Pinned"}
+    created = await client.post("/users", json=user)
+    assert created.status_code == 200, created.text
+    assert created.headers["set-cookie"].startswith("read_primary=1; Max-Age=5;")
+    assert client.cookies["read_primary"] == "1"
+
+    # Reads its own write from the primary, while other clients still use the replicas
+    assert user["email"] in {listed["email"] for listed in (await client.get("/users")).json()}
+    client.cookies.clear()
+    assert (await served_by(client)).startswith("Replica")
+
+    # A failed write does not pin
+    duplicate = await client.post("/users", json=user)
+    assert duplicate.status_code == 400
+    assert "set-cookie" not in duplicate.headers
+
+
+async def test_key_header_pins_clients_that_drop_cookies(replicas):
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"primary" if pinned_to_primary() else b"replica"})
+
+    pinning = ReadYourWritesMiddleware(app, key_header="X-User-Id")
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=pinning), base_url="http://test") as client:
+        async def read(user):
+            client.cookies.clear()
+            return (await client.get("/", headers={"X-User-Id": user})).text
+
+        assert await read("writer") == "replica"
+        await client.post("/", headers={"X-User-Id": "writer"})
+        assert await read("writer") == "primary"
+        assert await read("someone else") == "replica"
@@ -0,0 +1,101 @@
+"""
+GET /slots/search finds slots by the words of their title and
+description, title matches first, narrowed by the GET /slots filters
+and paginated by cursor
+"""
+
+import uuid
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+def unique_word():
+    """A made-up word no other slot contains, so each test sees only its own slots"""
+    return "".join(chr(ord("a") + int(digit, 16)) for digit in uuid.uuid4().hex[:12])
+
+
+async def create_slot(client, provider, title, description=None, date="2031-12-01", start_time="09:00"):
+    hour, minute = map(int, start_time.split(":"))
+    response = await client.post("/slots", json={
+        "title": title, "description": description, "date": date, "start_time": start_time,
+        "end_time": f"{hour:02d}:{minute + 30:02d}", "user_id": provider,
+    })
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+async def search(client, **params):
+    response = await client.get("/slots/search", params=params)
+    assert response.status_code == 200, response.text
+    return response
+
+
+async def found(client, **params):
+    return [slot["id"] for slot in (await search(client, **params)).json()]
+
+
+async def test_title_matches_rank_above_description_matches(client, create_user):
+    provider, word = await create_user(), unique_word()
+    in_description = await create_slot(client, provider, "Checkup", f"Bring your {word} card", start_time="09:00")
+    in_title = await create_slot(client, provider, f"{word} consultation", start_time="10:00")
+    await create_slot(client, provider, "Unrelated", "Nothing to see", start_time="11:00")
+
+    assert await found(client, q=word) == [in_title, in_description]
+    # Case, punctuation and word forms do not matter; every word must match
+    assert await found(client, q=f"{word.upper()}!") == [in_title, in_description]
+    assert await found(client, q=f"{word} consultations") == [in_title]
+    assert await found(client, q=f"{word} surgery") == []
+
+
+async def test_search_follows_edits(client, create_user):
+    provider, word = await create_user(), unique_word()
+    slot = await create_slot(client, provider, f"{word} cleaning")
+    assert await found(client, q=f"{word} clean") == [slot]
+
+    await client.put(f"/slots/{slot}", json={"title": "Whitening", "description": f"after the {word}"})
+    assert await found(client, q=f"{word} clean") == []
+    assert await found(client, q=f"{word} whitening") == [slot]
+
+    await client.delete(f"/slots/{slot}")
+    assert await found(client, q=word) == []
+
+
+async def test_search_takes_the_list_filters(client, create_user):
+    provider, other, customer, word = await create_user(), await create_user(), await create_user(), unique_word()
+    first = await create_slot(client, provider, word, date="2031-12-01")
+    second = await create_slot(client, provider, word, date="2031-12-02")
+    third = await create_slot(client, provider, word, date="2031-12-03")
+    elsewhere = await create_slot(client, other, word, date="2031-12-02")
+    await client.patch(f"/slots/{second}/book", json={"user_id": customer})
+
+    # Equal ranks come back in id order
+    assert await found(client, q=word) == [first, second, third, elsewhere]
+    assert await found(client, q=word, user_id=provider) == [first, second, third]
+    assert await found(client, q=word, date="2031-12-02") == [second, elsewhere]
+    assert await found(client, q=word, date_from="2031-12-02", date_to="2031-12-02", user_id=provider) == [second]
+    assert await found(client, q=word, is_booked=True) == [second]
+    assert await found(client, q=word, is_booked=False, user_id=provider) == [first, third]
+
+
+async def test_search_is_paginated_by_cursor(client, create_user):
+    provider, word = await create_user(), unique_word()
+    title_match = await create_slot(client, provider, word, start_time="08:00")
+    others = [await create_slot(client, provider, "Slot", word, start_time=f"{hour:02d}:00") for hour in range(9, 14)]
+
+    pages, cursor = [], None
+    while True:
+        params = {"q": word, "limit": 2, **({"cursor": cursor} if cursor else {})}
+        response = await search(client, **params)
+        pages.append([slot["id"] for slot in response.json()])
+        cursor = response.headers.get("x-next-cursor")
+        if not cursor:
+            break
+    assert pages == [[title_match, others[0]], others[1:3], others[3:]]
+
+
+@pytest.mark.parametrize("params", [{"q": "?!"}, {"q": "word", "cursor": "not-a-cursor"}])
+async def test_bad_query_or_cursor_is_400(client, params):
+    response = await client.get("/slots/search", params=params)
+    assert response.status_code == 400, response.text
@@ -0,0 +1,61 @@
+"""
+Slot writes are validated before they reach the database: bad input is
+a 422, never a 500
+"""
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+async def create_slot(client, **fields):
+    body = {"title": "Slot", "date": "2031-08-08", "start_time": "09:00", "end_time": "10:00", **fields}
+    response = await client.post("/slots", json=body)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+@pytest.mark.parametrize("fields", [
+    {"start_time": "09:00+05:00"},
+    {"end_time": "10:00Z"},
+    {"start_time": "09:00+05:00", "end_time": "10:00"},
+])
+async def test_times_with_utc_offset_are_rejected(client, fields):
+    body = {"title": "Offset", "date": "2031-08-08", "start_time": "09:00", "end_time": "10:00", **fields}
+    response = await client.post("/slots", json=body)
+    assert response.status_code == 422, response.text
+
+    slot = await create_slot(client)
+    response = await client.put(f"/slots/{slot['id']}", json=fields)
+    assert response.status_code == 422, response.text
+
+
+async def test_recurrence_times_with_utc_offset_are_rejected(client):
+    response = await client.post("/slots/recurring", json={
+        "title": "Offset", "start_date": "2031-08-08", "end_date": "2031-08-09", "day_start": "09:00+01:00",
+    })
+    assert response.status_code == 422, response.text
+
+
+@pytest.mark.parametrize("field", ["title", "date", "start_time", "end_time"])
+async def test_update_cannot_null_a_required_field(client, field):
+    slot = await create_slot(client)
+    response = await client.put(f"/slots/{slot['id']}", json={field: None})
+    assert response.status_code == 422, response.text
+    assert response.json()["detail"][0]["loc"] == ["body", field]
+    assert (await client.get(f"/slots/{slot['id']}")).json() == slot
+
+
+async def test_update_leaves_omitted_fields_alone(client):
+    slot = await create_slot(client, description="Kept")
+    response = await client.put(f"/slots/{slot['id']}", json={"title": "Renamed", "description": None})
+    assert response.status_code == 200, response.text
+    assert response.json() == dict(slot, title="Renamed", description=None)
+
+
+async def test_update_checks_time_order_against_stored_times(client):
+    slot = await create_slot(client)
+    response = await client.put(f"/slots/{slot['id']}", json={"start_time": "10:30"})
+    assert response.status_code == 400, response.text
+    response = await client.put(f"/slots/{slot['id']}", json={"start_time": "10:30", "end_time": "10:00"})
+    assert response.status_code == 422, response.text